@@ -3,9 +3,9 @@
 Contains Ball class, as a subclass of Turtle
 """
 
+import math
 from turtle import Turtle
-import random
-import numpy as np
+from physics import BallState
 
 
 def cart2pol(velocity):
@@ -14,8 +14,8 @@ def cart2pol(velocity):
     :param velocity: 2-entry list of velocity given in cartesian coordinates (x-vel, y-vel)
     :return: 2-entry list of velocity given in polar coordinates (speed, angle up from positive x-axis)
     """
-    rho = np.sqrt(velocity[0] ** 2 + velocity[1] ** 2)
-    phi = np.degrees(np.arctan2(velocity[1], velocity[0]))
+    rho = math.sqrt(velocity[0] ** 2 + velocity[1] ** 2)
+    phi = math.degrees(math.atan2(velocity[1], velocity[0]))
     return [rho, phi]
 
 
@@ -25,18 +25,18 @@ def pol2cart(velocity):
     :param velocity: 2-entry list of velocity given in polar coordinates (speed, angle up from positive x-axis)
     :return: 2-entry list of velocity given in cartesian coordinates (x-vel, y-vel)
     """
-    x = velocity[0] * np.cos(np.radians(velocity[1]))
-    y = velocity[0] * np.sin(np.radians(velocity[1]))
+    x = velocity[0] * math.cos(math.radians(velocity[1]))
+    y = velocity[0] * math.sin(math.radians(velocity[1]))
     return [x, y]
 
 
 class Ball(Turtle):
-    """A class to represent either the actual ball or an invisible ball for simulation"""
+    """A class to draw a ball whose position and velocity are kept in a BallState"""
 
-    def __init__(self, starting_ball_speed, ball_to_simulate=None):
+    def __init__(self, starting_ball_speed, state=None):
         """
         param starting_ball_speed: Speed that the ball starts moving at
-        param ball_to_simulate: Ball object that will be simulated; defaults to None
+        param state: BallState to draw; a new ball is started if None
         """
         super().__init__()
         self.color("white")
@@ -45,40 +45,47 @@ class Ball(Turtle):
         self.penup()
         # Each unit of turtle size is 20 pixels, so radius would be half that
         self.radius = self.turtlesize()[0]*10
-        self.velocity = [starting_ball_speed, 0]
-        if ball_to_simulate is not None:
-            self.ball_to_simulate = ball_to_simulate
-            self.start_simulated_ball()
+        if state is not None:
+            self.state = state
+            self.render()
         else:
+            self.state = BallState(starting_ball_speed, radius=self.radius)
             self.restart_ball(starting_ball_speed)
 
-    def start_simulated_ball(self):
+    @property
+    def velocity(self):
         """
-        Copy parameters from ball-to-simulate to simulating ball
+        :return: 2-entry list of ball velocity given in polar coordinates (speed, heading)
         """
-        self.goto(self.ball_to_simulate.pos())
-        self.velocity[1] = self.ball_to_simulate.velocity[1]
-        self.setheading(self.velocity[1])
-        self.hideturtle()
+        return [self.state.speed, self.state.heading]
+
+    def render(self, previous=None, alpha=1.0):
+        """
+        Moves the turtle to match the ball state
+        :param previous: (x, y) position of the ball at the previous tick, for drawing in between ticks
+        :param alpha: How far from the previous position to the current one to draw the ball (0 to 1)
+        """
+        self.setheading(self.state.heading)
+        if previous is None:
+            self.goto(self.state.x, self.state.y)
+        else:
+            self.goto(previous[0] + (self.state.x - previous[0])*alpha,
+                      previous[1] + (self.state.y - previous[1])*alpha)
 
     def restart_ball(self, ball_speed):
         """
         Restarts ball's position and velocity at start of game or new round
         :param ball_speed: Speed that the ball will move at
         """
-        self.goto(0, 0)
-        # First number is speed; second number is heading
-        # Don't start ball going 90 degrees (straight up) or 270 (straight down)
-        initial_direction = random.choice([i for i in range(0, 360) if i not in [90, 270]])
-        self.velocity = [ball_speed, initial_direction]
-        self.setheading(self.velocity[1])
+        self.state.restart(ball_speed)
+        self.render()
 
     def move_ball(self):
         """
         Moves ball by speed given by first entry of velocity attribute
-        :return:
         """
-        self.forward(self.velocity[0])
+        self.state.move()
+        self.render()
 
     def deflect(self, direction, di=None):
         """
@@ -88,29 +95,12 @@ class Ball(Turtle):
         :param direction: 'x' or 'y'
         :param di: directional influence value if hitting paddle
         """
-        # Deflect off top or bottom wall
-        if direction == 'y':
-            cart_velocity = pol2cart(self.velocity)
-            cart_velocity[1] = -cart_velocity[1]
-            self.velocity = cart2pol(cart_velocity)
-            self.setheading(self.velocity[1])
-        # Deflect off paddle
-        elif direction == 'x':
-            # Deflect off left paddle
-            if self.left_right() == "left":
-                self.velocity[1] = 90*di
-            # Deflect off right paddle
-            else:
-                self.velocity[1] = 180 - 90*di
-            self.setheading(self.velocity[1])
+        self.state.deflect(direction, di)
+        self.render()
 
     def left_right(self):
         """
         Determines if ball is moving left or right based on ball's heading angle
         :return: str that provides direction ball is moving in
         """
-        # Checks self.heading() instead of self.velocity[1] because heading method converts angle to between 0 and 360
-        if 90 < self.heading() < 270:
-            return "left"
-        else:
-            return "right"
+        return self.state.left_right()
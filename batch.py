@@ -0,0 +1,389 @@
+"""Batch Match Class File
+
+Contains BatchMatch class, which holds many matches between Player 1 and the CPU as NumPy arrays
+(one entry per match) and advances all of them by one tick with each call to step(), and BatchCPU class, which
+holds the CPUs of many matches the same way
+"""
+
+import numpy as np
+from physics import BALL_RADIUS, PADDLE_HALF_WIDTH, PADDLE_WALL_OFFSET, STARTING_HEADINGS
+from cpu_brain import default_react_x_range, default_di_intent_range
+
+
+def predict_ball_paths(x, y, heading, ball_speed, paddle_edge_x, screen_height, radius=BALL_RADIUS):
+    """
+    Array version of physics.predict_ball_path for balls moving towards the right-hand paddle
+    :param x: Array of ball x positions
+    :param y: Array of ball y positions
+    :param heading: Array of ball headings (in degrees)
+    :param ball_speed: Speed the balls would be stepped at
+    :param paddle_edge_x: x position of the left edge of the right-hand paddle
+    :param screen_height: The height of the court
+    :param radius: Radius of the balls
+    :return: Array of y coordinates of the center of each ball when it reaches the edge of the paddle
+    """
+    radians = np.radians(heading)
+    vx = ball_speed*np.cos(radians)
+    vy = ball_speed*np.sin(radians)
+    distance = paddle_edge_x - radius - x
+    steps = np.where(distance >= 0, np.floor(distance/vx) + 1, 0)
+    # Mirror downward balls so the first bounce is always off the top wall
+    sign = np.where(vy >= 0, 1.0, -1.0)
+    y = sign*y
+    vy = np.abs(vy)
+    wall_y = screen_height/2 - radius
+    no_bounce = y + steps*vy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first_bounce = np.maximum(np.floor((wall_y - y)/vy) + 1, 1)
+        top_y = y + first_bounce*vy
+        bounce_distance = (np.floor((wall_y + top_y)/vy) + 1)*vy
+        travelled = np.mod((steps - first_bounce)*vy, 2*bounce_distance)
+    bounced = np.where(travelled <= bounce_distance, top_y - travelled, top_y - 2*bounce_distance + travelled)
+    return sign*np.where((vy == 0) | (no_bounce <= wall_y), no_bounce, bounced)
+
+
+def predict_swept_ball_paths(x, y, heading, paddle_edge_x, screen_height, radius=BALL_RADIUS):
+    """
+    Array version of physics.predict_swept_ball_path for balls moving towards the right-hand paddle
+    :param x: Array of ball x positions
+    :param y: Array of ball y positions
+    :param heading: Array of ball headings (in degrees)
+    :param paddle_edge_x: x position of the left edge of the right-hand paddle
+    :param screen_height: The height of the court
+    :param radius: Radius of the balls
+    :return: Array of y coordinates of the center of each ball when it reaches the edge of the paddle
+    """
+    wall_y = screen_height/2 - radius
+    unfolded_y = y + (paddle_edge_x - radius - x)*np.tan(np.radians(heading))
+    folded_y = np.mod(unfolded_y + wall_y, 4*wall_y)
+    return np.where(folded_y <= 2*wall_y, folded_y - wall_y, 3*wall_y - folded_y)
+
+
+def masked(values, mask):
+    """
+    :param values: Array with one entry per match, or a single value for every match
+    :param mask: Boolean array of matches
+    :return: The masked matches' entries, or the single value
+    """
+    return values[mask] if np.ndim(values) else values
+
+
+class BatchCPU:
+    """A class to represent the CPUs of many matches, following CPUBrain's logic with one array entry per match
+
+    Like CPUBrain, sees the court with its own paddle on the right, so a CPU playing on the left must be given
+    the ball's x position and heading mirrored. Its paddle speed and reaction and aim ranges can each be a single
+    value for every match or an array with one entry per match.
+    """
+
+    def __init__(self, num_matches, screen_width, screen_height, paddle_length, paddle_speed, react_x_range,
+                 di_intent_range, ball_speed):
+        """
+        param num_matches: The number of matches
+        param screen_width: The width of the court
+        param screen_height: The height of the court
+        param paddle_length: The length of the CPUs' paddles (in units for turtlesize() scaling method)
+        param paddle_speed: Distance the CPUs' paddles move per tick
+        param react_x_range: (lowest, highest) x positions where the CPUs can react; see CPUBrain
+        param di_intent_range: (lowest, highest) offsets the CPUs aim their paddles at; see CPUBrain
+        param ball_speed: Distance the balls move per tick
+        """
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.half_length = paddle_length*10
+        self.paddle_speed = paddle_speed
+        self.react_lows, self.react_highs = react_x_range
+        self.di_lows, self.di_highs = di_intent_range
+        self.ball_speed = ball_speed
+        self.paddle_edge_x = screen_width/2 - PADDLE_WALL_OFFSET - PADDLE_HALF_WIDTH
+        self.opponent_paddle_x = -screen_width/2 + PADDLE_WALL_OFFSET
+        self.reacted = np.zeros(num_matches, dtype=bool)
+        self.react_x = np.full(num_matches, float(screen_width))
+        self.di_intent = np.zeros(num_matches)
+        self.future_y = np.zeros(num_matches)
+        self.stop_moving = np.zeros(num_matches, dtype=bool)
+
+    def reset(self, mask):
+        """
+        Has the masked CPUs forget any reaction, as at the start of a match
+        :param mask: Boolean array of matches to reset
+        """
+        self.reacted[mask] = False
+        self.react_x[mask] = self.screen_width
+        self.di_intent[mask] = 0
+        self.future_y[mask] = 0
+        self.stop_moving[mask] = False
+
+    def set_react_x(self, mask, rng, ball_reset=False):
+        """
+        Picks the x positions where the masked CPUs react, like CPUBrain.set_react_x
+        :param mask: Boolean array of matches whose ball was just hit towards the CPU (or restarted moving
+                towards it)
+        :param rng: NumPy random number generator
+        :param ball_reset: True if the balls were restarted moving towards the CPU, so it reacts right away
+        """
+        if ball_reset:
+            self.react_x[mask] = 0
+            self.stop_moving[mask] = False
+        else:
+            self.react_x[mask] = rng.integers(masked(self.react_lows, mask), masked(self.react_highs, mask),
+                                              int(mask.sum()), endpoint=True)
+        self.reacted[mask] = False
+
+    def move_paddles(self, paddle_y, mask_up, mask_down):
+        """
+        Moves the CPUs' paddles up or down by their paddle speed unless they are touching a wall
+        :param paddle_y: Array of paddle y positions, changed in place
+        :param mask_up: Boolean array of paddles to move up
+        :param mask_down: Boolean array of paddles to move down
+        """
+        half_height = self.screen_height/2
+        speed = self.paddle_speed
+        up = mask_up & (self.half_length < half_height - paddle_y)
+        down = mask_down & (self.half_length < half_height + paddle_y)
+        paddle_y += np.where(up, speed, 0) - np.where(down, speed, 0)
+
+    def step(self, paddle_y, x, y, heading, active, away, rng):
+        """
+        Reacts and moves the CPUs for one tick, like Match.react_cpu and CPUBrain.move
+        :param paddle_y: Array of the CPUs' paddle y positions, changed in place
+        :param x: Array of ball x positions, as seen by the CPUs
+        :param y: Array of ball y positions
+        :param heading: Array of ball headings (in degrees), as seen by the CPUs
+        :param active: Boolean array of matches that aren't over
+        :param away: Boolean array of matches whose ball is moving away from the CPU
+        :param rng: NumPy random number generator
+        """
+        react = active & (x >= self.react_x) & ~self.reacted
+        if react.any():
+            self.future_y[react] = predict_ball_paths(x[react], y[react], heading[react], self.ball_speed,
+                                                      self.paddle_edge_x, self.screen_height)
+            self.reacted[react] = True
+            self.stop_moving[react] = False
+            self.react_x[react] = self.screen_width
+            self.di_intent[react] = rng.uniform(masked(self.di_lows, react), masked(self.di_highs, react),
+                                                int(react.sum()))
+        # CPU moves towards where ball will be if reacting
+        half_height = self.screen_height/2
+        chasing = active & self.reacted & ~self.stop_moving
+        target_y = self.future_y + self.di_intent
+        up_limit = np.minimum(target_y, half_height)
+        down_limit = np.maximum(target_y, -half_height)
+        up = chasing & (paddle_y < up_limit)
+        down = chasing & ~up & (paddle_y > down_limit)
+        self.move_paddles(paddle_y, up, down)
+        self.stop_moving |= (up & (paddle_y >= up_limit)) | (down & (paddle_y <= down_limit))
+        # CPU moves back towards center if ball moving back towards its opponent
+        away = active & away
+        self.stop_moving |= away
+        returning = away & (x <= self.opponent_paddle_x + 100)
+        speed = self.paddle_speed
+        up = returning & (paddle_y < -speed/2)
+        down = returning & ~up & (paddle_y > speed/2)
+        self.move_paddles(paddle_y, up, down)
+
+    def keep(self, mask):
+        """
+        Drops every match not in the mask
+        :param mask: Boolean array of matches to keep
+        """
+        for name, values in list(vars(self).items()):
+            if np.ndim(values):
+                setattr(self, name, values[mask])
+
+
+class BatchMatch:
+    """A class to represent many matches between Player 1 (left) and the CPU (right) played in lockstep
+
+    Uses the same rules as rules.Match, but keeps every match's state in arrays so that a tick of all
+    matches is a handful of NumPy operations. Finished matches stop changing while the others keep playing.
+    """
+
+    def __init__(self, num_matches, screen_width=800, screen_height=500, paddle_length=5, paddle_speed=40,
+                 cpu_paddle_speed=None, ball_speed=3, winning_score=5, seed=None, react_x_range=None,
+                 di_intent_range=None):
+        """
+        param num_matches: The number of matches to play at once
+        param screen_width: The width of the court
+        param screen_height: The height of the court
+        param paddle_length: The length of both paddles (in units for turtlesize() scaling method)
+        param paddle_speed: Distance Player 1's paddle moves per move
+        param cpu_paddle_speed: Distance the CPU's paddle moves per tick; defaults to paddle_speed/30
+        param ball_speed: Distance the balls move per tick
+        param winning_score: Score needed to win a match
+        param seed: Seed for the random number generator; unpredictable if None
+        param react_x_range: (lowest, highest) x positions where the CPU can react; see CPUBrain
+        param di_intent_range: (lowest, highest) offsets the CPU aims its paddle at; see CPUBrain
+        """
+        self.num_matches = num_matches
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.paddle_length = paddle_length
+        self.half_length = paddle_length*10
+        self.paddle_speed = paddle_speed
+        self.cpu_paddle_speed = paddle_speed/30 if cpu_paddle_speed is None else cpu_paddle_speed
+        self.ball_speed = ball_speed
+        self.winning_score = winning_score
+        self.rng = np.random.default_rng(seed)
+        self.react_x_range = react_x_range or default_react_x_range(screen_width)
+        self.di_intent_range = di_intent_range or default_di_intent_range(paddle_length)
+        self.radius = BALL_RADIUS
+        self.paddle_1_x = -screen_width/2 + PADDLE_WALL_OFFSET
+        self.paddle_2_x = screen_width/2 - PADDLE_WALL_OFFSET
+        self.starting_headings = np.array(STARTING_HEADINGS, dtype=float)
+        # Ball state
+        self.x = np.zeros(num_matches)
+        self.y = np.zeros(num_matches)
+        self.heading = np.zeros(num_matches)
+        self.vx = np.zeros(num_matches)
+        self.vy = np.zeros(num_matches)
+        # Paddle and score state
+        self.paddle_1_y = np.zeros(num_matches)
+        self.paddle_2_y = np.zeros(num_matches)
+        self.scores = np.zeros((num_matches, 2), dtype=np.int64)
+        self.cpu = BatchCPU(num_matches, screen_width, screen_height, paddle_length, self.cpu_paddle_speed,
+                            self.react_x_range, self.di_intent_range, ball_speed)
+        # Statistics
+        self.ticks = np.zeros(num_matches, dtype=np.int64)
+        self.hits = np.zeros(num_matches, dtype=np.int64)
+        self.restart_rounds(np.ones(num_matches, dtype=bool))
+
+    def set_heading(self, mask, heading):
+        """
+        Points the balls of the masked matches in new directions, keeping their speed
+        :param mask: Boolean array of matches to change
+        :param heading: Array of new headings (in degrees) for every match; only masked entries are used
+        """
+        # Only the masked entries are worked out, since usually only a few balls change direction in a tick
+        heading = heading[mask]
+        radians = np.radians(heading)
+        self.heading[mask] = np.mod(heading, 360)
+        self.vx[mask] = self.ball_speed*np.cos(radians)
+        self.vy[mask] = self.ball_speed*np.sin(radians)
+
+    def restart_rounds(self, mask):
+        """
+        Puts the balls of the masked matches back in the center with new directions and re-centers their paddles
+        :param mask: Boolean array of matches to restart
+        """
+        self.x[mask] = 0
+        self.y[mask] = 0
+        self.paddle_1_y[mask] = 0
+        self.paddle_2_y[mask] = 0
+        self.set_heading(mask, self.rng.choice(self.starting_headings, self.num_matches))
+        # If ball starts moving to the right, CPU needs to react right away
+        self.cpu.set_react_x(mask & ~self.moving_left(), self.rng, ball_reset=True)
+
+    def reset_matches(self, mask):
+        """
+        Starts the masked matches over at 0-0
+        :param mask: Boolean array of matches to start over
+        """
+        self.scores[mask] = 0
+        self.cpu.reset(mask)
+        self.ticks[mask] = 0
+        self.hits[mask] = 0
+        self.restart_rounds(mask)
+
+    def moving_left(self):
+        """
+        :return: Boolean array that is True for matches whose ball is moving left
+        """
+        return (90 < self.heading) & (self.heading < 270)
+
+    def is_over(self):
+        """
+        :return: Boolean array that is True for matches where either player has reached the winning score
+        """
+        return (self.scores >= self.winning_score).any(axis=1)
+
+    def winners(self):
+        """
+        :return: Array of the number of the player who won each match; 0 if the match isn't over
+        """
+        won = self.scores >= self.winning_score
+        return np.where(won[:, 0], 1, np.where(won[:, 1], 2, 0))
+
+    def move_paddles(self, paddle_y, mask_up, mask_down, paddle_speed):
+        """
+        Moves paddles up or down by paddle_speed unless they are touching a wall
+        :param paddle_y: Array of paddle y positions, changed in place
+        :param mask_up: Boolean array of paddles to move up
+        :param mask_down: Boolean array of paddles to move down
+        :param paddle_speed: Distance to move the paddles
+        """
+        half_height = self.screen_height/2
+        paddle_y[mask_up & (self.half_length < half_height - paddle_y)] += paddle_speed
+        paddle_y[mask_down & (self.half_length < half_height + paddle_y)] -= paddle_speed
+
+    def step(self, player_1_moves=None):
+        """
+        Advances every match that isn't over by one tick
+        :param player_1_moves: Array of Player 1's move in each match (1 for up, -1 for down, 0 to stay put);
+                Player 1 stays put if None
+        :return: Boolean array that is True for matches where a point was scored this tick
+        """
+        active = ~self.is_over()
+        if player_1_moves is not None:
+            self.move_paddles(self.paddle_1_y, active & (player_1_moves > 0), active & (player_1_moves < 0),
+                              self.paddle_speed)
+        self.cpu.step(self.paddle_2_y, self.x, self.y, self.heading, active, self.moving_left(), self.rng)
+        point, hit_1, _ = self.move_balls(active)
+        # CPU picks a new reaction position after Player 1 hits the ball
+        if hit_1.any():
+            self.cpu.set_react_x(hit_1, self.rng)
+        restart = point & ~self.is_over()
+        if restart.any():
+            self.restart_rounds(restart)
+        return point
+
+    def move_balls(self, active):
+        """
+        Moves the balls of the active matches for one tick, bouncing them off walls and paddles and scoring points
+        :param active: Boolean array of matches that aren't over
+        :return: (point, hit_1, hit_2) Boolean arrays that are True for matches where a point was scored, where
+                Player 1's paddle hit the ball, and where Player 2's paddle hit the ball this tick
+        """
+        half_height = self.screen_height/2
+        self.ticks += active
+        self.x += np.where(active, self.vx, 0)
+        self.y += np.where(active, self.vy, 0)
+        wall = active & (half_height - np.abs(self.y) < self.radius)
+        self.heading = np.where(wall, np.mod(-self.heading, 360), self.heading)
+        self.vy = np.where(wall, -self.vy, self.vy)
+        # Check if round over
+        rest = active & ~wall
+        point = rest & (self.screen_width/2 - np.abs(self.x) < self.radius)
+        left = self.moving_left()
+        if point.any():
+            self.scores[:, 1] += point & left
+            self.scores[:, 0] += point & ~left
+        # Check for paddle collisions
+        rest &= ~point
+        near_1 = rest & (self.x - self.radius <= self.paddle_1_x + PADDLE_HALF_WIDTH)
+        near_2 = rest & ~near_1 & (self.x + self.radius >= self.paddle_2_x - PADDLE_HALF_WIDTH)
+        hit_1 = near_1 & left & (np.abs(self.y - self.paddle_1_y) <= self.half_length)
+        hit_2 = near_2 & ~left & (np.abs(self.y - self.paddle_2_y) <= self.half_length)
+        if hit_1.any() or hit_2.any():
+            # Determines strength of paddle directional influence
+            # (0 if ball hits middle of paddle, 1 if top, and -1 if bottom)
+            di = np.where(hit_1, self.y - self.paddle_1_y, self.y - self.paddle_2_y)*0.8/self.half_length
+            self.set_heading(hit_1 | hit_2, np.where(hit_1, 90*di, 180 - 90*di))
+            self.hits += hit_1 | hit_2
+        return point, hit_1, hit_2
+
+    def play(self, player_1_controller=None, max_ticks=None):
+        """
+        Plays every match to completion
+        :param player_1_controller: Function called with this batch each tick that returns an array of
+                Player 1's moves; Player 1 stays put if None
+        :param max_ticks: Stop after this many ticks even if some matches aren't over; no limit if None
+        :return: Array of the number of the player who won each match; 0 if stopped by max_ticks
+        """
+        tick = 0
+        while not self.is_over().all():
+            if max_ticks is not None and tick >= max_ticks:
+                break
+            self.step(None if player_1_controller is None else player_1_controller(self))
+            tick += 1
+        return self.winners()
@@ -0,0 +1,258 @@
+"""Benchmark Suite File
+
+Run this script to time the game's hot paths and compare them against the stored baseline:
+    python benchmark.py            compare against benchmark_baseline.json; exits with 1 on a regression
+    python benchmark.py --save     store the current timings as the new baseline
+
+Timings depend on the machine, so save a baseline on the machine the comparisons will run on.
+Rendering benchmarks only run when a display is available (e.g. under xvfb-run).
+"""
+
+import argparse
+import json
+import os
+import random
+import timeit
+from physics import BallState, PaddleState, paddle_collision, simulate_ball_path, predict_ball_path
+from rules import Match
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# Headings that cross the court with no bounces up to several bounces
+PREDICTION_HEADINGS = (0, 30, 60, 75, 85)
+# Each benchmark is a function that sets up and returns (function to time, operations per call)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark setup function under the given name
+    :param name: Name of the benchmark
+    :return: Decorator that registers the function
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark("cart2pol")
+def bench_cart2pol():
+    from ball import cart2pol
+    return lambda: cart2pol([2.4, 1.8]), 1
+
+
+@benchmark("pol2cart")
+def bench_pol2cart():
+    from ball import pol2cart
+    return lambda: pol2cart([3, 37]), 1
+
+
+@benchmark("ball_state_deflect")
+def bench_ball_state_deflect():
+    ball = BallState(3, 37)
+    return lambda: ball.deflect('y'), 1
+
+
+@benchmark("directional_influence")
+def bench_directional_influence():
+    paddle = PaddleState(2, 5, 800)
+    return lambda: paddle.directional_influence(23.5), 1
+
+
+@benchmark("paddle_collision")
+def bench_paddle_collision():
+    ball = BallState(3, 20, 362, 10)
+    paddle_1 = PaddleState(1, 5, 800)
+    paddle_2 = PaddleState(2, 5, 800)
+    return lambda: paddle_collision(ball, paddle_1, paddle_2), 1
+
+
+def register_prediction_benchmarks():
+    """
+    Registers simulate_ball_path and predict_ball_path benchmarks for each heading in PREDICTION_HEADINGS
+    """
+    paddle = PaddleState(2, 5, 800)
+    for heading in PREDICTION_HEADINGS:
+        ball = BallState(3, heading, -350, 0)
+        for name, predict in (("simulate_ball_path", simulate_ball_path), ("predict_ball_path", predict_ball_path)):
+            benchmark(f"{name}[{heading}]")(
+                lambda predict=predict, ball=ball: (lambda: predict(ball, 3, paddle, 500), 1))
+
+
+register_prediction_benchmarks()
+
+
+@benchmark("headless_match_tick")
+def bench_headless_match():
+    def play():
+        match = Match(rng=random.Random(0))
+        match.play()
+    match = Match(rng=random.Random(0))
+    match.play()
+    # Same seed every time, so every call plays the same number of ticks
+    return play, match.ticks
+
+
+@benchmark("batch_step_10000")
+def bench_batch_step():
+    from batch import BatchMatch
+    # Matches never end, so every step does the same amount of work
+    batch = BatchMatch(10000, winning_score=10**9, seed=0)
+    return batch.step, 1
+
+
+def display_screen():
+    """
+    :return: A turtle Screen if a display is available; None if not
+    """
+    try:
+        from turtle import Screen
+        screen = Screen()
+    except Exception:
+        return None
+    screen.tracer(0)
+    return screen
+
+
+@benchmark("ball_deflect")
+def bench_ball_deflect():
+    from ball import Ball
+    if display_screen() is None:
+        return None
+    ball = Ball(3)
+    return lambda: ball.deflect('y'), 1
+
+
+@benchmark("render_frame_canvas")
+def bench_render_canvas():
+    from renderer import CanvasRenderer
+    screen = display_screen()
+    if screen is None:
+        return None
+    return render_frames(CanvasRenderer(Match(rng=random.Random(0)), screen))
+
+
+@benchmark("render_frame_turtle")
+def bench_render_turtle():
+    from renderer import TurtleRenderer
+    screen = display_screen()
+    if screen is None:
+        return None
+    return render_frames(TurtleRenderer(Match(rng=random.Random(0)), screen))
+
+
+def render_frames(renderer):
+    """
+    :param renderer: Renderer to draw with
+    :return: (function that advances the match two ticks and draws a frame, 1)
+    """
+    def frame():
+        previous = renderer.match.positions()
+        for _ in range(2):
+            if renderer.match.step() == "point":
+                renderer.match.restart_round()
+        renderer.draw(previous, 0.5)
+    return frame, 1
+
+
+def time_benchmark(function, operations, repeat=5):
+    """
+    :param function: Function to time
+    :param operations: Number of operations each call of the function does
+    :param repeat: Number of timing runs; the fastest is kept
+    :return: Seconds per operation
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number))/number/operations
+
+
+def run(names):
+    """
+    :param names: Names of the benchmarks to run
+    :return: dict mapping each benchmark that could run to its seconds per operation
+    """
+    results = {}
+    for name in names:
+        try:
+            setup = BENCHMARKS[name]()
+        except ImportError:
+            setup = None
+        if setup is None:
+            print(f"{name:<28} skipped (needs a display or missing dependency)")
+            continue
+        results[name] = time_benchmark(*setup)
+        print(f"{name:<28} {format_time(results[name])}")
+    return results
+
+
+def format_time(seconds):
+    """
+    :param seconds: Time in seconds
+    :return: Time as a string in the most readable unit
+    """
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds/scale:9.3f} {unit}"
+    return f"{seconds/1e-9:9.1f} ns"
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints each benchmark's change from the baseline
+    :param results: dict of seconds per operation from this run
+    :param baseline: dict of seconds per operation from the baseline
+    :param threshold: Fraction slower than the baseline that counts as a regression
+    :return: List of names of benchmarks that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<28} {'-':>12} {format_time(seconds):>12}")
+            continue
+        change = seconds/baseline[name] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28} {format_time(baseline[name]):>12} {format_time(seconds):>12} {change:+8.1%}{flag}")
+    if "headless_match_tick" in results:
+        match = Match(rng=random.Random(0))
+        match.play()
+        tick_time = results["headless_match_tick"]
+        print(f"\nheadless matches: {1/tick_time:,.0f} ticks/sec, {1/(tick_time*match.ticks):,.1f} matches/sec")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the game's hot paths and compare against a baseline")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run; all if none given")
+    parser.add_argument("--save", action="store_true", help="Store this run's timings as the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Path of the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Fraction slower than the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.names or list(BENCHMARKS))
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if compare(results, baseline, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
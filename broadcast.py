@@ -0,0 +1,505 @@
+"""Broadcast File
+
+Contains BroadcastServer class, which streams a match's state to any number of spectators over TCP from a
+background thread, DeltaEncoder class, which turns each tick's state into a keyframe or a compact binary delta,
+and DeltaDecoder class, which turns the stream back into states.
+
+Each tick's state is the ball's position and heading, both paddles' y values, and the scores, rounded to the
+precision in POSITION_SCALE and HEADING_SCALE. A delta holds a byte marking which of those fields changed since
+the previous tick, followed by only the changed fields (the ball's position as one-byte differences); the ball
+moves every tick, but the heading, the paddles (often idle), and the scores (at a point) change much less often.
+A keyframe with every field is sent every KEYFRAME_INTERVAL ticks, and at the start of a new match. A spectator
+who joins mid-match is sent the latest keyframe and the deltas since, then the live stream.
+
+The game loop only copies each tick's values into a queue (publish()); encoding and sending happen in the
+background thread, a few times per frame's worth of ticks.
+
+Run this script to watch a match being broadcast on port 5001, printing each point:
+    python broadcast.py --watch 127.0.0.1:5001
+or to measure the bytes per second each spectator receives and the cost of encoding, with 1, 10, and 100
+spectators on localhost:
+    python broadcast.py --benchmark
+"""
+
+import argparse
+import asyncio
+import atexit
+import collections
+import struct
+import threading
+import time
+
+# Kinds of messages
+KEYFRAME = 0
+DELTAS = 1
+# Kind, tick, ball x, ball y, ball heading, Player 1 paddle y, Player 2 paddle y, Player 1 score, Player 2 score
+KEYFRAME_MESSAGE = struct.Struct("<BIhhHhhBB")
+# Kind, number of ticks, number of bytes of deltas that follow; the ticks follow on from the previous message's.
+# Each delta is a byte with a bit set for each field that changed, followed by the changed fields in order
+DELTAS_HEADER = struct.Struct("<BBH")
+FIELDS = ("ball_x", "ball_y", "ball_heading", "paddle_1_y", "paddle_2_y", "score_1", "score_2")
+FIELD_FORMATS = tuple(struct.Struct(f"<{code}") for code in "hhHhhBB")
+# Bit set in a delta when the ball's x and y are sent as one-byte differences from the previous tick (which
+# they almost always fit in) instead of in full
+SMALL_BALL_MOVE = 1 << len(FIELDS)
+BALL_MOVE_FORMAT = struct.Struct("<b")
+# Positions are sent in 1/8 pixels and the heading in 1/100 degrees
+POSITION_SCALE = 8
+HEADING_SCALE = 100
+FULL_CIRCLE = 360*HEADING_SCALE
+# Ranges of the integers positions and scores are sent as (see FIELD_FORMATS); values outside are clamped
+POSITION_RANGE = (-(1 << 15), (1 << 15) - 1)
+SCORE_RANGE = (0, 255)
+# Ticks between keyframes
+KEYFRAME_INTERVAL = 120
+# Seconds between sending the ticks published since the last send
+FLUSH_INTERVAL = 1/60
+# Most ticks published but not yet encoded; the oldest are dropped if the server falls further behind
+CAPACITY = 4096
+# Most bytes waiting to be sent to one spectator before they are disconnected for being too slow
+MAX_BUFFERED = 1 << 16
+# Most bytes read at once from a spectator's connection
+READ_CHUNK = 4096
+
+BroadcastState = collections.namedtuple("BroadcastState", ("tick",) + FIELDS)
+
+
+def clamp(value, value_range):
+    """
+    :param value: Integer to clamp
+    :param value_range: (lowest, highest) value allowed
+    :return: value, or the nearest end of value_range if it is outside it
+    """
+    return min(max(value, value_range[0]), value_range[1])
+
+
+def quantize(state):
+    """
+    :param state: Tuple of (tick, ball x, ball y, ball heading, Player 1 paddle y, Player 2 paddle y,
+            Player 1 score, Player 2 score)
+    :return: Tuple of the fields in FIELDS, as the integers they are sent as, clamped to the ranges they can be
+            sent in (so a court too big for them, or a score too high, doesn't stop the broadcast)
+    """
+    _, ball_x, ball_y, heading, paddle_1_y, paddle_2_y, score_1, score_2 = state
+    return (clamp(round(ball_x*POSITION_SCALE), POSITION_RANGE), clamp(round(ball_y*POSITION_SCALE), POSITION_RANGE),
+            round(heading*HEADING_SCALE) % FULL_CIRCLE,
+            clamp(round(paddle_1_y*POSITION_SCALE), POSITION_RANGE),
+            clamp(round(paddle_2_y*POSITION_SCALE), POSITION_RANGE),
+            clamp(score_1, SCORE_RANGE), clamp(score_2, SCORE_RANGE))
+
+
+def dequantize(tick, values):
+    """
+    :param tick: Tick of the state
+    :param values: Fields in FIELDS, as the integers they are sent as
+    :return: BroadcastState with positions in pixels and the heading in degrees
+    """
+    ball_x, ball_y, heading, paddle_1_y, paddle_2_y, score_1, score_2 = values
+    return BroadcastState(tick, ball_x/POSITION_SCALE, ball_y/POSITION_SCALE, heading/HEADING_SCALE,
+                          paddle_1_y/POSITION_SCALE, paddle_2_y/POSITION_SCALE, score_1, score_2)
+
+
+class DeltaEncoder:
+    """A class to encode a stream of tick states as keyframes and deltas"""
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, clock=time.perf_counter):
+        """
+        param keyframe_interval: Ticks between keyframes
+        param clock: Function that returns the current time in seconds, for timing encoding
+        """
+        self.keyframe_interval = keyframe_interval
+        self.clock = clock
+        # Values of the last encoded tick
+        self.values = None
+        self.tick = None
+        self.keyframe_tick = None
+        # Latest keyframe and every message encoded after it, for spectators who join mid-match
+        self.keyframe = b""
+        self.since_keyframe = []
+        self.ticks_encoded = 0
+        self.seconds = 0.0
+
+    def encode(self, states):
+        """
+        :param states: List of tick states in the order they were published (see quantize())
+        :return: Bytes of the messages encoding them
+        """
+        started = self.clock()
+        messages = []
+        deltas = bytearray()
+        count = 0
+        for state in states:
+            tick = state[0]
+            values = quantize(state)
+            new_keyframe = (self.values is None or tick != self.tick + 1
+                            or tick - self.keyframe_tick >= self.keyframe_interval)
+            if count and (new_keyframe or count == 255):
+                messages.append(DELTAS_HEADER.pack(DELTAS, count, len(deltas)) + deltas)
+                self.since_keyframe.append(messages[-1])
+                deltas = bytearray()
+                count = 0
+            if new_keyframe:
+                # The tick wraps around rather than overflowing after 2**32 ticks
+                self.keyframe = KEYFRAME_MESSAGE.pack(KEYFRAME, tick & 0xFFFFFFFF, *values)
+                self.keyframe_tick = tick
+                self.since_keyframe = []
+                messages.append(self.keyframe)
+            else:
+                previous_values = self.values
+                mask_index = len(deltas)
+                deltas.append(0)
+                mask = 0
+                first_field = 0
+                move_x = values[0] - previous_values[0]
+                move_y = values[1] - previous_values[1]
+                if -128 <= move_x < 128 and -128 <= move_y < 128:
+                    mask = SMALL_BALL_MOVE
+                    first_field = 2
+                    for bit, move in enumerate((move_x, move_y)):
+                        if move:
+                            mask |= 1 << bit
+                            deltas += BALL_MOVE_FORMAT.pack(move)
+                for bit in range(first_field, len(FIELDS)):
+                    value = values[bit]
+                    if value != previous_values[bit]:
+                        field_format = FIELD_FORMATS[bit]
+                        mask |= 1 << bit
+                        deltas += field_format.pack(value)
+                deltas[mask_index] = mask
+                count += 1
+            self.values = values
+            self.tick = tick
+        if count:
+            messages.append(DELTAS_HEADER.pack(DELTAS, count, len(deltas)) + deltas)
+            self.since_keyframe.append(messages[-1])
+        self.ticks_encoded += len(states)
+        self.seconds += self.clock() - started
+        return b"".join(messages)
+
+    def catch_up(self):
+        """
+        :return: Bytes of the latest keyframe and every message since, which bring a new spectator up to date
+        """
+        return self.keyframe + b"".join(self.since_keyframe)
+
+
+class DeltaDecoder:
+    """A class to decode a stream of keyframes and deltas, which can arrive split into any pieces"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.values = None
+        self.tick = None
+
+    def feed(self, data):
+        """
+        :param data: Bytes received from the stream
+        :return: List of the BroadcastState of each tick completed by the bytes
+        """
+        buffer = self.buffer
+        buffer += data
+        states = []
+        offset = 0
+        while offset < len(buffer):
+            kind = buffer[offset]
+            if kind == KEYFRAME:
+                if len(buffer) - offset < KEYFRAME_MESSAGE.size:
+                    break
+                _, self.tick, *values = KEYFRAME_MESSAGE.unpack_from(buffer, offset)
+                self.values = values
+                states.append(dequantize(self.tick, values))
+                offset += KEYFRAME_MESSAGE.size
+            elif kind == DELTAS:
+                if len(buffer) - offset < DELTAS_HEADER.size:
+                    break
+                _, count, length = DELTAS_HEADER.unpack_from(buffer, offset)
+                if len(buffer) - offset < DELTAS_HEADER.size + length:
+                    break
+                position = offset + DELTAS_HEADER.size
+                values = self.values
+                for _ in range(count):
+                    mask = buffer[position]
+                    position += 1
+                    first_field = 0
+                    if mask & SMALL_BALL_MOVE:
+                        first_field = 2
+                        for bit in (0, 1):
+                            if mask >> bit & 1:
+                                values[bit] += BALL_MOVE_FORMAT.unpack_from(buffer, position)[0]
+                                position += 1
+                    for bit in range(first_field, len(FIELDS)):
+                        if mask >> bit & 1:
+                            field_format = FIELD_FORMATS[bit]
+                            values[bit] = field_format.unpack_from(buffer, position)[0]
+                            position += field_format.size
+                    self.tick += 1
+                    states.append(dequantize(self.tick, values))
+                offset = position
+            else:
+                raise ValueError(f"Unknown broadcast message kind {kind}")
+        del buffer[:offset]
+        return states
+
+
+class BroadcastServer:
+    """A class to stream a match's state to spectators from a background thread
+
+    publish() never blocks and does no encoding: it copies the tick's values into a queue that the server
+    thread drains every flush_interval
+    """
+
+    def __init__(self, port=0, host="127.0.0.1", keyframe_interval=KEYFRAME_INTERVAL, flush_interval=FLUSH_INTERVAL,
+                 capacity=CAPACITY):
+        """
+        param port: TCP port to listen on; 0 to pick a free one (see self.port)
+        param host: Address to listen on; "0.0.0.0" for every network interface
+        param keyframe_interval: Ticks between keyframes
+        param flush_interval: Seconds between sends
+        param capacity: Most ticks waiting to be encoded before the oldest are dropped
+        """
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+        self.encoder = DeltaEncoder(keyframe_interval)
+        self.queue = collections.deque(maxlen=capacity)
+        self.subscribers = set()
+        self.bytes_sent = 0
+        self.disconnected = 0
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self.serve, name="broadcast server", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        atexit.register(self.close)
+
+    def publish(self, match):
+        """
+        Queues the match's state after its latest tick to be sent
+        :param match: Match being broadcast
+        """
+        ball = match.ball
+        paddles = match.paddles
+        scores = match.scores
+        self.queue.append((match.ticks, ball.x, ball.y, ball.heading, paddles[0].y, paddles[1].y,
+                           scores[0], scores[1]))
+
+    def serve(self):
+        """
+        Listens for spectators and sends them the queued ticks until the server is closed (runs in the server
+        thread)
+        """
+        loop = self.loop
+        asyncio.set_event_loop(loop)
+        try:
+            self.server = loop.run_until_complete(asyncio.start_server(self.subscribe, self.host, self.port))
+        except OSError as error:
+            self.error = error
+            self.ready.set()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]
+        flusher = loop.create_task(self.flush_periodically())
+        self.ready.set()
+        loop.run_forever()
+        flusher.cancel()
+        self.flush()
+        for writer in self.subscribers:
+            writer.close()
+        self.server.close()
+        loop.run_until_complete(self.server.wait_closed())
+        loop.close()
+
+    async def subscribe(self, reader, writer):
+        """
+        Brings a new spectator up to date and adds them to the stream until they disconnect
+        :param reader: asyncio StreamReader of the spectator's connection
+        :param writer: asyncio StreamWriter of the spectator's connection
+        """
+        # Anything still queued is in neither the catch-up nor the stream yet, so encode it first
+        self.flush()
+        catch_up = self.encoder.catch_up()
+        writer.write(catch_up)
+        self.bytes_sent += len(catch_up)
+        self.subscribers.add(writer)
+        try:
+            # Spectators don't send anything; throw away whatever arrives, a chunk at a time so it can't pile up,
+            # until they disconnect
+            while await reader.read(READ_CHUNK):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def flush_periodically(self):
+        """
+        Sends the queued ticks every flush_interval
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """
+        Encodes the queued ticks and sends them to every spectator, disconnecting any who have fallen too far
+        behind
+        """
+        queue = self.queue
+        if not queue:
+            return
+        states = [queue.popleft() for _ in range(len(queue))]
+        data = self.encoder.encode(states)
+        for writer in list(self.subscribers):
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                self.subscribers.discard(writer)
+                writer.close()
+                self.disconnected += 1
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+
+    def close(self):
+        """
+        Sends the last queued ticks, disconnects every spectator, and stops the server thread
+        """
+        if not self.thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        atexit.unregister(self.close)
+
+
+async def watch(host, port, on_state, on_connected=None):
+    """
+    Receives a broadcast until the server disconnects
+    :param host: Address of the broadcast server
+    :param port: Port of the broadcast server
+    :param on_state: Function called with the BroadcastState of each tick received
+    :param on_connected: Function called with no arguments once connected; None to not call anything
+    :return: Number of bytes received
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    if on_connected is not None:
+        on_connected()
+    decoder = DeltaDecoder()
+    received = 0
+    while data := await reader.read(1 << 16):
+        received += len(data)
+        for state in decoder.feed(data):
+            on_state(state)
+    writer.close()
+    return received
+
+
+def score_printer():
+    """
+    :return: Function that takes the BroadcastState of each tick and prints the score whenever it changes
+    """
+    scores = None
+
+    def print_score(state):
+        nonlocal scores
+        if (state.score_1, state.score_2) != scores:
+            scores = (state.score_1, state.score_2)
+            print(f"tick {state.tick}: {state.score_1}-{state.score_2}")
+    return print_score
+
+
+async def benchmark_subscribers(count, seconds, tick_rate, seed):
+    """
+    Broadcasts a headless match played in real time to spectators on localhost, plus one more who joins halfway
+    through, and checks that every spectator ends up with the match's final state
+    :param count: Number of spectators from the start; 0 to play without broadcasting, for comparison
+    :param seconds: Seconds to play for
+    :param tick_rate: Ticks per second
+    :param seed: Seed for the match
+    :return: dict of the results
+    """
+    from rules import Match
+    from controllers import tracking_controller
+    loop = asyncio.get_running_loop()
+    server = BroadcastServer() if count else None
+    match = Match(seed=seed, held_paddle_speed=5)
+    controller = tracking_controller()
+    # Last state each spectator received; the late joiner is last
+    finals = [None]*(count + 1)
+    connected = [loop.create_future() for _ in range(count + 1)]
+
+    def spectator(index, delay):
+        async def run():
+            await asyncio.sleep(delay)
+
+            def on_state(state):
+                finals[index] = state
+            return await watch(server.host, server.port, on_state, lambda: connected[index].set_result(None))
+        return asyncio.create_task(run())
+
+    tasks = []
+    if count:
+        tasks = [spectator(index, 0) for index in range(count)] + [spectator(count, seconds/2)]
+        await asyncio.gather(*connected[:-1])
+    total_ticks = int(seconds*tick_rate)
+    publish_seconds = 0.0
+    step_seconds = 0.0
+    started = time.perf_counter()
+    for tick in range(total_ticks):
+        await asyncio.sleep(max(started + tick/tick_rate - time.perf_counter(), 0))
+        match.hold_paddle(1, controller(match))
+        step_started = time.perf_counter()
+        if match.step() == "point":
+            if match.is_over():
+                match.reset(seed + tick)
+            else:
+                match.restart_round()
+        publish_started = time.perf_counter()
+        if server is not None:
+            server.publish(match)
+        publish_seconds += time.perf_counter() - publish_started
+        step_seconds += publish_started - step_started
+    elapsed = time.perf_counter() - started
+    result = dict(publish_us=publish_seconds/total_ticks*1e6, step_us=step_seconds/total_ticks*1e6)
+    if server is None:
+        return result
+    # Give the spectators time to receive the last ticks
+    await asyncio.sleep(0.2)
+    server.close()
+    received = await asyncio.gather(*tasks)
+    ball = match.ball
+    expected = dequantize(match.ticks, quantize((match.ticks, ball.x, ball.y, ball.heading, match.paddles[0].y,
+                                                 match.paddles[1].y, *match.scores)))
+    return dict(result, bytes_per_second=sum(received[:-1])/count/elapsed, late_joiner_bytes=received[-1],
+                total_sent_per_second=server.bytes_sent/elapsed,
+                encode_us=server.encoder.seconds/server.encoder.ticks_encoded*1e6,
+                in_sync=sum(final == expected for final in finals), disconnected=server.disconnected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch or benchmark a broadcast match")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--watch", metavar="HOST:PORT", help="Print each point of the match broadcast at this address")
+    mode.add_argument("--benchmark", action="store_true", help="Measure the broadcast with local spectators")
+    parser.add_argument("--seconds", type=float, default=5, help="With --benchmark, seconds to play per run")
+    parser.add_argument("--seed", type=int, default=0, help="With --benchmark, seed for the match")
+    args = parser.parse_args()
+    if args.watch is not None:
+        host, port = args.watch.rsplit(":", 1)
+        asyncio.run(watch(host, int(port), score_printer()))
+        return
+    tick_rate = 120
+    baseline = asyncio.run(benchmark_subscribers(0, args.seconds, tick_rate, args.seed))
+    print(f"keyframes only would be {KEYFRAME_MESSAGE.size*tick_rate} bytes/s per spectator; "
+          f"a tick takes {baseline['step_us']:.2f} us without broadcasting")
+    print(f"{'spectators':>10} {'bytes/s each':>13} {'total bytes/s':>14} {'late join B':>12} {'publish us':>11} "
+          f"{'encode us/tick':>15} {'step us':>8} {'in sync':>8}")
+    for count in (1, 10, 100):
+        result = asyncio.run(benchmark_subscribers(count, args.seconds, tick_rate, args.seed))
+        print(f"{count:>10} {result['bytes_per_second']:>13.0f} {result['total_sent_per_second']:>14.0f} "
+              f"{result['late_joiner_bytes']:>12} {result['publish_us']:>11.2f} {result['encode_us']:>15.2f} "
+              f"{result['step_us']:>8.2f} {result['in_sync']:>4}/{count + 1:<3}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Game Clock Class File
+
+Contains FixedTimestep class for running the game's physics at a fixed rate independent of the frame rate
+"""
+
+import time
+
+
+class FixedTimestep:
+    """A class to pace the game loop
+
+    Physics ticks are run at a fixed tick_rate no matter how long drawing takes, frames are drawn at most
+    frame_rate times per second, and the loop sleeps in between frames instead of spinning
+    """
+
+    def __init__(self, tick_rate=120, frame_rate=60, max_ticks_per_frame=8, clock=time.perf_counter,
+                 sleep=time.sleep):
+        """
+        param tick_rate: Physics ticks per second
+        param frame_rate: Most frames to draw per second
+        param max_ticks_per_frame: Most ticks to run before drawing a frame; time beyond that (e.g. after the
+                window was dragged) is dropped so the game slows down instead of trying to catch up forever
+        param clock: Function that returns the current time in seconds
+        param sleep: Function that waits for a given number of seconds
+        """
+        self.tick_length = 1/tick_rate
+        self.frame_length = 1/frame_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.clock = clock
+        self.sleep = sleep
+        self.reset()
+
+    def reset(self):
+        """
+        Restarts timing from now, e.g. after a pause, so the paused time isn't caught up on
+        """
+        self.previous_time = self.clock()
+        self.next_frame = self.previous_time
+        self.accumulator = 0.0
+
+    def wait_for_frame(self):
+        """
+        Sleeps until the next frame is due
+        :return: Number of physics ticks to run before drawing the frame
+        """
+        now = self.clock()
+        if now < self.next_frame:
+            self.sleep(self.next_frame - now)
+            now = self.clock()
+        self.next_frame += self.frame_length
+        # Don't try to make up for missed frames
+        if self.next_frame < now:
+            self.next_frame = now + self.frame_length
+        self.accumulator = min(self.accumulator + now - self.previous_time,
+                               self.max_ticks_per_frame*self.tick_length)
+        self.previous_time = now
+        # Small allowance so floating point error doesn't put a whole tick off until the next frame
+        ticks = int(self.accumulator/self.tick_length + 1e-9)
+        self.accumulator -= ticks*self.tick_length
+        return ticks
+
+    @property
+    def alpha(self):
+        """
+        :return: How far between the last tick and the next one the current frame is (0 to 1),
+                for drawing moving objects in between their positions at those ticks
+        """
+        return max(self.accumulator/self.tick_length, 0.0)
@@ -0,0 +1,40 @@
+"""Controllers File
+
+Contains scripted stand-ins for human players, for playing matches without a keyboard in soak tests,
+benchmarks, netplay, broadcast, and multi-ball tests, and parameter sweeps
+"""
+
+
+def tracking_controller(dead_zone=10, player_number=1):
+    """
+    Creates a simple stand-in for a human player, who holds up or down towards the ball that is coming towards
+    them (the one that will reach them first, if there are several)
+    :param dead_zone: The player doesn't move if the ball is within this distance of the paddle center
+    :param player_number: Number of the player the stand-in plays as (1 on the left, 2 on the right)
+    :return: Function that takes a Match (or MultiBallMatch) and returns the direction to hold the player's
+            paddle in
+    """
+    def controller(match):
+        ball_y = match.incoming_ball_y(player_number)
+        if ball_y is None:
+            return 0
+        offset = ball_y - match.paddles[player_number - 1].y
+        return (offset > dead_zone) - (offset < -dead_zone)
+    return controller
+
+
+def batch_tracking_controller(press_interval=10, dead_zone=10):
+    """
+    Creates a simple stand-in for a human Player 1 in every match of a BatchMatch, who taps up or down towards
+    the ball every press_interval ticks while the ball is coming towards them
+    :param press_interval: Number of ticks between key presses
+    :param dead_zone: Player 1 doesn't move if the ball is within this distance of the paddle center
+    :return: Function that takes a BatchMatch and returns an array of Player 1's moves
+    """
+    import numpy as np
+
+    def controller(batch):
+        offset = batch.y - batch.paddle_1_y
+        moves = np.where(offset > dead_zone, 1, np.where(offset < -dead_zone, -1, 0))
+        return np.where(batch.moving_left() & (batch.ticks % press_interval == 0), moves, 0)
+    return controller
@@ -0,0 +1,143 @@
+"""CPU Brain Class File
+
+Contains the turtle-free reaction logic for the CPU player
+"""
+
+import random
+
+
+def default_react_x_range(screen_width):
+    """
+    :param screen_width: The width of the court
+    :return: (lowest, highest) x positions where the CPU reacts after Player 1's shot
+    """
+    return -screen_width//8 + 50, screen_width//8 + 50
+
+
+def default_di_intent_range(paddle_length):
+    """
+    :param paddle_length: The length of the CPU's paddle
+    :return: (lowest, highest) offsets from the ball that the CPU aims its paddle center at
+    """
+    return -paddle_length*10, paddle_length*10
+
+
+class CPUBrain:
+    """A class to represent the decision making of the CPU player
+
+    Reacts to the ball in a human-like imperfect manner: waits until the ball crosses a random x position,
+    predicts where the ball will reach the paddle, and aims slightly off center of that prediction
+    """
+
+    def __init__(self, paddle_length, screen_width, screen_height, rng=random, react_x_range=None,
+                 di_intent_range=None):
+        """
+        param paddle_length: The length of the CPU's paddle
+        param screen_width: The width of the screen the CPU operates in
+        param screen_height: The height of the screen the CPU operates in
+        param rng: Random number generator for reaction position and aim; defaults to the random module
+        param react_x_range: (lowest, highest) integer x positions where the CPU can react after Player 1's shot;
+                defaults to within screen_width/8 of x=50
+        param di_intent_range: (lowest, highest) offset from the ball that the CPU aims its paddle center at;
+                defaults to anywhere on the paddle
+        """
+        self.paddle_length = paddle_length
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.rng = rng
+        self.react_x_range = react_x_range or default_react_x_range(screen_width)
+        self.di_intent_range = di_intent_range or default_di_intent_range(paddle_length)
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets any reaction, as at the start of a match
+        """
+        self.reacted = False
+        # Setting react_x to screen_width to start ensures ball will never cross react_x before reaction
+        self.react_x = self.screen_width
+        self.di_intent = 0
+        self.future_y = None
+        self.stop_moving = False
+
+    def snapshot(self):
+        """
+        :return: State kept beyond the reaction fields saved by Match.snapshot() (reacted, react_x, di_intent,
+                future_y, stop_moving); None since CPUBrain has none
+        """
+        return None
+
+    def restore(self, state):
+        """
+        Puts back state from snapshot()
+        :param state: What snapshot() returned
+        """
+
+    def set_react_x(self, ball_reset=False):
+        """
+        Finds x position on screen where CPU reacts after ball hits Player 1's paddle
+        (or ball starts by moving to CPU's paddle)
+        :param ball_reset: True if ball on reset starts by moving towards CPU's paddle
+                (because might be out of range for normal reaction)
+        """
+        # x position where CPU reacts after ball hits Player 1's paddle
+        if ball_reset:
+            self.react_x = 0
+            self.stop_moving = False
+        else:
+            self.react_x = self.rng.randint(*self.react_x_range)
+        self.reacted = False
+
+    def react(self, future_y):
+        """
+        Makes calculated future_y be an attribute of the CPU object to use for
+        moving towards where ball will be
+
+        Stops CPU from reacting again until needed
+
+        Determines where CPU's paddle should aim to be, given an offset from ball center
+        to apply direction influence (di)
+        :param future_y: The y value on the screen where the current ball will be
+                once it reaches the CPU's paddle
+        """
+        self.future_y = future_y
+        self.reacted = True
+        self.stop_moving = False
+        self.react_x = self.screen_width
+        # di_intent makes it so that CPU doesn't always aim to hit exactly in the center of the paddle
+        self.di_intent = self.rng.uniform(*self.di_intent_range)
+
+    def move(self, ball, paddle, paddle_speed, opponent_paddle):
+        """
+        Moves the CPU's paddle for one tick: towards where the ball will be after reacting,
+        and back towards the center once the ball is returning to the opponent
+        :param ball: The ball in play
+        :param paddle: The CPU's paddle
+        :param paddle_speed: Distance the CPU's paddle moves each tick
+        :param opponent_paddle: Player 1's paddle
+        """
+        half_height = self.screen_height/2
+        # Move towards where ball will be if reacting
+        if self.reacted and not self.stop_moving:
+            target_y = self.future_y + self.di_intent
+            if paddle.y < min(target_y, half_height):
+                paddle.move_up(paddle_speed, self.screen_height)
+                if paddle.y >= min(target_y, half_height):
+                    self.stop_moving = True
+            elif paddle.y > max(target_y, -half_height):
+                paddle.move_down(paddle_speed, self.screen_height)
+                if paddle.y <= max(target_y, -half_height):
+                    self.stop_moving = True
+        # Move back towards center if ball moving back towards Player 1
+        if ball.left_right() == "left":
+            # In case CPU never had to move paddle to meet future ball position
+            self.stop_moving = True
+            # Don't start moving back to center until ball is close to the other player's paddle, and don't continue
+            # after hitting Player 1's paddle if the paddle hasn't reached center yet
+            if ball.x <= opponent_paddle.x + 100:
+                # Don't move paddle if within half a paddle_speed unit (the amount a move_paddle method moves by)
+                # to avoid overshoot
+                if paddle.y < 0 - paddle_speed/2:
+                    paddle.move_up(paddle_speed, self.screen_height)
+                elif paddle.y > 0 + paddle_speed/2:
+                    paddle.move_down(paddle_speed, self.screen_height)
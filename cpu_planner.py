@@ -0,0 +1,226 @@
+"""CPU Planner Class File
+
+Contains PlanningCPUBrain class, a CPU that aims its returns away from Player 1 instead of at a random spot on
+its paddle. The search for the best aim is spread over the ticks between the CPU's reaction and the ball
+arriving, with a fixed number of aims tried per tick, so a harder CPU (more aims to try) never makes a tick take
+longer; it only finishes its search later, and always has its best aim so far to move towards.
+
+Run this script to time a tick of the planning CPU at each difficulty (and of CPUBrain, as "none"), and to see how
+often each beats a Player 1 who moves straight to where the ball will arrive:
+    python cpu_planner.py
+"""
+
+import math
+import random
+from physics import BallState, predict_ball_path
+from cpu_brain import CPUBrain
+
+# Total number of aims each difficulty tries per reaction
+DIFFICULTIES = {"easy": 4, "medium": 16, "hard": 64, "expert": 256}
+# Aims tried per tick; each is one prediction of the return, about a microsecond
+EVALUATIONS_PER_TICK = 16
+# Distance to keep the ball from the ends of the paddle, in case the paddle stops slightly off its target
+# or its aim noise moves it
+AIM_MARGIN = 8
+
+
+def aim_order(count):
+    """
+    :param count: Number of aims to try
+    :return: List of fractions (0 to 1) of the aim range, in an order that starts at the middle and then fills
+            the range in coarse to fine (van der Corput sequence), so a search stopped early has still covered
+            the whole range
+    """
+    fractions = []
+    for index in range(1, count + 1):
+        fraction = 0.0
+        denominator = 1
+        while index:
+            denominator *= 2
+            index, bit = divmod(index, 2)
+            fraction += bit/denominator
+        fractions.append(fraction)
+    return fractions
+
+
+class PlanningCPUBrain(CPUBrain):
+    """A class to represent a CPU that picks where on its paddle to hit the ball
+
+    After reacting, each tick tries a few aims (offsets of the paddle center from where the ball will arrive),
+    predicts where each return would reach Player 1's paddle, and keeps the aim that leaves Player 1 furthest
+    from the ball after allowing for how far they can move before it arrives. Until the first aim is tried,
+    the CPU moves towards its random aim like CPUBrain. A little random noise is added to each planned aim, so
+    rallies against a predictable opponent don't repeat forever.
+    """
+
+    def __init__(self, paddle_length, screen_width, screen_height, rng=random, react_x_range=None,
+                 di_intent_range=None, difficulty="medium", evaluations_per_tick=EVALUATIONS_PER_TICK,
+                 ball_speed=3, predict=predict_ball_path, opponent_speed=5, aim_noise=4):
+        """
+        param paddle_length, screen_width, screen_height, rng, react_x_range: See CPUBrain
+        param di_intent_range: (lowest, highest) offsets from the ball the CPU can aim its paddle center at;
+                defaults to anywhere on the paddle
+        param difficulty: Name of the difficulty in DIFFICULTIES (how many aims to try per reaction)
+        param evaluations_per_tick: Most aims to try per tick
+        param ball_speed: Distance the ball moves per tick
+        param predict: Function that predicts where a ball will reach a right-hand paddle (see physics.py)
+        param opponent_speed: Distance the CPU assumes Player 1's paddle can move per tick
+        param aim_noise: Most distance the CPU's paddle center misses its planned aim by
+        """
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Unknown difficulty {difficulty!r}; choose from {', '.join(DIFFICULTIES)}")
+        super().__init__(paddle_length, screen_width, screen_height, rng, react_x_range, di_intent_range)
+        self.difficulty = difficulty
+        self.aims = aim_order(DIFFICULTIES[difficulty])
+        self.evaluations_per_tick = evaluations_per_tick
+        self.ball_speed = ball_speed
+        self.predict = predict
+        self.opponent_speed = opponent_speed
+        self.aim_noise = aim_noise
+        # Ball used to predict returns, reused so planning doesn't create objects
+        self.return_ball = BallState(ball_speed)
+
+    def reset(self):
+        """
+        Forgets any reaction and plan, as at the start of a match
+        """
+        super().reset()
+        self.next_aim = 0
+        self.best_score = -math.inf
+        self.noise = 0.0
+
+    def snapshot(self):
+        """
+        :return: Tuple of the plan's progress (next aim to try, best score so far, aim noise), so that restoring a
+                Match snapshot carries on the same search
+        """
+        return self.next_aim, self.best_score, self.noise
+
+    def restore(self, state):
+        """
+        Puts back the plan's progress from snapshot()
+        :param state: What snapshot() returned
+        """
+        self.next_aim, self.best_score, self.noise = state
+
+    def react(self, future_y):
+        """
+        Makes future_y the target like CPUBrain.react, keeping its random aim until the plan finds a better one
+        :param future_y: The y value on the screen where the current ball will be
+                once it reaches the CPU's paddle
+        """
+        super().react(future_y)
+        self.next_aim = 0
+        self.best_score = -math.inf
+        self.noise = self.rng.uniform(-self.aim_noise, self.aim_noise)
+
+    def score_aim(self, target_y, paddle, opponent_paddle):
+        """
+        :param target_y: y position of the CPU's paddle center when the ball arrives
+        :param paddle: The CPU's paddle
+        :param opponent_paddle: Player 1's paddle
+        :return: How far Player 1's paddle would be from reaching the return, in pixels (higher is better);
+                -inf if the ball would miss the paddle
+        """
+        half_length = paddle.half_length
+        offset = self.future_y - target_y
+        if abs(offset) > half_length - AIM_MARGIN:
+            return -math.inf
+        # Where the ball will leave the paddle, mirrored so that it moves right towards a paddle at the CPU's x,
+        # which is where Player 1's paddle is in the mirrored court
+        ball = self.return_ball
+        ball.x = -(paddle.x - paddle.half_width - ball.radius)
+        ball.y = self.future_y
+        ball.set_heading(90*offset*0.8/half_length)
+        landing_y = self.predict(ball, self.ball_speed, paddle, self.screen_height)
+        ticks = (paddle.x - paddle.half_width - ball.radius - ball.x)/ball.vx
+        return abs(landing_y - opponent_paddle.y) - opponent_paddle.half_length - self.opponent_speed*ticks
+
+    def plan(self, ball, paddle, paddle_speed, opponent_paddle):
+        """
+        Tries up to evaluations_per_tick more aims, and moves the target to the best one found so far
+        :param ball: The ball in play
+        :param paddle: The CPU's paddle
+        :param paddle_speed: Distance the CPU's paddle moves each tick
+        :param opponent_paddle: Player 1's paddle
+        """
+        if not self.reacted or self.next_aim >= len(self.aims) or ball.vx <= 0:
+            return
+        low, high = self.di_intent_range
+        # The paddle stops once its end reaches a wall
+        highest_y = self.screen_height/2 - paddle.half_length
+        # Only aims the paddle can reach before the ball arrives are worth trying
+        ticks_left = max((paddle.x - paddle.half_width - ball.radius - ball.x)/ball.vx, 0)
+        reach = paddle_speed*ticks_left
+        stop = min(self.next_aim + self.evaluations_per_tick, len(self.aims))
+        for fraction in self.aims[self.next_aim:stop]:
+            aim = low + fraction*(high - low)
+            target_y = min(max(self.future_y + aim, -highest_y), highest_y)
+            if abs(target_y - paddle.y) > reach:
+                continue
+            score = self.score_aim(target_y, paddle, opponent_paddle)
+            if score > self.best_score:
+                self.best_score = score
+                self.di_intent = aim + self.noise
+                # Start moving again if the paddle had already reached the old target
+                self.stop_moving = False
+        self.next_aim = stop
+
+    def move(self, ball, paddle, paddle_speed, opponent_paddle):
+        """
+        Refines the plan, then moves the CPU's paddle for one tick like CPUBrain.move
+        :param ball: The ball in play
+        :param paddle: The CPU's paddle
+        :param paddle_speed: Distance the CPU's paddle moves each tick
+        :param opponent_paddle: Player 1's paddle
+        """
+        self.plan(ball, paddle, paddle_speed, opponent_paddle)
+        super().move(ball, paddle, paddle_speed, opponent_paddle)
+
+
+def main():
+    import time
+    from rules import Match
+    MAX_TICKS = 500000
+    # Player 1 is a stand-in that moves straight to where the ball will arrive, slowly enough to be beaten
+    player_1_speed = 1
+
+    def player_1_direction(match, ghost):
+        ball = match.ball
+        if ball.left_right() != "left":
+            return 0
+        # Mirror the ball so its path to Player 1's paddle can be predicted like a path to the right-hand paddle
+        ghost.x = -ball.x
+        ghost.y = ball.y
+        ghost.set_heading(180 - ball.heading)
+        offset = predict_ball_path(ghost, match.ball_speed, match.paddles[1], match.screen_height) \
+            - match.paddles[0].y
+        return (offset > player_1_speed) - (offset < -player_1_speed)
+
+    print(f"{'difficulty':<10} {'aims':>5} {'mean tick us':>13} {'p99.99 tick us':>15} {'max tick us':>12} "
+          f"{'CPU win rate':>13}")
+    for difficulty, aims in [("none", 0)] + list(DIFFICULTIES.items()):
+        tick_times = []
+        wins = 0
+        matches = 50
+        for seed in range(matches):
+            match = Match(seed=seed, planner=None if difficulty == "none" else difficulty,
+                          held_paddle_speed=player_1_speed)
+            ghost = BallState(match.ball_speed)
+            # Stop a rally that never ends from hanging the timing
+            while not match.is_over() and match.ticks < MAX_TICKS:
+                match.hold_paddle(1, player_1_direction(match, ghost))
+                started = time.perf_counter()
+                event = match.step()
+                tick_times.append(time.perf_counter() - started)
+                if event == "point" and not match.is_over():
+                    match.restart_round()
+            wins += match.winner() == 2
+        tick_times.sort()
+        print(f"{difficulty:<10} {aims:>5} {sum(tick_times)/len(tick_times)*1e6:>13.2f} "
+              f"{tick_times[int(len(tick_times)*0.9999)]*1e6:>15.2f} {tick_times[-1]*1e6:>12.2f} "
+              f"{wins/matches:>13.0%}")
+
+
+if __name__ == "__main__":
+    main()
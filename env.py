@@ -0,0 +1,133 @@
+"""Environment File
+
+Contains Gym-style reset()/step() environments for training a controller for Player 1 against the CPU:
+PongEnv plays one match with rules.Match, and VectorPongEnv plays many at once with batch.BatchMatch.
+Both are headless.
+
+Each step holds Player 1's paddle up (1), down (-1), or still (0) for frame_skip ticks. Observations are
+(ball x, ball y, ball x velocity, ball y velocity, Player 1 paddle y, CPU paddle y), and the reward is the
+points Player 1 scored minus the points the CPU scored during the step. An episode is one match.
+"""
+
+import numpy as np
+from rules import Match
+from batch import BatchMatch
+
+OBSERVATION_FIELDS = ("ball_x", "ball_y", "ball_vx", "ball_vy", "paddle_1_y", "paddle_2_y")
+
+
+class PongEnv:
+    """A class to represent one match as an environment"""
+
+    def __init__(self, frame_skip=4, held_paddle_speed=5, **settings):
+        """
+        param frame_skip: Number of ticks each step holds the action for
+        param held_paddle_speed: Distance Player 1's paddle moves per tick while held
+        param settings: Other keyword arguments for Match (other than seed)
+        """
+        self.frame_skip = frame_skip
+        self.settings = dict(settings, held_paddle_speed=held_paddle_speed)
+        self.match = None
+        self.observation = np.zeros(len(OBSERVATION_FIELDS))
+
+    def observe(self):
+        """
+        :return: The observation buffer, filled in with the match's current state
+        """
+        ball = self.match.ball
+        observation = self.observation
+        observation[0] = ball.x
+        observation[1] = ball.y
+        observation[2] = ball.vx
+        observation[3] = ball.vy
+        observation[4] = self.match.paddles[0].y
+        observation[5] = self.match.paddles[1].y
+        return observation
+
+    def reset(self, seed=None):
+        """
+        Starts a new match
+        :param seed: Seed for the match; unpredictable if None
+        :return: First observation (the same array is reused by later steps)
+        """
+        if self.match is None or seed is None:
+            self.match = Match(**self.settings, seed=seed)
+        else:
+            self.match.reset(seed)
+        return self.observe()
+
+    def step(self, action):
+        """
+        :param action: 1 to hold Player 1's paddle up, -1 to hold it down, 0 to keep it still
+        :return: (observation, reward, True if the match is over, dict of the match's scores and ticks)
+        """
+        match = self.match
+        match.hold_paddle(1, action)
+        scores = tuple(match.scores)
+        for _ in range(self.frame_skip):
+            if match.step() == "point":
+                if match.is_over():
+                    break
+                match.restart_round()
+        reward = (match.scores[0] - scores[0]) - (match.scores[1] - scores[1])
+        return self.observe(), reward, match.is_over(), {"scores": tuple(match.scores), "ticks": match.ticks}
+
+
+class VectorPongEnv:
+    """A class to represent many matches played in lockstep as one batched environment
+
+    step() takes an array of actions and returns views of preallocated buffers that are overwritten in place by
+    the next step, so copy them if they need to be kept. Finished matches start over automatically, so the
+    observation for a match that is done is the first one of its next match.
+    """
+
+    def __init__(self, num_envs, frame_skip=4, held_paddle_speed=5, seed=None, **settings):
+        """
+        param num_envs: Number of matches to play at once
+        param frame_skip: Number of ticks each step holds the actions for
+        param held_paddle_speed: Distance Player 1's paddles move per tick while held
+        param seed: Seed for the random number generator; unpredictable if None
+        param settings: Other keyword arguments for BatchMatch
+        """
+        paddle_speed = settings.pop("paddle_speed", 40)
+        settings.setdefault("cpu_paddle_speed", paddle_speed/30)
+        self.num_envs = num_envs
+        self.frame_skip = frame_skip
+        self.batch = BatchMatch(num_envs, paddle_speed=held_paddle_speed, seed=seed, **settings)
+        self.observations = np.zeros((num_envs, len(OBSERVATION_FIELDS)))
+        self.rewards = np.zeros(num_envs)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.start_scores = np.zeros((num_envs, 2), dtype=np.int64)
+
+    def observe(self):
+        """
+        :return: The observation buffer, filled in with every match's current state
+        """
+        batch = self.batch
+        for column, values in enumerate((batch.x, batch.y, batch.vx, batch.vy, batch.paddle_1_y, batch.paddle_2_y)):
+            np.copyto(self.observations[:, column], values)
+        return self.observations
+
+    def reset(self):
+        """
+        Starts every match over
+        :return: Array of first observations, one row per match
+        """
+        self.batch.reset_matches(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def step(self, actions):
+        """
+        :param actions: Array of each match's action (1 to hold Player 1's paddle up, -1 down, 0 still)
+        :return: (observations, rewards, dones) arrays with one entry per match
+        """
+        batch = self.batch
+        np.copyto(self.start_scores, batch.scores)
+        for _ in range(self.frame_skip):
+            batch.step(actions)
+        np.subtract(batch.scores[:, 0], self.start_scores[:, 0], out=self.rewards)
+        self.rewards -= batch.scores[:, 1] - self.start_scores[:, 1]
+        np.copyto(self.dones, batch.is_over())
+        if self.dones.any():
+            batch.reset_matches(self.dones)
+        return self.observe(), self.rewards, self.dones
@@ -0,0 +1,261 @@
+"""Game Class File
+
+Contains GameConfig class, which holds every setting for a game, and Game class, which owns one match and
+everything around it (input, drawing, pacing, profiling, and recording), so that any number of games can exist
+in one process, with or without a display
+"""
+
+import functools
+import random
+import time
+from collections import namedtuple
+from replay import Recorder
+from clock import FixedTimestep
+from renderer import NullRenderer, CanvasRenderer
+from profiler import FrameProfiler, NullProfiler
+from telemetry import TelemetryBus, RallyTelemetry
+
+
+class GameConfig(namedtuple("GameConfig", [
+        "screen_width", "screen_height", "screen_title", "paddle_length", "paddle_speed", "held_paddle_speed",
+        "ball_speed", "winning_score", "tick_rate", "frame_rate", "round_pause", "profile_path", "seed",
+        "recording_path", "prediction", "telemetry_path", "broadcast_port",
+        "broadcast_host", "planner",
+        ], defaults=(800, 500, "PONG", 5, 40, 5, 3, 5, 120, 60, 2, None, None, None, None, None, None, "127.0.0.1",
+                     None))):
+    """A class to hold the settings for a game
+
+    screen_width, screen_height: Size of the court
+    screen_title: Title of the window
+    paddle_length: Length of both paddles (in units for turtlesize() scaling method)
+    paddle_speed: Distance Player 1's paddle moves per key press; the CPU's moves paddle_speed/30 per tick
+    held_paddle_speed: Distance Player 1's paddle moves per tick while its key is held
+    ball_speed: Distance the ball moves per tick
+    winning_score: Score needed to win
+    tick_rate: Physics ticks per second (ball and paddle speeds are in pixels per tick)
+    frame_rate: Most frames drawn per second
+    round_pause: Seconds to pause before and after restarting the round when a point is scored on screen
+    profile_path: File path ending in .json or .csv to write a profile of the game loop to; None to not profile
+    seed: Seed for the match's random choices; a random seed is picked if None
+    recording_path: File path to save a recording of the match to, for replay.py; None to not save
+    prediction: Name of the method in rules.PREDICTIONS the CPU predicts with; the exact one if None
+    telemetry_path: File path to stream every paddle hit and point to, for telemetry.py; None to not stream
+    broadcast_port: TCP port to broadcast every tick to spectators on, for broadcast.py; None to not broadcast
+    broadcast_host: Address to broadcast on; "0.0.0.0" to let spectators on other machines watch
+    planner: Name of a difficulty in cpu_planner.DIFFICULTIES for a CPU that aims its returns away from Player 1;
+            None for the original CPU
+    """
+
+    __slots__ = ()
+
+    def match_settings(self):
+        """
+        :return: dict of keyword arguments for Match (other than seed)
+        """
+        return dict(screen_width=self.screen_width, screen_height=self.screen_height,
+                    paddle_length=self.paddle_length, paddle_speed=self.paddle_speed,
+                    cpu_paddle_speed=self.paddle_speed/30, ball_speed=self.ball_speed,
+                    winning_score=self.winning_score, held_paddle_speed=self.held_paddle_speed,
+                    prediction=self.prediction, planner=self.planner)
+
+
+def setup_screen(config):
+    """
+    Opens the game window
+    :param config: GameConfig with the window's size and title
+    :return: turtle Screen with a black background and automatic drawing turned off
+    """
+    from turtle import Screen
+    screen = Screen()
+    screen.setup(width=config.screen_width, height=config.screen_height)
+    screen.title(config.screen_title)
+    screen.bgcolor("black")
+    # Get object movements to be drawn simultaneously
+    screen.tracer(0)
+    screen.update()
+    return screen
+
+
+class Game:
+    """A class to represent one game between Player 1 and the CPU
+
+    With a screen, Player 1 plays with the keyboard and run() paces the game in real time; without one, the
+    game is drawn by a NullRenderer and run() plays it as fast as possible
+    """
+
+    def __init__(self, config=GameConfig(), screen=None, player_1_controller=None):
+        """
+        param config: GameConfig with the game's settings
+        param screen: turtle Screen to draw on and take keyboard input from; None to run headless
+        param player_1_controller: Function called with the match before each tick that returns the direction
+                to hold Player 1's paddle in (1 for up, -1 for down, 0 to stay put); overrides the keyboard
+        """
+        self.config = config
+        self.screen = screen
+        self.player_1_controller = player_1_controller
+        # The match runs the game rules; the renderer only draws its state
+        # Inputs and round restarts go through the recorder so that the match can be replayed
+        self.recorder = Recorder(config.match_settings(), self.pick_seed())
+        self.match = self.recorder.match
+        if screen is None:
+            self.renderer = NullRenderer(self.match)
+            self.keyboard = None
+        else:
+            from keyboard_input import KeyboardInput
+            self.renderer = CanvasRenderer(self.match, screen)
+            # Bind Player 1's keys once; held keys are applied to the match at the start of each frame
+            self.keyboard = KeyboardInput(screen)
+        if config.profile_path is None:
+            self.profiler = NullProfiler()
+            self.step_match = self.match.step
+        else:
+            self.profiler = FrameProfiler(1/config.frame_rate)
+            self.step_match = functools.partial(self.match.profiled_step, self.profiler)
+            if screen is not None:
+                screen.onkeypress(functools.partial(self.profiler.write, config.profile_path), "p")
+        self.clock = FixedTimestep(config.tick_rate, config.frame_rate)
+        self.telemetry = None
+        if config.telemetry_path is not None:
+            self.telemetry = RallyTelemetry(self.match, TelemetryBus(config.telemetry_path))
+        self.broadcast = None
+        if config.broadcast_port is not None:
+            # Imported here so that asyncio is only loaded when broadcasting
+            from broadcast import BroadcastServer
+            self.broadcast = BroadcastServer(config.broadcast_port, config.broadcast_host)
+
+    def pick_seed(self):
+        """
+        :return: The configured seed, or a random one if there isn't one
+        """
+        return self.config.seed if self.config.seed is not None else random.randrange(2**32)
+
+    def apply_input(self):
+        """
+        Passes changes in Player 1's held direction from the controller or keyboard on to the match
+        """
+        if self.player_1_controller is not None:
+            direction = self.player_1_controller(self.match)
+            if direction != self.match.paddle_directions[0]:
+                self.recorder.hold_paddle(1, direction)
+        elif self.keyboard is not None:
+            # Time how long each change waited to be applied
+            for event_time, player_number, direction in self.keyboard.poll():
+                self.recorder.hold_paddle(player_number, direction)
+                self.profiler.record("input_latency", time.perf_counter() - event_time)
+
+    def step(self):
+        """
+        Applies Player 1's input and advances the match by one tick, starting the next round right away if a
+        point was scored
+        :return: str describing what the ball hit this tick ("wall", "paddle", or "point"); None if nothing
+        """
+        self.apply_input()
+        event = self.step_match()
+        if self.telemetry is not None:
+            self.telemetry.observe(event)
+        if self.broadcast is not None:
+            self.broadcast.publish(self.match)
+        if event == "point" and not self.match.is_over():
+            self.recorder.restart_round()
+        return event
+
+    def run(self, max_ticks=None):
+        """
+        Plays the match to the end: in real time on the screen, or as fast as possible when headless
+        :param max_ticks: Stop after this many ticks even if the match isn't over; no limit if None
+        :return: Number of the player who won the match; None if stopped by max_ticks
+        """
+        if self.screen is None:
+            while not self.match.is_over():
+                if max_ticks is not None and self.match.ticks >= max_ticks:
+                    return None
+                self.step()
+            return self.match.winner()
+        self.clock.reset()
+        while not self.match.is_over():
+            if max_ticks is not None and self.match.ticks >= max_ticks:
+                return None
+            self.run_frame()
+        # End game by displaying winner
+        self.renderer.show_winner(self.match.winner())
+        return self.match.winner()
+
+    def run_frame(self):
+        """
+        Waits for the next frame, runs the ticks due since the last one, and draws the frame, pausing around the
+        round restart if a point was scored
+        """
+        match = self.match
+        renderer = self.renderer
+        profiler = self.profiler
+        ticks = self.clock.wait_for_frame()
+        profiler.start_frame()
+        profiler.start("input")
+        self.apply_input()
+        profiler.stop("input")
+        # Player 2 reacts and moves, and ball moves, for however many ticks have passed since the last frame
+        event = None
+        previous = match.positions()
+        for _ in range(ticks):
+            previous = match.positions()
+            event = self.step_match()
+            if self.telemetry is not None:
+                self.telemetry.observe(event)
+            if self.broadcast is not None:
+                self.broadcast.publish(match)
+            if event == "point":
+                break
+        # Draw ball and paddles part of the way to their next tick's position
+        profiler.start("render")
+        renderer.draw(previous, self.clock.alpha)
+        profiler.stop("render")
+        profiler.stop_frame()
+        # Check if round over
+        if event == "point":
+            renderer.show_ball(False)
+            renderer.draw()
+            # Reset round
+            if not match.is_over():
+                time.sleep(self.config.round_pause)
+                self.recorder.restart_round()
+                renderer.show_ball(True)
+                renderer.draw()
+                time.sleep(self.config.round_pause)
+            # Don't try to catch up on the pause
+            self.clock.reset()
+
+    def reset(self, seed=None):
+        """
+        Starts a new match at 0-0, saving the finished match's recording and profile first if configured
+        :param seed: Seed for the new match; the configured seed (or a random one) if None
+        """
+        self.save()
+        self.recorder.reset(self.pick_seed() if seed is None else seed)
+        if self.telemetry is not None:
+            self.telemetry = RallyTelemetry(self.match, self.telemetry.bus)
+        if self.keyboard is not None:
+            # Keys still held carry over into the new match
+            for player_number, direction in self.keyboard.directions.items():
+                if direction:
+                    self.recorder.hold_paddle(player_number, direction)
+        self.renderer.reset()
+        self.clock.reset()
+
+    def save(self):
+        """
+        Saves the match's recording and the game loop's profile, if configured
+        """
+        if self.config.recording_path is not None:
+            self.recorder.finish().save(self.config.recording_path)
+        if self.config.profile_path is not None:
+            self.profiler.write(self.config.profile_path)
+
+    def close(self):
+        """
+        Saves everything configured to be saved, writes out any telemetry still queued, and stops broadcasting
+        """
+        self.save()
+        if self.telemetry is not None:
+            self.telemetry.bus.close()
+        if self.broadcast is not None:
+            self.broadcast.close()
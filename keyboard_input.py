@@ -0,0 +1,79 @@
+"""Keyboard Input Class File
+
+Contains KeyboardInput class, which binds the game's keys once and keeps track of which ones are held, so that
+paddles move smoothly every tick while a key is held instead of jumping on each of the OS's key repeats
+"""
+
+import functools
+import time
+
+# Keys that move paddles, mapped to (player number, direction)
+PLAYER_1_KEYS = {"w": (1, 1), "s": (1, -1)}
+
+
+class KeyboardInput:
+    """A class to collect key presses and releases from a turtle Screen
+
+    Tk calls press() and release() whenever it handles window events (e.g. while drawing), which only queues
+    them; poll() applies the queue once per frame, so inputs reach the match at a known point between ticks
+    """
+
+    def __init__(self, screen, keys=PLAYER_1_KEYS, clock=time.perf_counter):
+        """
+        param screen: The turtle Screen to listen to
+        param keys: dict mapping each key to the (player number, direction) it moves
+        param clock: Function that returns the current time in seconds
+        """
+        self.keys = keys
+        self.clock = clock
+        self.held = set()
+        # (time, key, True if pressed or False if released) for each key event not yet polled
+        self.queue = []
+        self.directions = {player_number: 0 for player_number, _ in keys.values()}
+        for key in keys:
+            screen.onkeypress(functools.partial(self.press, key), key)
+            screen.onkeyrelease(functools.partial(self.release, key), key)
+        screen.listen()
+
+    def press(self, key):
+        """
+        :param key: Key that was pressed
+        """
+        self.queue.append((self.clock(), key, True))
+
+    def release(self, key):
+        """
+        :param key: Key that was released
+        """
+        self.queue.append((self.clock(), key, False))
+
+    def direction(self, player_number):
+        """
+        :param player_number: Number of a player
+        :return: Direction the player's held keys move their paddle (1 for up, -1 for down, 0 if neither or both)
+        """
+        total = sum(direction for key, (number, direction) in self.keys.items()
+                    if number == player_number and key in self.held)
+        return (total > 0) - (total < 0)
+
+    def poll(self):
+        """
+        Applies the key events queued since the last poll
+        :return: List of (time of the first key event, player number, new direction) for each player whose held
+                direction changed; OS key repeats that leave the direction unchanged are dropped
+        """
+        events, self.queue = self.queue, []
+        first_times = {}
+        for event_time, key, pressed in events:
+            if pressed:
+                self.held.add(key)
+            else:
+                self.held.discard(key)
+            first_times.setdefault(self.keys[key][0], event_time)
+        changes = []
+        for player_number, event_time in first_times.items():
+            direction = self.direction(player_number)
+            if direction != self.directions[player_number]:
+                self.directions[player_number] = direction
+                changes.append((event_time, player_number, direction))
+        return changes
@@ -0,0 +1,415 @@
+"""CPU League File
+
+Contains Variant, a set of CPU settings, and LeagueMatch class, which plays many CPU-vs-CPU matches in lockstep
+with a different pair of variants in each match and either variant on either side.
+
+Run this script to play a round robin between CPU variants across every CPU core, keep an Elo rating for each
+variant, and write a leaderboard (rewritten as results come in, so it can be watched while the league runs):
+    python league.py --variants 50 --matches 200 -o league.csv
+    python league.py --variants-file variants.json
+
+Every pairing plays a few matches per round, half with each variant on the left, so ratings move evenly and
+the league can be stopped early with a usable leaderboard. Results are applied to the ratings in round order,
+so the same seed and settings always give the same leaderboard however many processes are used.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from batch import BatchMatch, BatchCPU
+
+# Rating every variant starts at
+INITIAL_RATING = 1500
+# Ticks between checks for finished matches to replace
+CHECK_INTERVAL = 64
+# LeagueMatch arrays with one entry per slot
+MATCH_ARRAYS = ("x", "y", "heading", "vx", "vy", "scores", "over", "ticks", "hits", "slot_matches")
+LEADERBOARD_FIELDS = ("rank", "name", "rating", "games", "wins", "losses", "draws", "score", "react_x_range",
+                      "paddle_speed", "aim_noise")
+
+
+class Variant(namedtuple("Variant", ("name", "react_x_range", "paddle_speed", "aim_noise"))):
+    """A class to represent the settings of one CPU in the league
+
+    react_x_range: (lowest, highest) x positions where the CPU reacts after its opponent's shot, measured from
+            the center towards its own side (see CPUBrain)
+    paddle_speed: Distance the CPU's paddle moves per tick
+    aim_noise: Most distance the CPU aims its paddle center away from the ball (its di_intent_range is
+            -aim_noise to aim_noise)
+
+    Every variant predicts where the ball will reach its paddle exactly (with batch.predict_ball_paths), since
+    the league plays with the same stepped collisions as the game
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_settings(cls, react_x_range=(-50, 150), paddle_speed=40/30, aim_noise=50, name=None):
+        """
+        :param react_x_range, paddle_speed, aim_noise: See Variant; defaults to the usual CPU
+        :param name: Name to show on the leaderboard; made from the settings if None
+        :return: New Variant
+        """
+        react_x_range = tuple(react_x_range)
+        if name is None:
+            name = f"react {react_x_range[0]}:{react_x_range[1]} speed {paddle_speed:.3g} noise {aim_noise:g}"
+        return cls(name, react_x_range, paddle_speed, aim_noise)
+
+
+def default_variants(count, seed=0):
+    """
+    :param count: Number of variants
+    :param seed: Seed for choosing which combinations of settings to use
+    :return: List of count different variants: the usual CPU, then a random sample of a grid of settings around it
+    """
+    grid = itertools.product(((-50, 150), (-150, 50), (50, 250), (0, 100), (-200, 200)),
+                             (0.8, 1.0, 40/30, 1.8, 2.5),
+                             (10, 30, 50))
+    usual = Variant.from_settings()
+    others = [variant for variant in (Variant.from_settings(*settings) for settings in grid) if variant != usual]
+    if count > len(others) + 1:
+        raise ValueError(f"Can't make more than {len(others) + 1} default variants")
+    return [usual] + random.Random(seed).sample(others, count - 1)
+
+
+def load_variants(path):
+    """
+    :param path: Path of a JSON file holding a list of objects with any of Variant's fields
+    :return: List of variants
+    """
+    with open(path) as file:
+        return [Variant.from_settings(**settings) for settings in json.load(file)]
+
+
+class LeagueMatch(BatchMatch):
+    """A class to represent a fixed number of slots, each playing a match between two CPUs, in lockstep
+
+    Each match has its own pair of variants. Both CPUs are BatchCPUs, like BatchMatch's; the left CPU sees the
+    court mirrored, so that its paddle is on the right as BatchCPU expects. self.cpus holds the left CPUs and the
+    right CPUs, and paddle_y has one row per side (0 for the left paddles, 1 for the right paddles) and one column
+    per slot. A slot stays idle (counted as over) until a match is started in it.
+    """
+
+    def __init__(self, variants, num_slots, screen_width=800, screen_height=500, paddle_length=5, ball_speed=3,
+                 winning_score=5, seed=None):
+        """
+        param variants: List of the variants that can play, referred to by their index in the list
+        param num_slots: Most matches to play at once
+        param screen_width, screen_height, paddle_length, ball_speed, winning_score, seed: See BatchMatch
+        """
+        # Each variant's settings, looked up when a match starts
+        self.variant_speeds = np.array([variant.paddle_speed for variant in variants], dtype=float)
+        self.variant_react_lows = np.array([variant.react_x_range[0] for variant in variants])
+        self.variant_react_highs = np.array([variant.react_x_range[1] for variant in variants])
+        self.variant_aim_noises = np.array([variant.aim_noise for variant in variants], dtype=float)
+        # The CPUs on each side, with the settings of the variants playing in each slot
+        self.cpus = tuple(BatchCPU(num_slots, screen_width, screen_height, paddle_length, np.zeros(num_slots),
+                                   (np.zeros(num_slots, dtype=np.int64), np.zeros(num_slots, dtype=np.int64)),
+                                   (np.zeros(num_slots), np.zeros(num_slots)), ball_speed)
+                          for _ in range(2))
+        # Kept up to date as points are scored, rather than worked out from the scores every tick
+        self.over = np.ones(num_slots, dtype=bool)
+        # Number of the match being played in each slot; -1 if idle
+        self.slot_matches = np.full(num_slots, -1)
+        # Both sides' paddles, with paddle_1_y and paddle_2_y as views of its rows
+        self.paddle_y = np.zeros((2, num_slots))
+        super().__init__(num_slots, screen_width, screen_height, paddle_length, ball_speed=ball_speed,
+                         winning_score=winning_score, seed=seed)
+        self.paddle_1_y, self.paddle_2_y = self.paddle_y
+        self.cpu = self.cpus[1]
+
+    def start_matches(self, slots, matches, left, right):
+        """
+        Starts new matches at 0-0 in the given slots
+        :param slots: Array of slot numbers
+        :param matches: Array of the number of the match started in each slot (its index in play_schedule's lists)
+        :param left: Array of the number of the variant on the left in each match
+        :param right: Array of the number of the variant on the right in each match
+        """
+        mask = np.zeros(self.num_matches, dtype=bool)
+        mask[slots] = True
+        for cpu, numbers in zip(self.cpus, (left, right)):
+            cpu.paddle_speed[slots] = self.variant_speeds[numbers]
+            cpu.react_lows[slots] = self.variant_react_lows[numbers]
+            cpu.react_highs[slots] = self.variant_react_highs[numbers]
+            cpu.di_lows[slots] = -self.variant_aim_noises[numbers]
+            cpu.di_highs[slots] = self.variant_aim_noises[numbers]
+            cpu.reset(mask)
+        self.slot_matches[slots] = matches
+        self.scores[slots] = 0
+        self.over[slots] = False
+        self.ticks[slots] = 0
+        self.hits[slots] = 0
+        self.restart_rounds(mask)
+
+    def restart_rounds(self, mask):
+        """
+        Puts the balls of the masked matches back in the center with new directions and re-centers their paddles
+        :param mask: Boolean array of matches to restart
+        """
+        self.x[mask] = 0
+        self.y[mask] = 0
+        self.paddle_y[:, mask] = 0
+        # Unlike BatchMatch, only draws headings for the restarted matches
+        heading = np.zeros(self.num_matches)
+        heading[mask] = self.rng.choice(self.starting_headings, int(mask.sum()))
+        self.set_heading(mask, heading)
+        # The CPU the ball starts moving towards needs to react right away
+        left = self.moving_left()
+        for cpu, towards in zip(self.cpus, (mask & left, mask & ~left)):
+            cpu.set_react_x(towards, self.rng, ball_reset=True)
+
+    def step(self, player_1_moves=None):
+        """
+        Advances every match that isn't over by one tick
+        :param player_1_moves: Ignored; both paddles are moved by CPUs
+        :return: Boolean array that is True for matches where a point was scored this tick
+        """
+        active = ~self.over
+        left = self.moving_left()
+        # The left CPU sees the ball mirrored, moving right towards its paddle when it is moving left
+        self.cpus[0].step(self.paddle_y[0], -self.x, self.y, 180 - self.heading, active, ~left, self.rng)
+        self.cpus[1].step(self.paddle_y[1], self.x, self.y, self.heading, active, left, self.rng)
+        point, hit_1, hit_2 = self.move_balls(active)
+        if point.any():
+            self.over |= point & (self.scores.max(axis=1) >= self.winning_score)
+        # The CPU the ball is now moving towards picks a new reaction position
+        for cpu, hit in ((self.cpus[1], hit_1), (self.cpus[0], hit_2)):
+            if hit.any():
+                cpu.set_react_x(hit, self.rng)
+        restart = point & ~self.over
+        if restart.any():
+            self.restart_rounds(restart)
+        return point
+
+    def is_over(self):
+        """
+        :return: Boolean array that is True for slots whose match is over (or that are idle)
+        """
+        return self.over
+
+    def play_schedule(self, left, right, max_ticks=None):
+        """
+        Plays a list of matches, starting the next one in a slot as soon as the slot's match is over, so that the
+        slots stay full until the list runs out
+        :param left: Array of the number of the variant on the left in each match
+        :param right: Array of the number of the variant on the right in each match
+        :param max_ticks: Stop a match after about this many ticks (checked every CHECK_INTERVAL ticks) even if
+                it isn't over; no limit if None
+        :return: Array of the number of the player who won each match (1 for left, 2 for right);
+                0 if stopped by max_ticks
+        """
+        winners = np.zeros(len(left), dtype=np.int64)
+        next_match = 0
+        while True:
+            finished = self.over.copy()
+            if max_ticks is not None:
+                finished |= self.ticks >= max_ticks
+            finished &= self.slot_matches >= 0
+            if finished.any():
+                winners[self.slot_matches[finished]] = np.where(self.over[finished], self.winners()[finished], 0)
+                self.slot_matches[finished] = -1
+                self.over[finished] = True
+            idle = np.flatnonzero(self.slot_matches < 0)
+            count = min(len(idle), len(left) - next_match)
+            if count:
+                matches = np.arange(next_match, next_match + count)
+                self.start_matches(idle[:count], matches, left[matches], right[matches])
+                next_match += count
+            elif len(idle) == self.num_matches:
+                return winners
+            # Once the list runs out, drop idle slots so the last few matches aren't stepped with every slot
+            if next_match == len(left) and len(idle) - count > self.num_matches//2:
+                self.keep(self.slot_matches >= 0)
+            for _ in range(CHECK_INTERVAL):
+                self.step()
+
+    def keep(self, mask):
+        """
+        Drops every slot not in the mask
+        :param mask: Boolean array of slots to keep
+        """
+        for name in MATCH_ARRAYS:
+            setattr(self, name, getattr(self, name)[mask])
+        for cpu in self.cpus:
+            cpu.keep(mask)
+        self.paddle_y = self.paddle_y[:, mask]
+        self.paddle_1_y, self.paddle_2_y = self.paddle_y
+        self.num_matches = int(mask.sum())
+
+
+def round_pairings(num_variants, matches_per_round):
+    """
+    :param num_variants: Number of variants in the league
+    :param matches_per_round: Matches each pairing plays per round; half with each variant on the left
+    :return: (left, right) arrays of the variant numbers on each side of each match in a round
+    """
+    pairs = np.array(list(itertools.combinations(range(num_variants), 2))).reshape(-1, 2)
+    # Every other match of a pairing has its variants swapped
+    swapped = np.tile(np.arange(matches_per_round) % 2 == 1, len(pairs))
+    pairs = np.repeat(pairs, matches_per_round, axis=0)
+    left = np.where(swapped, pairs[:, 1], pairs[:, 0])
+    right = np.where(swapped, pairs[:, 0], pairs[:, 1])
+    return left, right
+
+
+def play_rounds(variants, first_round, rounds, matches_per_round, num_slots, max_ticks, seed):
+    """
+    Plays some rounds of the league, each being matches_per_round matches for every pairing of variants
+    :param variants: List of variants
+    :param first_round: Number of the first round to play, used with seed to seed the matches
+    :param rounds: Number of rounds to play
+    :param matches_per_round: Matches each pairing plays per round
+    :param num_slots: Most matches to play at once
+    :param max_ticks: Matches still going after this many ticks are stopped and counted as unfinished
+    :param seed: Seed of the league
+    :return: List of (left, right, winners) arrays for each round, of each match's variant numbers and winner
+            (1 left, 2 right, 0 if unfinished), shuffled into the order their results should be rated in
+    """
+    left, right = round_pairings(len(variants), matches_per_round)
+    match = LeagueMatch(variants, num_slots, seed=np.random.default_rng([seed, first_round]))
+    winners = match.play_schedule(np.tile(left, rounds), np.tile(right, rounds), max_ticks)
+    results = []
+    for round_number, round_winners in zip(range(first_round, first_round + rounds), np.split(winners, rounds)):
+        order = np.random.default_rng([seed, round_number]).permutation(len(left))
+        results.append((left[order], right[order], round_winners[order]))
+    return results
+
+
+class EloRatings:
+    """A class to hold Elo ratings that are updated after every match"""
+
+    def __init__(self, num_players, k_factor=16, initial_rating=INITIAL_RATING):
+        """
+        param num_players: Number of players being rated
+        param k_factor: Most rating points a player can gain or lose in one match
+        param initial_rating: Rating every player starts at
+        """
+        self.k_factor = k_factor
+        self.ratings = [float(initial_rating)]*num_players
+        self.wins = [0]*num_players
+        self.losses = [0]*num_players
+        self.draws = [0]*num_players
+
+    def record(self, first, second, score):
+        """
+        Moves both players' ratings by how unexpected the result was
+        :param first: Number of one player
+        :param second: Number of the other player
+        :param score: 1 if the first player won, 0 if the second player won, 0.5 for a draw
+        """
+        ratings = self.ratings
+        expected = 1/(1 + 10**((ratings[second] - ratings[first])/400))
+        change = self.k_factor*(score - expected)
+        ratings[first] += change
+        ratings[second] -= change
+        if score == 1:
+            self.wins[first] += 1
+            self.losses[second] += 1
+        elif score == 0:
+            self.wins[second] += 1
+            self.losses[first] += 1
+        else:
+            self.draws[first] += 1
+            self.draws[second] += 1
+
+    def record_round(self, left, right, winners):
+        """
+        Records every match of a round in order, counting unfinished matches as draws (neither CPU could beat
+        the other)
+        :param left, right, winners: One round's arrays from play_rounds
+        :return: Number of unfinished matches
+        """
+        scores = {1: 1, 2: 0, 0: 0.5}
+        for left_number, right_number, winner in zip(left.tolist(), right.tolist(), winners.tolist()):
+            self.record(left_number, right_number, scores[winner])
+        return int((winners == 0).sum())
+
+
+def write_leaderboard(path, variants, elo):
+    """
+    Writes every variant's rating and record to a CSV file, best first, replacing the file in one step so it is
+    never seen half written
+    :param path: Path of the leaderboard file
+    :param variants: List of variants
+    :param elo: EloRatings of the variants
+    """
+    order = sorted(range(len(variants)), key=lambda number: -elo.ratings[number])
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=LEADERBOARD_FIELDS)
+        writer.writeheader()
+        for rank, number in enumerate(order, 1):
+            variant = variants[number]
+            wins, losses, draws = elo.wins[number], elo.losses[number], elo.draws[number]
+            games = wins + losses + draws
+            writer.writerow({
+                "rank": rank,
+                "name": variant.name,
+                "rating": round(elo.ratings[number], 1),
+                "games": games,
+                "wins": wins,
+                "losses": losses,
+                "draws": draws,
+                "score": round((wins + draws/2)/games, 4) if games else '',
+                "react_x_range": f"{variant.react_x_range[0]}:{variant.react_x_range[1]}",
+                "paddle_speed": variant.paddle_speed,
+                "aim_noise": variant.aim_noise,
+            })
+    os.replace(temporary_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a round robin league between CPU variants and rate them")
+    parser.add_argument("--variants", type=int, default=50, help="Number of default variants to play")
+    parser.add_argument("--variants-file", help="JSON list of variant settings to play instead of the defaults")
+    parser.add_argument("--matches", type=int, default=200, help="Matches per pairing")
+    parser.add_argument("--matches-per-round", type=int, default=4,
+                        help="Matches per pairing in each round (an even number gives each variant both sides)")
+    parser.add_argument("--rounds-per-task", type=int, default=5,
+                        help="Rounds each process plays at once (and between leaderboard updates)")
+    parser.add_argument("--slots", type=int, default=4096, help="Matches each process plays at once")
+    parser.add_argument("--max-ticks", type=int, default=50000,
+                        help="Ticks before a match is stopped and rated as a draw")
+    parser.add_argument("--k-factor", type=float, default=16, help="Elo K-factor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="Number of processes; defaults to one per core")
+    parser.add_argument("-o", "--output", default="league.csv", help="Leaderboard file")
+    args = parser.parse_args()
+
+    variants = load_variants(args.variants_file) if args.variants_file else default_variants(args.variants, args.seed)
+    rounds = -(-args.matches//args.matches_per_round)
+    pairings = len(variants)*(len(variants) - 1)//2
+    print(f"{len(variants)} variants, {pairings} pairings, {rounds} rounds of {args.matches_per_round} matches "
+          f"per pairing")
+    tasks = [(first_round, min(args.rounds_per_task, rounds - first_round))
+             for first_round in range(0, rounds, args.rounds_per_task)]
+    elo = EloRatings(len(variants), args.k_factor)
+    unfinished = 0
+    rounds_done = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        futures = [pool.submit(play_rounds, variants, first_round, count, args.matches_per_round, args.slots,
+                               args.max_ticks, args.seed)
+                   for first_round, count in tasks]
+        # Results are rated in round order, so ratings don't depend on which process finishes first
+        for future in futures:
+            for result in future.result():
+                unfinished += elo.record_round(*result)
+                rounds_done += 1
+            write_leaderboard(args.output, variants, elo)
+            print(f"{rounds_done}/{rounds} rounds done, {time.perf_counter() - started:.0f} s", end='\r')
+    print(f"\n{rounds*args.matches_per_round*pairings} matches in {time.perf_counter() - started:.1f} s, "
+          f"{unfinished} stopped at {args.max_ticks} ticks and rated as draws")
+    best = max(range(len(variants)), key=lambda number: elo.ratings[number])
+    print(f"Top rated: {variants[best].name} ({elo.ratings[best]:.0f})")
+
+
+if __name__ == "__main__":
+    main()
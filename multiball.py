@@ -0,0 +1,358 @@
+"""Multi-Ball Match Class File
+
+Contains MultiBallMatch class, which plays a match between Player 1 and the CPU with many balls in play at once.
+Every ball's state is kept in NumPy arrays and moved in one batched step each tick. A ball that reaches a side
+wall scores a point and starts again from the center, while the rest keep going.
+
+Each tick works out the paddles' edges once, bounces every ball off the walls at once, and then only tests
+the few balls close enough to a paddle's x position (the broadphase) against the paddles. The CPU chases the
+ball that will reach its paddle soonest, reacting to it like CPUBrain reacts to the one ball of a Match.
+
+Run this script to play with 50 balls:
+    python multiball.py --balls 50
+or to time a tick with more and more balls, against stepping that many single-ball Matches:
+    python multiball.py --benchmark
+"""
+
+import argparse
+import random
+import numpy as np
+from physics import BallState, PaddleState, STARTING_HEADINGS, predict_ball_path
+from cpu_brain import CPUBrain
+
+
+class MultiBallMatch:
+    """A class to represent a match between Player 1 (left) and the CPU (right) with many balls
+
+    Has the same interface as rules.Match where it makes sense (hold_paddle(), step(), positions(), is_over(),
+    winner()), but instead of a ball it has arrays of every ball's x, y, heading, and velocity
+    """
+
+    def __init__(self, num_balls=50, screen_width=800, screen_height=500, paddle_length=5, paddle_speed=40,
+                 cpu_paddle_speed=None, ball_speed=3, winning_score=100, seed=None, held_paddle_speed=None,
+                 react_x_range=None, di_intent_range=None):
+        """
+        param num_balls: Number of balls in play
+        param screen_width: The width of the court
+        param screen_height: The height of the court
+        param paddle_length: The length of both paddles (in units for turtlesize() scaling method)
+        param paddle_speed: Used to set the CPU's and held paddle speeds when they aren't given (see Match)
+        param cpu_paddle_speed: Distance the CPU's paddle moves per tick; defaults to paddle_speed/30
+        param ball_speed: Distance the balls move per tick
+        param winning_score: Score needed to win
+        param seed: Seed for the match's random choices; unpredictable if None
+        param held_paddle_speed: Distance a held paddle moves per tick; defaults to paddle_speed/8
+        param react_x_range: (lowest, highest) x positions where the CPU can react; see CPUBrain
+        param di_intent_range: (lowest, highest) offsets the CPU aims its paddle at; see CPUBrain
+        """
+        self.num_balls = num_balls
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.cpu_paddle_speed = paddle_speed/30 if cpu_paddle_speed is None else cpu_paddle_speed
+        self.held_paddle_speed = paddle_speed/8 if held_paddle_speed is None else held_paddle_speed
+        self.ball_speed = ball_speed
+        self.winning_score = winning_score
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.paddles = (PaddleState(1, paddle_length, screen_width), PaddleState(2, paddle_length, screen_width))
+        self.cpu = CPUBrain(paddle_length, screen_width, screen_height,
+                            random.Random(f"{seed}/cpu") if seed is not None else random.Random(),
+                            react_x_range, di_intent_range)
+        # Ball the CPU's decisions are worked out with: a copy of the ball it is chasing
+        self.cpu_ball = BallState(ball_speed)
+        self.radius = self.cpu_ball.radius
+        self.starting_headings = np.array(STARTING_HEADINGS, dtype=float)
+        paddle_1, paddle_2 = self.paddles
+        # Limits the balls' centers have to pass to hit a wall or score, and the x positions where a ball's edge
+        # reaches each paddle's face
+        self.wall_y = screen_height/2 - self.radius
+        self.goal_x = screen_width/2 - self.radius
+        self.paddle_1_face_x = paddle_1.x + paddle_1.half_width + self.radius
+        self.paddle_2_face_x = paddle_2.x - paddle_2.half_width - self.radius
+        # Ball state, one entry per ball
+        self.x = np.zeros(num_balls)
+        self.y = np.zeros(num_balls)
+        self.heading = np.zeros(num_balls)
+        self.vx = np.zeros(num_balls)
+        self.vy = np.zeros(num_balls)
+        # Number of times each ball has been hit or restarted, so the CPU can tell when its target changed course
+        self.launches = np.zeros(num_balls, dtype=np.int64)
+        # Ticks until each ball reaches the CPU's paddle (inf for balls moving away), reused every tick
+        self.arrival_ticks = np.empty(num_balls)
+        # (index, launches) of the ball the CPU is chasing; None if no ball is coming towards it
+        self.target = None
+        self.scores = [0, 0]
+        self.paddle_directions = [0, 0]
+        self.ticks = 0
+        # Balls tested against the paddles, summed over every tick, to show how much the broadphase skips
+        self.narrow_phase_tests = 0
+        self.restart_balls(np.arange(num_balls))
+
+    def restart_balls(self, indices):
+        """
+        Puts balls back in the center with new directions
+        :param indices: Array of the indices of the balls to restart
+        """
+        self.x[indices] = 0.0
+        self.y[indices] = 0.0
+        self.launches[indices] += 1
+        self.set_heading(indices, self.rng.choice(self.starting_headings, len(indices)))
+
+    def set_heading(self, indices, heading):
+        """
+        Points balls in new directions, keeping their speed
+        :param indices: Array of the indices of the balls to change
+        :param heading: Array of the new heading of each ball (in degrees)
+        """
+        radians = np.radians(heading)
+        self.heading[indices] = np.mod(heading, 360)
+        self.vx[indices] = self.ball_speed*np.cos(radians)
+        self.vy[indices] = self.ball_speed*np.sin(radians)
+
+    def hold_paddle(self, player_number, direction):
+        """
+        Starts or stops a human player's paddle moving by held_paddle_speed every tick
+        :param player_number: The number of the player whose paddle moves
+        :param direction: 1 to hold up, -1 to hold down, 0 to let go
+        """
+        self.paddle_directions[player_number - 1] = direction
+
+    def move_held_paddles(self):
+        """
+        Moves each paddle that is held for one tick
+        """
+        for paddle, direction in zip(self.paddles, self.paddle_directions):
+            if direction > 0:
+                paddle.move_up(self.held_paddle_speed, self.screen_height)
+            elif direction < 0:
+                paddle.move_down(self.held_paddle_speed, self.screen_height)
+
+    def positions(self):
+        """
+        :return: Tuple of the positions of everything that moves: (array of ball x values, array of ball y
+                values, Player 1 paddle y, Player 2 paddle y)
+        """
+        return self.x.copy(), self.y.copy(), self.paddles[0].y, self.paddles[1].y
+
+    def is_over(self):
+        """
+        :return: True if either player has reached the winning score
+        """
+        return self.scores[0] >= self.winning_score or self.scores[1] >= self.winning_score
+
+    def winner(self):
+        """
+        :return: Number of the player who won the match; None if the match isn't over
+        """
+        if self.scores[0] >= self.winning_score:
+            return 1
+        if self.scores[1] >= self.winning_score:
+            return 2
+        return None
+
+    def incoming_ball_y(self, player_number):
+        """
+        :param player_number: Number of a player
+        :return: y position of the ball that will reach the player's paddle first; None if no ball is coming
+                towards them
+        """
+        if player_number == 2:
+            index = self.most_urgent_ball()
+        else:
+            coming = np.flatnonzero(self.vx < 0)
+            # The ball furthest left is the closest to Player 1's paddle
+            index = coming[np.argmin(self.x[coming])] if len(coming) else None
+        return None if index is None else float(self.y[index])
+
+    def most_urgent_ball(self):
+        """
+        :return: Index of the ball that will reach the CPU's paddle soonest; None if no ball is coming towards it
+        """
+        arrival_ticks = self.arrival_ticks
+        arrival_ticks.fill(np.inf)
+        np.divide(self.paddle_2_face_x - self.x, self.vx, out=arrival_ticks,
+                  where=(self.vx > 0) & (self.x <= self.paddle_2_face_x))
+        index = int(np.argmin(arrival_ticks))
+        if arrival_ticks[index] == np.inf:
+            return None
+        return index
+
+    def react_cpu(self):
+        """
+        Points the CPU at the most urgent ball, picking a new reaction position whenever that ball changes, and
+        has the CPU predict where it will arrive once it crosses the reaction position
+        """
+        cpu = self.cpu
+        cpu_ball = self.cpu_ball
+        index = self.most_urgent_ball()
+        if index is None:
+            self.target = None
+            # With nothing coming, the CPU goes back to the center as if the ball were at Player 1's paddle
+            cpu_ball.x = self.paddles[0].x
+            cpu_ball.heading = 180.0
+            return
+        target = (index, self.launches[index])
+        if target != self.target:
+            self.target = target
+            cpu.set_react_x()
+        cpu_ball.x = float(self.x[index])
+        cpu_ball.y = float(self.y[index])
+        cpu_ball.heading = float(self.heading[index])
+        if cpu_ball.x >= cpu.react_x and not cpu.reacted:
+            cpu.react(future_y=predict_ball_path(cpu_ball, self.ball_speed, self.paddles[1], self.screen_height))
+
+    def step(self):
+        """
+        Advances the match by one tick
+        :return: str describing the most important thing any ball hit this tick ("point", "paddle", or "wall");
+                None if nothing
+        """
+        self.ticks += 1
+        directions = self.paddle_directions
+        if directions[0] or directions[1]:
+            self.move_held_paddles()
+        self.react_cpu()
+        self.cpu.move(self.cpu_ball, self.paddles[1], self.cpu_paddle_speed, self.paddles[0])
+        # Paddle edges for this tick, worked out once for every ball
+        paddle_1, paddle_2 = self.paddles
+        paddle_1_bottom = paddle_1.y - paddle_1.half_length
+        paddle_1_top = paddle_1.y + paddle_1.half_length
+        paddle_2_bottom = paddle_2.y - paddle_2.half_length
+        paddle_2_top = paddle_2.y + paddle_2.half_length
+        # Every ball moves and bounces off the top and bottom walls
+        x = self.x
+        y = self.y
+        x += self.vx
+        y += self.vy
+        wall = np.abs(y) > self.wall_y
+        bounced = np.flatnonzero(wall)
+        if len(bounced):
+            self.vy[bounced] *= -1
+            self.heading[bounced] = np.mod(-self.heading[bounced], 360)
+        # Broadphase: only balls past a paddle's face can hit it or score; like Match, a ball that bounced off a
+        # wall this tick isn't tested
+        near = np.flatnonzero((np.abs(x) >= self.paddle_2_face_x) & ~wall)
+        self.narrow_phase_tests += len(near)
+        event = "wall" if len(bounced) else None
+        if not len(near):
+            return event
+        near_x = x[near]
+        near_y = y[near]
+        left = self.vx[near] < 0
+        point = np.abs(near_x) > self.goal_x
+        if point.any():
+            scored_by_2 = int(np.count_nonzero(point & left))
+            self.scores[1] += scored_by_2
+            self.scores[0] += int(np.count_nonzero(point)) - scored_by_2
+            self.restart_balls(near[point])
+            event = "point"
+        hit_1 = ~point & left & (near_x <= self.paddle_1_face_x) & (paddle_1_bottom <= near_y) \
+            & (near_y <= paddle_1_top)
+        hit_2 = ~point & ~left & (near_x >= self.paddle_2_face_x) & (paddle_2_bottom <= near_y) \
+            & (near_y <= paddle_2_top)
+        hit = hit_1 | hit_2
+        if hit.any():
+            # Directional influence (0 if the ball hits the middle of the paddle, 0.8 at the top, -0.8 at the bottom)
+            di = np.where(hit_1[hit], near_y[hit] - paddle_1.y, near_y[hit] - paddle_2.y)*0.8/paddle_1.half_length
+            indices = near[hit]
+            self.set_heading(indices, np.where(hit_1[hit], 90*di, 180 - 90*di))
+            self.launches[indices] += 1
+            event = event or "paddle"
+        return event
+
+
+def benchmark(ball_counts, ticks, seed):
+    """
+    Times a tick of a MultiBallMatch with each number of balls, and of stepping that many single-ball Matches
+    :param ball_counts: Numbers of balls to time
+    :param ticks: Ticks to time for each number of balls
+    :param seed: Seed for the matches
+    """
+    import time
+    from rules import Match
+    from controllers import tracking_controller
+    print(f"{'balls':>6} {'tick us':>9} {'us/ball':>8} {'paddle tests/tick':>18} {'Matches tick us':>16} "
+          f"{'speedup':>8}")
+    results = []
+    for num_balls in ball_counts:
+        match = MultiBallMatch(num_balls, seed=seed, winning_score=10**9, held_paddle_speed=5)
+        controller = tracking_controller()
+        # Let the balls spread out over the court before timing
+        for _ in range(500):
+            match.hold_paddle(1, controller(match))
+            match.step()
+        match.narrow_phase_tests = 0
+        elapsed = 0.0
+        for _ in range(ticks):
+            match.hold_paddle(1, controller(match))
+            started = time.perf_counter()
+            match.step()
+            elapsed += time.perf_counter() - started
+        tick_seconds = elapsed/ticks
+        # The same number of balls, each in its own Match stepped in a Python loop
+        matches = [Match(seed=seed + index, winning_score=10**9) for index in range(num_balls)]
+        single_ticks = max(ticks*10//num_balls, 10)
+        started = time.perf_counter()
+        for _ in range(single_ticks):
+            for single in matches:
+                if single.step() == "point":
+                    single.restart_round()
+        single_seconds = (time.perf_counter() - started)/single_ticks
+        results.append((num_balls, tick_seconds))
+        print(f"{num_balls:>6} {tick_seconds*1e6:>9.1f} {tick_seconds/num_balls*1e6:>8.2f} "
+              f"{match.narrow_phase_tests/ticks:>18.2f} {single_seconds*1e6:>16.1f} "
+              f"{single_seconds/tick_seconds:>7.1f}x")
+    (first_balls, first_seconds), (last_balls, last_seconds) = results[0], results[-1]
+    growth = np.log(last_seconds/first_seconds)/np.log(last_balls/first_balls)
+    print(f"tick time grows as balls^{growth:.2f} from {first_balls} to {last_balls} balls "
+          f"({last_balls/first_balls:.0f}x the balls, {last_seconds/first_seconds:.1f}x the time)")
+
+
+def play(num_balls, seed):
+    """
+    Plays a multi-ball match on screen, with Player 1 on the keyboard
+    :param num_balls: Number of balls in play
+    :param seed: Seed for the match; unpredictable if None
+    """
+    from game import GameConfig, setup_screen
+    from clock import FixedTimestep
+    from keyboard_input import KeyboardInput
+    from renderer import MultiBallCanvasRenderer
+    config = GameConfig()
+    screen = setup_screen(config)
+    match = MultiBallMatch(num_balls, seed=seed, **{name: value for name, value in config.match_settings().items()
+                                                    if name not in ("prediction", "winning_score", "planner")})
+    renderer = MultiBallCanvasRenderer(match, screen)
+    renderer.show_names("Player 1", "CPU")
+    keyboard = KeyboardInput(screen)
+    clock = FixedTimestep(config.tick_rate, config.frame_rate)
+    while not match.is_over():
+        ticks = clock.wait_for_frame()
+        keyboard.poll()
+        match.hold_paddle(1, keyboard.directions[1])
+        previous = match.positions()
+        scored = False
+        for _ in range(ticks):
+            previous = match.positions()
+            scored |= match.step() == "point"
+        # Don't draw restarted balls part of the way between the side wall and the center
+        renderer.draw(None if scored else previous, clock.alpha)
+    renderer.show_winner(match.winner())
+    screen.exitonclick()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play or benchmark Pong with many balls")
+    parser.add_argument("--balls", type=int, default=50, help="Number of balls to play with")
+    parser.add_argument("--seed", type=int, help="Seed for the match")
+    parser.add_argument("--benchmark", action="store_true", help="Time a tick with more and more balls")
+    parser.add_argument("--ticks", type=int, default=2000, help="With --benchmark, ticks to time per ball count")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark((1, 10, 30, 100, 300, 1000), args.ticks, 0 if args.seed is None else args.seed)
+    else:
+        play(args.balls, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,565 @@
+"""Netplay File
+
+Contains RollbackSession class, which keeps a two-player match in step with a remote peer's copy of the same
+seeded match by exchanging only tick-stamped paddle inputs, NetplayProtocol class, which carries those inputs
+over UDP with asyncio, and LinkConditioner class, which adds latency, jitter, and packet loss for testing.
+
+Neither peer waits for the other's inputs: the remote paddle is predicted to keep doing what it last did, and
+when an input arrives that doesn't match the prediction, the match is rolled back to that tick and simulated
+forward again with the real input. Every packet repeats all inputs the peer hasn't acknowledged, so lost
+packets only delay inputs.
+
+Run this script to play:
+    python netplay.py --host 5000                   wait for a peer on UDP port 5000 and play as Player 1
+    python netplay.py --connect HOST:5000           play as Player 2 against the peer at HOST:5000
+or to play two headless stand-ins against each other over localhost, check that both peers end up in exactly
+the same state, and report rollback depth and re-simulation cost per frame:
+    python netplay.py --test --rtt 0.15 --jitter 0.02 --loss 0.05
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import random
+import struct
+import time
+from rules import Match
+from clock import FixedTimestep
+from renderer import NullRenderer
+
+# Kinds of packets: a handshake (with the match's seed and settings in the host's reply), and inputs
+HELLO = 0
+INPUTS = 1
+# Kind, first tick of the inputs, next tick of the receiver's inputs the sender needs (an acknowledgement of
+# every earlier one), sender's current tick, sender's frame advantage, number of inputs; followed by one signed
+# byte per input (the direction the sender's paddle is held in on that tick)
+INPUT_HEADER = struct.Struct("<BIIIhB")
+# Ticks between a local input being sampled and it being used, which gives it that long to reach the peer
+# before the peer has to predict it
+INPUT_DELAY = 2
+# Most ticks a peer can get ahead of the last input it has from the other before it waits for them
+MAX_ROLLBACK = 60
+# Ticks between the states kept for comparing the peers' matches
+CHECKSUM_INTERVAL = 60
+# Seconds to keep sending inputs after the match ends, so the peer can confirm the last ticks
+LINGER = 1.0
+# Seconds between handshake attempts
+HELLO_INTERVAL = 0.25
+# Keys that move the local player's paddle, for each player number
+PLAYER_KEYS = {number: {"w": (number, 1), "s": (number, -1), "Up": (number, 1), "Down": (number, -1)}
+               for number in (1, 2)}
+
+
+class RollbackSession:
+    """A class to advance a two-player match with one local and one remote player
+
+    Call advance() once per tick with the local player's direction, send outgoing() to the peer regularly, and
+    pass the peer's packets to receive()
+    """
+
+    def __init__(self, match, local_player, input_delay=INPUT_DELAY, max_rollback=MAX_ROLLBACK,
+                 clock=time.perf_counter):
+        """
+        param match: Match created with two_players=True and the same seed and settings as the peer's
+        param local_player: Number of the player on this machine (1 or 2)
+        param input_delay: Ticks between sampling a local input and using it
+        param max_rollback: Most ticks to run past the last confirmed remote input before waiting
+        param clock: Function that returns the current time in seconds
+        """
+        self.match = match
+        self.local_player = local_player
+        self.remote_player = 3 - local_player
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        self.clock = clock
+        # Next tick to simulate
+        self.tick = 0
+        # Each player's direction by tick; the first input_delay local ticks have no input
+        self.local_inputs = {tick: 0 for tick in range(input_delay)}
+        self.remote_inputs = {}
+        # Last tick whose remote input, and every earlier one, has arrived
+        self.remote_confirmed = -1
+        # Remote direction that was predicted for each simulated tick past remote_confirmed
+        self.predictions = {}
+        # Match state (including random number generator states) at the start of each tick that can still be
+        # rolled back to, i.e. every tick after remote_confirmed
+        self.snapshots = {}
+        self.oldest_snapshot = 0
+        # Earliest local input that hasn't been forgotten yet
+        self.oldest_local_input = 0
+        # Earliest tick simulated with a wrong prediction; None if there isn't one
+        self.rollback_tick = None
+        # Next local tick the peer needs, and the peer's tick and frame advantage from its latest packet
+        self.remote_ack = 0
+        self.remote_tick = -1
+        self.remote_advantage = 0
+        # Confirmed match state every CHECKSUM_INTERVAL ticks, for checking that the peers agree
+        self.checksums = {}
+        # (tick, rollback depth, ticks re-simulated, re-simulation seconds, True if stalled) for each frame
+        self.frames = []
+        self.frame_depth = 0
+        self.frame_resimulated = 0
+        self.frame_seconds = 0.0
+        self.frame_stalled = False
+        self.mispredictions = 0
+        self.sync_waits = 0
+
+    def advance(self, direction):
+        """
+        Samples the local input and simulates the next tick, first rolling back if a late remote input didn't
+        match its prediction
+        :param direction: Direction the local player's paddle is held in (1 for up, -1 for down, 0 for not held)
+        :return: True if a tick was simulated; False if the remote peer is too far behind to run ahead of
+        """
+        if self.tick - self.remote_confirmed > self.max_rollback:
+            self.frame_stalled = True
+            return False
+        self.local_inputs[self.tick + self.input_delay] = direction
+        if self.rollback_tick is not None:
+            self.roll_back()
+        self.simulate(self.tick)
+        self.tick += 1
+        self.prune()
+        return True
+
+    def simulate(self, tick):
+        """
+        Runs one tick of the match with each player's confirmed input, or the remote player's predicted input
+        :param tick: Number of the tick, which must be the match's next tick
+        """
+        match = self.match
+        self.snapshots[tick] = match.snapshot(include_rng=True)
+        if tick <= self.remote_confirmed:
+            remote_direction = self.remote_inputs[tick]
+        else:
+            # Predict that the remote player keeps holding their paddle the same way
+            remote_direction = self.remote_inputs.get(self.remote_confirmed, 0)
+            self.predictions[tick] = remote_direction
+        match.hold_paddle(self.local_player, self.local_inputs[tick])
+        match.hold_paddle(self.remote_player, remote_direction)
+        # Ticks keep going after the match is over, so that the peers can confirm its last ticks
+        if not match.is_over() and match.step() == "point" and not match.is_over():
+            match.restart_round()
+
+    def roll_back(self):
+        """
+        Puts the match back to the first tick with a wrong prediction and simulates up to the current tick again
+        """
+        started = self.clock()
+        first_tick = self.rollback_tick
+        self.rollback_tick = None
+        self.match.restore(self.snapshots[first_tick])
+        for tick in range(first_tick, self.tick):
+            self.simulate(tick)
+        self.frame_depth = max(self.frame_depth, self.tick - first_tick)
+        self.frame_resimulated += self.tick - first_tick
+        self.frame_seconds += self.clock() - started
+
+    def prune(self):
+        """
+        Forgets snapshots and inputs of ticks that can no longer be rolled back to, keeping some of their states
+        as checksums
+        """
+        while self.oldest_snapshot <= min(self.remote_confirmed, self.tick - 1):
+            state = self.snapshots.pop(self.oldest_snapshot)
+            if self.oldest_snapshot % CHECKSUM_INTERVAL == 0:
+                self.checksums[self.oldest_snapshot] = state._replace(rng_state=None)
+            self.remote_inputs.pop(self.oldest_snapshot - 1, None)
+            self.oldest_snapshot += 1
+        self.forget_local_inputs()
+
+    def forget_local_inputs(self):
+        """
+        Forgets local inputs that the peer has acknowledged and that can no longer be rolled back to
+        """
+        while self.oldest_local_input < min(self.remote_ack, self.oldest_snapshot):
+            self.local_inputs.pop(self.oldest_local_input, None)
+            self.oldest_local_input += 1
+
+    def receive(self, first_tick, directions, ack, remote_tick, remote_advantage):
+        """
+        Takes in a packet of remote inputs, marking the match for rollback if any of them were mispredicted
+        :param first_tick: Tick of the first input
+        :param directions: Remote player's direction on each tick from first_tick on
+        :param ack: Next local tick the peer needs
+        :param remote_tick: The peer's tick when it sent the packet
+        :param remote_advantage: The peer's frame advantage when it sent the packet
+        """
+        for tick, direction in enumerate(directions, first_tick):
+            if tick > self.remote_confirmed:
+                self.remote_inputs.setdefault(tick, direction)
+        while self.remote_confirmed + 1 in self.remote_inputs:
+            self.remote_confirmed += 1
+            tick = self.remote_confirmed
+            predicted = self.predictions.pop(tick, None)
+            if predicted is not None and predicted != self.remote_inputs[tick]:
+                self.mispredictions += 1
+                if self.rollback_tick is None or tick < self.rollback_tick:
+                    self.rollback_tick = tick
+        if ack > self.remote_ack:
+            self.remote_ack = ack
+            self.forget_local_inputs()
+        if remote_tick > self.remote_tick:
+            self.remote_tick = remote_tick
+            self.remote_advantage = remote_advantage
+
+    def frame_advantage(self):
+        """
+        :return: How many ticks this peer is ahead of the latest tick it has heard from the peer
+        """
+        return self.tick - self.remote_tick
+
+    def ticks_ahead(self):
+        """
+        :return: Roughly how many ticks this peer's clock is ahead of the peer's (negative if behind); the
+                network latency is in both peers' frame advantages, so it cancels out
+        """
+        return (self.frame_advantage() - self.remote_advantage)/2
+
+    def outgoing(self):
+        """
+        :return: Packet of every local input the peer hasn't acknowledged yet (up to 255 of them)
+        """
+        first_tick = self.remote_ack
+        last_tick = min(self.tick + self.input_delay, first_tick + 255)
+        directions = [self.local_inputs[tick] for tick in range(first_tick, last_tick)]
+        advantage = max(min(self.frame_advantage(), 2**15 - 1), -2**15)
+        return (INPUT_HEADER.pack(INPUTS, first_tick, self.remote_confirmed + 1, self.tick, advantage,
+                                  len(directions))
+                + struct.pack(f"<{len(directions)}b", *directions))
+
+    def finished(self):
+        """
+        :return: True once the match is over and every tick up to the end has been confirmed
+        """
+        return self.match.is_over() and self.remote_confirmed >= self.tick - 1
+
+    def end_frame(self):
+        """
+        Records the frame's rollback depth, re-simulation cost, and whether it stalled
+        """
+        self.frames.append((self.tick, self.frame_depth, self.frame_resimulated, self.frame_seconds,
+                            self.frame_stalled))
+        self.frame_depth = 0
+        self.frame_resimulated = 0
+        self.frame_seconds = 0.0
+        self.frame_stalled = False
+
+    def report(self, name):
+        """
+        :param name: Name of the peer, to start the report with
+        :return: Summary of the rollback depth and re-simulation cost per frame
+        """
+        frames = self.frames
+        if not frames:
+            return f"{name}: no frames"
+        rolled_back = [frame for frame in frames if frame[1]]
+        depths = sorted(frame[1] for frame in frames)
+        costs = sorted(frame[3] for frame in frames)
+
+        def percentile(values, fraction):
+            return values[min(int(len(values)*fraction), len(values) - 1)]
+
+        return (f"{name}: {len(frames)} frames, {self.tick} ticks, {len(rolled_back)} frames rolled back "
+                f"({self.mispredictions} mispredicted inputs), {sum(frame[4] for frame in frames)} stalled, "
+                f"{self.sync_waits} ticks waited to stay in step\n"
+                f"  rollback depth (ticks)   mean {sum(depths)/len(depths):6.2f}  p99 {percentile(depths, 0.99):4d}  "
+                f"max {depths[-1]:4d}\n"
+                f"  re-simulation (us)       mean {sum(costs)/len(costs)*1e6:6.1f}  "
+                f"p99 {percentile(costs, 0.99)*1e6:6.1f}  max {costs[-1]*1e6:6.1f}")
+
+    def write_frames(self, path):
+        """
+        Writes each frame's rollback depth and re-simulation cost to a CSV file
+        :param path: Path of the file
+        """
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(("frame", "tick", "rollback_depth", "ticks_resimulated", "resimulation_us", "stalled"))
+            for number, (tick, depth, resimulated, seconds, stalled) in enumerate(self.frames):
+                writer.writerow((number, tick, depth, resimulated, round(seconds*1e6, 1), int(stalled)))
+
+
+class LinkConditioner:
+    """A class to make a network link worse on purpose: each packet sent through it is delayed by a latency
+    plus random jitter (so packets can arrive out of order) or dropped"""
+
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, rng=random):
+        """
+        param latency: Seconds each packet is delayed by (one way; half the round trip time)
+        param jitter: Most seconds a packet's delay is randomly changed by
+        param loss: Chance of dropping each packet (0 to 1)
+        param rng: Random number generator for jitter and loss
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = rng
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, transport, data, address):
+        """
+        Sends a packet after the link's delay, unless it is dropped
+        :param transport: asyncio DatagramTransport to send with
+        :param data: Packet to send
+        :param address: Address to send to
+        """
+        self.sent += 1
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        delay = max(self.latency + self.rng.uniform(-self.jitter, self.jitter), 0.0)
+        asyncio.get_running_loop().call_later(delay, self.deliver, transport, data, address)
+
+    @staticmethod
+    def deliver(transport, data, address):
+        """
+        Sends a delayed packet, unless the transport was closed while it was delayed
+        """
+        if not transport.is_closing():
+            transport.sendto(data, address)
+
+
+class NetplayProtocol(asyncio.DatagramProtocol):
+    """A class to send and receive a peer's packets over UDP"""
+
+    def __init__(self, session=None, conditioner=None, peer=None, hello=None):
+        """
+        param session: RollbackSession to pass inputs to; can be set once the handshake is done
+        param conditioner: LinkConditioner to send packets through; None to send them straight away
+        param peer: (host, port) address of the peer; learned from its first packet if None
+        param hello: Bytes to reply to each handshake packet with (the host's seed and settings); None to not reply
+        """
+        self.session = session
+        self.conditioner = conditioner
+        self.peer = peer
+        self.hello = hello
+        self.transport = None
+        # Resolved with the peer's handshake message once one arrives
+        self.handshake = asyncio.get_event_loop().create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if not data:
+            return
+        if data[0] == HELLO:
+            if self.peer is None:
+                self.peer = address
+            if address != self.peer:
+                return
+            if self.hello is not None:
+                self.send(bytes([HELLO]) + self.hello)
+            if not self.handshake.done():
+                self.handshake.set_result(data[1:])
+        elif data[0] == INPUTS and self.session is not None and address == self.peer:
+            _, first_tick, ack, remote_tick, advantage, count = INPUT_HEADER.unpack_from(data)
+            directions = struct.unpack_from(f"<{count}b", data, INPUT_HEADER.size)
+            self.session.receive(first_tick, directions, ack, remote_tick, advantage)
+
+    def send(self, data):
+        """
+        Sends a packet to the peer
+        :param data: Packet to send
+        """
+        if self.conditioner is None:
+            self.transport.sendto(data, self.peer)
+        else:
+            self.conditioner.send(self.transport, data, self.peer)
+
+    async def connect(self):
+        """
+        Sends handshake packets until the peer answers
+        :return: The peer's handshake message
+        """
+        while not self.handshake.done():
+            self.send(bytes([HELLO]))
+            try:
+                await asyncio.wait_for(asyncio.shield(self.handshake), HELLO_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        return self.handshake.result()
+
+
+async def run_peer(session, protocol, controller, tick_rate=120, frame_rate=60, renderer=None, max_seconds=None):
+    """
+    Plays the session's match in real time until it is over (and confirmed by both peers)
+    :param session: RollbackSession of the match
+    :param protocol: NetplayProtocol connected to the peer
+    :param controller: Function called with the match before each tick that returns the local player's direction
+    :param tick_rate: Physics ticks per second
+    :param frame_rate: Most frames per second (inputs are sent to the peer once per frame)
+    :param renderer: Renderer to draw each frame with; NullRenderer if None
+    :param max_seconds: Stop after this many seconds even if the match isn't over; no limit if None
+    """
+    loop = asyncio.get_running_loop()
+    match = session.match
+    renderer = renderer or NullRenderer(match)
+    # Sleeping is done with asyncio, so that packets are received in between frames
+    clock = FixedTimestep(tick_rate, frame_rate, sleep=lambda seconds: None)
+    started = loop.time()
+    while not session.finished():
+        if max_seconds is not None and loop.time() - started >= max_seconds:
+            break
+        await asyncio.sleep(max(clock.next_frame - clock.clock(), 0))
+        ticks = clock.wait_for_frame()
+        # Let a peer that is behind catch up, so that neither has to keep rolling back further than the latency
+        if ticks and session.ticks_ahead() > 1:
+            ticks -= 1
+            session.sync_waits += 1
+        previous = match.positions()
+        for _ in range(ticks):
+            previous = match.positions()
+            if not session.advance(controller(match)):
+                break
+        protocol.send(session.outgoing())
+        renderer.draw(previous, clock.alpha)
+        session.end_frame()
+    # Keep sending for a while, in case the peer hasn't got the last inputs yet
+    for _ in range(int(LINGER*frame_rate)):
+        protocol.send(session.outgoing())
+        await asyncio.sleep(1/frame_rate)
+
+
+def keyboard_controller(keyboard, player_number):
+    """
+    :param keyboard: KeyboardInput bound to the player's keys
+    :param player_number: Number of the player
+    :return: Function that takes a Match and returns the direction the player's keys are held in
+    """
+    def controller(match):
+        keyboard.poll()
+        return keyboard.directions[player_number]
+    return controller
+
+
+async def join(address, conditioner=None):
+    """
+    Connects to a host and does the handshake
+    :param address: (host name or IP address, port) of the host
+    :param conditioner: LinkConditioner to send packets through; None to send them straight away
+    :return: (NetplayProtocol connected to the host, the host's handshake message)
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(lambda: NetplayProtocol(conditioner=conditioner),
+                                                              remote_addr=address)
+    # Packets are sent to, and replies come from, the address the host name resolved to
+    protocol.peer = transport.get_extra_info("peername")
+    return protocol, await protocol.connect()
+
+
+async def play(args):
+    """
+    Hosts or joins a match and plays it on screen with the keyboard
+    :param args: Parsed command line arguments
+    """
+    from game import GameConfig, setup_screen
+    from keyboard_input import KeyboardInput
+    from renderer import CanvasRenderer
+    loop = asyncio.get_running_loop()
+    conditioner = LinkConditioner(args.rtt/2, args.jitter, args.loss) if args.rtt or args.jitter or args.loss else None
+    if args.host is not None:
+        config = GameConfig(seed=random.randrange(2**32) if args.seed is None else args.seed)
+        hello = json.dumps({"seed": config.seed, "settings": config.match_settings()}).encode()
+        _, protocol = await loop.create_datagram_endpoint(lambda: NetplayProtocol(conditioner=conditioner,
+                                                                                  hello=hello),
+                                                          local_addr=("0.0.0.0", args.host))
+        print(f"Waiting for a peer on port {args.host}")
+        await protocol.handshake
+        local_player = 1
+    else:
+        host, port = args.connect.rsplit(":", 1)
+        protocol, hello = await join((host, int(port)), conditioner)
+        hello = json.loads(hello)
+        config = GameConfig(screen_width=hello["settings"]["screen_width"],
+                            screen_height=hello["settings"]["screen_height"], seed=hello["seed"])
+        local_player = 2
+    settings = config.match_settings() if args.host is not None else hello["settings"]
+    match = Match(**settings, seed=config.seed, two_players=True)
+    session = RollbackSession(match, local_player, args.input_delay)
+    protocol.session = session
+    screen = setup_screen(config)
+    renderer = CanvasRenderer(match, screen)
+    renderer.show_names("You" if local_player == 1 else "Opponent", "You" if local_player == 2 else "Opponent")
+    keyboard = KeyboardInput(screen, PLAYER_KEYS[local_player])
+    await run_peer(session, protocol, keyboard_controller(keyboard, local_player), config.tick_rate,
+                   config.frame_rate, renderer)
+    if match.is_over():
+        renderer.show_winner(match.winner())
+    print(session.report("you"))
+    if args.frames is not None:
+        session.write_frames(args.frames)
+    protocol.transport.close()
+    screen.exitonclick()
+
+
+async def test(args):
+    """
+    Plays two stand-in players against each other over localhost through a LinkConditioner, then checks that
+    both peers' matches went through exactly the same states and prints each one's rollback report
+    :param args: Parsed command line arguments
+    """
+    from controllers import tracking_controller
+    loop = asyncio.get_running_loop()
+    settings = dict(held_paddle_speed=args.held_paddle_speed)
+    sessions = []
+    protocols = []
+    for player_number in (1, 2):
+        conditioner = LinkConditioner(args.rtt/2, args.jitter, args.loss, random.Random(f"{args.seed}/{player_number}"))
+        session = RollbackSession(Match(**settings, seed=args.seed, two_players=True), player_number,
+                                  args.input_delay)
+        _, protocol = await loop.create_datagram_endpoint(lambda: NetplayProtocol(session, conditioner),
+                                                          local_addr=("127.0.0.1", 0))
+        sessions.append(session)
+        protocols.append(protocol)
+    protocols[0].peer = protocols[1].transport.get_extra_info("sockname")
+    protocols[1].peer = protocols[0].transport.get_extra_info("sockname")
+    await asyncio.gather(*(run_peer(session, protocol, tracking_controller(args.dead_zone, session.local_player),
+                                    max_seconds=args.seconds)
+                           for session, protocol in zip(sessions, protocols)))
+    for protocol in protocols:
+        protocol.transport.close()
+    for number, (session, protocol) in enumerate(zip(sessions, protocols), 1):
+        print(session.report(f"Player {number}"))
+        print(f"  packets sent {protocol.conditioner.sent}, dropped {protocol.conditioner.dropped}")
+        if args.frames is not None:
+            session.write_frames(f"{args.frames}.player{number}.csv")
+    checked = sorted(set(sessions[0].checksums) & set(sessions[1].checksums))
+    mismatched = [tick for tick in checked if sessions[0].checksums[tick] != sessions[1].checksums[tick]]
+    match = sessions[0].match
+    print(f"score {match.scores[0]}-{match.scores[1]} after {sessions[0].tick} ticks; "
+          f"{len(checked)} confirmed states compared, {len(mismatched)} differ")
+    if mismatched:
+        print(f"DESYNC from tick {mismatched[0]}")
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a two-player match over the network with rollback")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--host", type=int, metavar="PORT", help="Wait for a peer on this UDP port")
+    mode.add_argument("--connect", metavar="HOST:PORT", help="Join the peer at this address")
+    mode.add_argument("--test", action="store_true", help="Play two headless stand-ins over localhost")
+    parser.add_argument("--rtt", type=float, default=0.0, help="Round trip time in seconds to add to the link")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Most seconds to randomly change each delay by")
+    parser.add_argument("--loss", type=float, default=0.0, help="Chance of dropping each packet")
+    parser.add_argument("--input-delay", type=int, default=INPUT_DELAY, help="Ticks of local input delay")
+    parser.add_argument("--seed", type=int, help="Seed for the match (the host's is used)")
+    parser.add_argument("--seconds", type=float, default=30, help="With --test, most seconds to play")
+    parser.add_argument("--dead-zone", type=float, default=10, help="With --test, the stand-ins' dead zone")
+    parser.add_argument("--held-paddle-speed", type=float, default=5, help="With --test, paddle speed per tick")
+    parser.add_argument("--frames", help="File to write each frame's rollback depth and re-simulation cost to")
+    args = parser.parse_args()
+    if args.test:
+        if args.seed is None:
+            args.seed = 0
+        asyncio.run(test(args))
+    else:
+        asyncio.run(play(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,26 +4,29 @@ Contains Paddle class
 """
 
 from turtle import Turtle
+from physics import PaddleState
 
 
 class Paddle(Turtle):
     """A class to represent the paddle owned by a specific Player object, as a subclass of turtle
 
-    Specifies size, shape, and position for paddle.
+    Specifies size and shape for paddle, and draws the position kept in a PaddleState.
 
     Adds methods for drawing paddle, resetting paddle to the center
     and determining directional influence to be applied to ball
     """
 
-    def __init__(self, player_number, paddle_length, screen_width):
+    def __init__(self, player_number, paddle_length, screen_width, state=None):
         """
         param player_number: The number of the player who owns this Paddle object
         param paddle_length: The length of the paddle (in units for turtlesize() scaling method)
         param screen_width: The width of the screen the paddle operates in
+        param state: PaddleState to draw; a new one is created if None
         """
         super().__init__()
         self.player_number = player_number
         self.paddle_length = paddle_length
+        self.state = state if state is not None else PaddleState(player_number, paddle_length, screen_width)
         self.draw_paddle(self.paddle_length, screen_width)
 
     def draw_paddle(self, paddle_length, screen_width):
@@ -46,10 +49,19 @@ class Paddle(Turtle):
         :param screen_width: The width of the screen the paddle operates in
                 (for determining starting x position for paddle)
         """
-        if self.player_number == 1:
-            self.goto(-screen_width / 2 + 30, 0)
-        if self.player_number == 2:
-            self.goto(screen_width / 2 - 30, 0)
+        self.state.reset(screen_width)
+        self.render()
+
+    def render(self, previous_y=None, alpha=1.0):
+        """
+        Moves the turtle to match the paddle state
+        :param previous_y: y position of the paddle at the previous tick, for drawing in between ticks
+        :param alpha: How far from the previous position to the current one to draw the paddle (0 to 1)
+        """
+        if previous_y is None:
+            self.goto(self.state.x, self.state.y)
+        else:
+            self.goto(self.state.x, previous_y + (self.state.y - previous_y)*alpha)
 
     def directional_influence(self, ball_y_cor):
         """
@@ -60,9 +72,4 @@ class Paddle(Turtle):
         :return di: A float between -0.8 and 0.8 that provides a linear mapping for angle to deflect ball
                 based on paddle's position relative to the ball
         """
-        distance_from_center = ball_y_cor - self.ycor()
-        # Linear calculation of di for distance of ball from center over half the paddle length
-        # Multiplied by 0.8 just to make it so that hitting right at the edge of paddle doesn't
-        # make it too close to vertical, where it would take forever to reach the other side
-        di = distance_from_center*0.8/(self.paddle_length*10)
-        return di
+        return self.state.directional_influence(ball_y_cor)
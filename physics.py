@@ -0,0 +1,362 @@
+"""Physics Core File
+
+Contains the turtle-free ball and paddle state classes and the collision tests for the game,
+so that the game rules can run without a display
+"""
+
+import math
+import random
+
+# Turtle shapes are 20 pixels per unit of turtle size; both the ball and the paddle width use a size of 0.5
+BALL_RADIUS = 5
+PADDLE_HALF_WIDTH = 5
+# Distance of each paddle's center from its side wall
+PADDLE_WALL_OFFSET = 30
+# Don't start ball going 90 degrees (straight up) or 270 (straight down)
+STARTING_HEADINGS = tuple(i for i in range(0, 360) if i not in [90, 270])
+
+
+class BallState:
+    """A class to represent the position and velocity of a ball
+
+    Heading is kept in degrees between 0 and 360 (like Turtle.heading()), and the cartesian
+    velocity is cached so that moving the ball doesn't need any trigonometry
+    """
+
+    __slots__ = ("x", "y", "speed", "heading", "vx", "vy", "radius")
+
+    def __init__(self, speed, heading=0, x=0.0, y=0.0, radius=BALL_RADIUS):
+        """
+        param speed: Distance the ball moves each tick (in pixels)
+        param heading: Angle of the ball's direction up from the positive x-axis (in degrees)
+        param x: Starting x position of the center of the ball
+        param y: Starting y position of the center of the ball
+        param radius: Radius of the ball (in pixels)
+        """
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.radius = radius
+        self.set_heading(heading)
+
+    def set_heading(self, heading):
+        """
+        Points ball in a new direction, keeping its speed
+        :param heading: Angle up from the positive x-axis (in degrees)
+        """
+        self.heading = heading % 360
+        radians = math.radians(heading)
+        self.vx = self.speed*math.cos(radians)
+        self.vy = self.speed*math.sin(radians)
+
+    def set_speed(self, speed):
+        """
+        Changes ball speed, keeping its direction
+        :param speed: Distance the ball moves each tick (in pixels)
+        """
+        self.speed = speed
+        self.set_heading(self.heading)
+
+    def copy(self, speed=None):
+        """
+        Creates an independent ball with the same position and direction
+        :param speed: Speed for the new ball; defaults to this ball's speed
+        :return: New BallState object
+        """
+        return BallState(self.speed if speed is None else speed, self.heading, self.x, self.y, self.radius)
+
+    def restart(self, speed, rng=random):
+        """
+        Restarts ball's position and velocity at start of game or new round
+        :param speed: Speed that the ball will move at
+        :param rng: Random number generator used to pick the starting direction
+        """
+        self.x = 0.0
+        self.y = 0.0
+        self.speed = speed
+        self.set_heading(rng.choice(STARTING_HEADINGS))
+
+    def move(self):
+        """
+        Moves ball by one tick of its velocity
+        """
+        self.x += self.vx
+        self.y += self.vy
+
+    def deflect(self, direction, di=None):
+        """
+        Negates ball speed in given direction ('x' or 'y').
+
+        If deflecting off of paddle, then applies direction influence (di) to ball's deflection angle
+        :param direction: 'x' or 'y'
+        :param di: directional influence value if hitting paddle
+        """
+        # Deflect off top or bottom wall
+        if direction == 'y':
+            self.heading = -self.heading % 360
+            self.vy = -self.vy
+        # Deflect off paddle
+        elif direction == 'x':
+            # Deflect off left paddle
+            if self.left_right() == "left":
+                self.set_heading(90*di)
+            # Deflect off right paddle
+            else:
+                self.set_heading(180 - 90*di)
+
+    def left_right(self):
+        """
+        Determines if ball is moving left or right based on ball's heading angle
+        :return: str that provides direction ball is moving in
+        """
+        if 90 < self.heading < 270:
+            return "left"
+        else:
+            return "right"
+
+
+class PaddleState:
+    """A class to represent the position and size of a paddle"""
+
+    __slots__ = ("player_number", "paddle_length", "half_length", "half_width", "x", "y")
+
+    def __init__(self, player_number, paddle_length, screen_width):
+        """
+        param player_number: The number of the player who owns this paddle (1 is on the left, 2 on the right)
+        param paddle_length: The length of the paddle (in units for turtlesize() scaling method)
+        param screen_width: The width of the screen the paddle operates in
+        """
+        self.player_number = player_number
+        self.paddle_length = paddle_length
+        self.half_length = paddle_length*10
+        self.half_width = PADDLE_HALF_WIDTH
+        self.x = 0.0
+        self.y = 0.0
+        self.reset(screen_width)
+
+    def reset(self, screen_width):
+        """
+        Resets paddle position after each point is scored
+        :param screen_width: The width of the screen the paddle operates in
+        """
+        if self.player_number == 1:
+            self.x = -screen_width/2 + PADDLE_WALL_OFFSET
+        else:
+            self.x = screen_width/2 - PADDLE_WALL_OFFSET
+        self.y = 0.0
+
+    def move_up(self, paddle_speed, screen_height):
+        """
+        Move paddle up by paddle speed (in pixels) unless it is touching the top wall
+        :param paddle_speed: Distance to move the paddle
+        :param screen_height: The height of the screen the paddle operates in
+        """
+        if self.half_length < screen_height/2 - self.y:
+            self.y += paddle_speed
+
+    def move_down(self, paddle_speed, screen_height):
+        """
+        Move paddle down by paddle speed (in pixels) unless it is touching the bottom wall
+        :param paddle_speed: Distance to move the paddle
+        :param screen_height: The height of the screen the paddle operates in
+        """
+        if self.half_length < screen_height/2 + self.y:
+            self.y -= paddle_speed
+
+    def directional_influence(self, ball_y_cor):
+        """
+        Determines directional influence from paddle to ball depending on distance ball hits from center of paddle.
+
+        Directional influence determines the angle for the ball to be deflected in.
+        :param ball_y_cor: y position of center of ball when it hits the paddle
+        :return di: A float between -0.8 and 0.8 that provides a linear mapping for angle to deflect ball
+                based on paddle's position relative to the ball
+        """
+        # Multiplied by 0.8 just to make it so that hitting right at the edge of paddle doesn't
+        # make it too close to vertical, where it would take forever to reach the other side
+        return (ball_y_cor - self.y)*0.8/self.half_length
+
+
+def horizontal_wall_collision(ball, screen_height):
+    """
+    Checks for ball collision with top and bottom walls
+    :param ball: The ball being checked for collision
+    :param screen_height: The height of the court
+    :return: Boolean that is True if collision detected and False if not
+    """
+    return screen_height/2 - abs(ball.y) < ball.radius
+
+
+def vertical_wall_collision(ball, screen_width):
+    """
+    Checks for ball collision with left and right walls
+    :param ball: The ball being checked for collision
+    :param screen_width: The width of the court
+    :return: Boolean that is True if collision detected and False if not
+    """
+    return screen_width/2 - abs(ball.x) < ball.radius
+
+
+def paddle_collision(ball, paddle_1, paddle_2):
+    """
+    Checks for ball collision with each paddle
+    :param ball: The ball being checked for collision
+    :param paddle_1: Player 1's (left) paddle
+    :param paddle_2: Player 2's (right) paddle
+    :return: The paddle that was collided with; None if no collision
+    """
+    if ball.x - ball.radius <= paddle_1.x + paddle_1.half_width:
+        if ball.left_right() == "left":
+            if paddle_1.y - paddle_1.half_length <= ball.y <= paddle_1.y + paddle_1.half_length:
+                return paddle_1
+    elif ball.x + ball.radius >= paddle_2.x - paddle_2.half_width:
+        if ball.left_right() == "right":
+            if paddle_2.y - paddle_2.half_length <= ball.y <= paddle_2.y + paddle_2.half_length:
+                return paddle_2
+    return None
+
+
+def simulate_ball_path(ball, ball_speed, paddle, screen_height):
+    """
+    Steps a copy of the ball across the court to determine which y position the paddle will ultimately need
+    to be in order to get to the ball on time for the next shot
+    :param ball: The ball to be simulated
+    :param ball_speed: Speed to step the copy of the ball at
+    :param paddle: The right-hand paddle the ball is moving towards
+    :param screen_height: The height of the court
+    :return: y coordinate of center of ball when the ball will reach the edge of the paddle in the future
+    """
+    simulated_ball = ball.copy(ball_speed)
+    paddle_left_edge = paddle.x - paddle.half_width
+    while simulated_ball.x + simulated_ball.radius <= paddle_left_edge:
+        simulated_ball.move()
+        if horizontal_wall_collision(simulated_ball, screen_height):
+            simulated_ball.deflect('y')
+    return simulated_ball.y
+
+
+def predict_ball_path(ball, ball_speed, paddle, screen_height):
+    """
+    Finds the same y position as simulate_ball_path without stepping the ball across the court.
+
+    The stepped ball only bounces on the first step past a wall, so each bounce happens slightly beyond the wall.
+    Those overshoots alternate between two values, which makes the stepped path a triangle wave between two
+    fixed turning points, so the landing position can be found with a modulo instead of a loop.
+    :param ball: The ball to be predicted
+    :param ball_speed: Speed the ball would be stepped at
+    :param paddle: The right-hand paddle the ball is moving towards
+    :param screen_height: The height of the court
+    :return: y coordinate of center of ball when the ball will reach the edge of the paddle in the future
+    """
+    radians = math.radians(ball.heading)
+    vx = ball_speed*math.cos(radians)
+    vy = ball_speed*math.sin(radians)
+    if vx <= 0:
+        raise ValueError("Ball must be moving towards the right-hand paddle to predict its path")
+    # Number of steps until the ball passes the paddle's edge
+    distance = paddle.x - paddle.half_width - ball.radius - ball.x
+    steps = math.floor(distance/vx) + 1 if distance >= 0 else 0
+    # Mirror a downward ball so the first bounce is always off the top wall
+    sign = 1 if vy >= 0 else -1
+    y = sign*ball.y
+    vy = abs(vy)
+    wall_y = screen_height/2 - ball.radius
+    if vy == 0 or y + steps*vy <= wall_y:
+        return sign*(y + steps*vy)
+    # Position of the first bounce (the first step past the top wall)
+    first_bounce = max(math.floor((wall_y - y)/vy) + 1, 1)
+    top_y = y + first_bounce*vy
+    # Distance between bounces is a whole number of steps that covers the court plus both overshoots
+    court = 2*wall_y + top_y - wall_y
+    bounce_distance = (math.floor(court/vy) + 1)*vy
+    travelled = (steps - first_bounce)*vy % (2*bounce_distance)
+    if travelled <= bounce_distance:
+        return sign*(top_y - travelled)
+    return sign*(top_y - 2*bounce_distance + travelled)
+
+
+def predict_swept_ball_path(ball, ball_speed, paddle, screen_height):
+    """
+    Finds where a ball moved with swept collisions (see sweep_ball) will reach the paddle's edge.
+
+    Swept balls bounce exactly at the walls, so unfolding the bounces gives a straight line, and folding that
+    line back into the court gives the landing position.
+    :param ball: The ball to be predicted
+    :param ball_speed: Speed of the ball (only its direction matters for swept movement)
+    :param paddle: The right-hand paddle the ball is moving towards
+    :param screen_height: The height of the court
+    :return: y coordinate of center of ball when the ball will reach the edge of the paddle in the future
+    """
+    radians = math.radians(ball.heading)
+    if math.cos(radians) <= 0:
+        raise ValueError("Ball must be moving towards the right-hand paddle to predict its path")
+    wall_y = screen_height/2 - ball.radius
+    unfolded_y = ball.y + (paddle.x - paddle.half_width - ball.radius - ball.x)*math.tan(radians)
+    folded_y = (unfolded_y + wall_y) % (4*wall_y)
+    if folded_y <= 2*wall_y:
+        return folded_y - wall_y
+    return 3*wall_y - folded_y
+
+
+def paddle_time_of_impact(ball, paddle, time_left):
+    """
+    Finds when the ball's center, moving along its velocity, first enters the box around the paddle where it
+    counts as hitting the paddle (the paddle widened by the ball's radius on each side)
+    :param ball: The ball being checked for collision
+    :param paddle: The paddle the ball is moving towards
+    :param time_left: Fraction of the tick's movement left for the ball
+    :return: Fraction of a tick until impact; None if the ball doesn't reach the paddle within time_left
+    """
+    time_enter = -math.inf
+    time_exit = math.inf
+    for position, velocity, low, high in ((ball.x, ball.vx, paddle.x - paddle.half_width - ball.radius,
+                                           paddle.x + paddle.half_width + ball.radius),
+                                          (ball.y, ball.vy, paddle.y - paddle.half_length,
+                                           paddle.y + paddle.half_length)):
+        if velocity == 0:
+            if not low <= position <= high:
+                return None
+            continue
+        time_low = (low - position)/velocity
+        time_high = (high - position)/velocity
+        time_enter = max(time_enter, min(time_low, time_high))
+        time_exit = min(time_exit, max(time_low, time_high))
+    if time_exit < max(time_enter, 0) or time_enter > time_left:
+        return None
+    return max(time_enter, 0)
+
+
+def sweep_ball(ball, paddle_1, paddle_2, screen_width, screen_height, time_left=1.0):
+    """
+    Moves the ball along its velocity until it first touches a wall or the paddle it is moving towards,
+    or until it has used up time_left, so that fast balls can't pass through a paddle between ticks
+    :param ball: The ball to move
+    :param paddle_1: Player 1's (left) paddle
+    :param paddle_2: Player 2's (right) paddle
+    :param screen_width: The width of the court
+    :param screen_height: The height of the court
+    :param time_left: Fraction of the tick's movement left for the ball
+    :return: 2-entry tuple:
+        First: What the ball touched: "wall" (top or bottom), "point" (left or right), the paddle that was touched,
+            or None if it moved the whole time_left without touching anything
+        Second: Fraction of the tick's movement still left after the touch
+    """
+    impact_time = time_left
+    touched = None
+    wall_y = screen_height/2 - ball.radius
+    wall_x = screen_width/2 - ball.radius
+    if ball.vy != 0:
+        wall_time = max(((wall_y if ball.vy > 0 else -wall_y) - ball.y)/ball.vy, 0)
+        if wall_time <= impact_time:
+            impact_time, touched = wall_time, "wall"
+    if ball.vx != 0:
+        side_time = max(((wall_x if ball.vx > 0 else -wall_x) - ball.x)/ball.vx, 0)
+        if side_time < impact_time:
+            impact_time, touched = side_time, "point"
+        paddle = paddle_2 if ball.vx > 0 else paddle_1
+        paddle_time = paddle_time_of_impact(ball, paddle, impact_time)
+        if paddle_time is not None and (touched is None or paddle_time < impact_time):
+            impact_time, touched = paddle_time, paddle
+    ball.x += ball.vx*impact_time
+    ball.y += ball.vy*impact_time
+    return touched, time_left - impact_time
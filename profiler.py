@@ -0,0 +1,213 @@
+"""Frame Profiler Class File
+
+Contains FrameProfiler class, which times each phase of the game loop and counts frames that take longer than
+their budget, and NullProfiler class, which does nothing so that profiling can be left in the loop when disabled
+"""
+
+import csv
+import json
+import math
+import time
+
+PERCENTILES = (50, 95, 99)
+# Each phase's times are counted in a histogram of log-spaced buckets, so memory stays bounded however long the
+# game runs while percentiles still cover every sample. The buckets span SHORTEST to LONGEST seconds (shorter and
+# longer times go in the first and last buckets), with BUCKETS_PER_DECADE buckets per factor of 10, so a
+# percentile is within about 1% of the exact one
+SHORTEST = 1e-7
+LONGEST = 10.0
+BUCKETS_PER_DECADE = 100
+BUCKETS = round(math.log10(LONGEST/SHORTEST)*BUCKETS_PER_DECADE)
+
+
+def bucket_index(seconds):
+    """
+    :param seconds: A time
+    :return: Index of the histogram bucket the time is counted in
+    """
+    if seconds <= SHORTEST:
+        return 0
+    return min(int(math.log10(seconds/SHORTEST)*BUCKETS_PER_DECADE), BUCKETS - 1)
+
+
+def bucket_bounds(index):
+    """
+    :param index: Index of a histogram bucket
+    :return: (shortest, longest) time in seconds counted in the bucket
+    """
+    return SHORTEST*10**(index/BUCKETS_PER_DECADE), SHORTEST*10**((index + 1)/BUCKETS_PER_DECADE)
+
+
+def percentile(histogram, count, percent, shortest, longest):
+    """
+    :param histogram: List of the number of samples in each bucket
+    :param count: Total number of samples
+    :param percent: Percentile to find (0 to 100)
+    :param shortest: Shortest sample
+    :param longest: Longest sample
+    :return: Nearest-rank percentile of the samples, as the middle of the bucket it falls in (kept between the
+            shortest and longest samples); 0 if there are none
+    """
+    if not count:
+        return 0.0
+    rank = max(round(percent/100*count) - 1, 0)
+    seen = 0
+    for index, bucket_count in enumerate(histogram):
+        seen += bucket_count
+        if seen > rank:
+            low, high = bucket_bounds(index)
+            return min(max(math.sqrt(low*high), shortest), longest)
+    return longest
+
+
+class NullProfiler:
+    """A class to represent a profiler that records nothing"""
+
+    def start(self, phase):
+        """
+        Marks the start of a phase
+        :param phase: Name of the phase
+        """
+
+    def stop(self, phase):
+        """
+        Marks the end of a phase
+        :param phase: Name of the phase
+        """
+
+    def record(self, phase, seconds):
+        """
+        Records a time measured some other way
+        :param phase: Name of the phase
+        :param seconds: Time to record
+        """
+
+    def start_frame(self):
+        """
+        Marks the start of the work for a frame
+        """
+
+    def stop_frame(self):
+        """
+        Marks the end of the work for a frame
+        """
+
+
+class FrameProfiler(NullProfiler):
+    """A class to record how long each phase of the game loop takes
+
+    Times are measured in seconds; summaries are reported in milliseconds. Each phase keeps a histogram of its
+    times (see BUCKETS) and running totals, so every statistic covers the whole session
+    """
+
+    def __init__(self, frame_budget, clock=time.perf_counter):
+        """
+        param frame_budget: Most time in seconds a frame's work should take before it counts as missing its budget
+        param clock: Function that returns the current time in seconds
+        """
+        self.frame_budget = frame_budget
+        self.clock = clock
+        # Histogram of each phase's times, and [count, total, minimum, maximum] of them
+        self.histograms = {}
+        self.totals = {}
+        self.started = {}
+        self.frame_started = None
+        self.frames = 0
+        self.missed_frames = 0
+
+    def start(self, phase):
+        """
+        Marks the start of a phase
+        :param phase: Name of the phase
+        """
+        self.started[phase] = self.clock()
+
+    def stop(self, phase):
+        """
+        Marks the end of a phase and records its time
+        :param phase: Name of the phase
+        """
+        self.record(phase, self.clock() - self.started[phase])
+
+    def record(self, phase, seconds):
+        """
+        Records a time measured some other way, e.g. how long an input waited before being applied
+        :param phase: Name of the phase
+        :param seconds: Time to record
+        """
+        if phase not in self.histograms:
+            self.histograms[phase] = [0]*BUCKETS
+            self.totals[phase] = [0, 0.0, seconds, seconds]
+        self.histograms[phase][bucket_index(seconds)] += 1
+        totals = self.totals[phase]
+        totals[0] += 1
+        totals[1] += seconds
+        if seconds < totals[2]:
+            totals[2] = seconds
+        elif seconds > totals[3]:
+            totals[3] = seconds
+
+    def start_frame(self):
+        """
+        Marks the start of the work for a frame
+        """
+        self.frame_started = self.clock()
+
+    def stop_frame(self):
+        """
+        Marks the end of the work for a frame, recording its time and whether it missed its budget
+        """
+        seconds = self.clock() - self.frame_started
+        self.record("frame", seconds)
+        self.frames += 1
+        if seconds > self.frame_budget:
+            self.missed_frames += 1
+
+    def summary(self):
+        """
+        :return: dict with the frame budget and counts, and for each phase its count, mean, percentiles, and maximum
+                time (in milliseconds)
+        """
+        phases = {}
+        for phase, histogram in self.histograms.items():
+            count, total, minimum, maximum = self.totals[phase]
+            phases[phase] = {
+                "count": count,
+                "mean_ms": total/count*1000,
+                **{f"p{percent}_ms": percentile(histogram, count, percent, minimum, maximum)*1000
+                   for percent in PERCENTILES},
+                "max_ms": maximum*1000,
+            }
+        return {
+            "frame_budget_ms": self.frame_budget*1000,
+            "frames": self.frames,
+            "missed_frames": self.missed_frames,
+            "phases": phases,
+        }
+
+    def histogram(self, phase):
+        """
+        :param phase: Name of a phase
+        :return: List of (longest time in milliseconds, number of samples) of each bucket the phase has samples in
+        """
+        return [(bucket_bounds(index)[1]*1000, bucket_count)
+                for index, bucket_count in enumerate(self.histograms[phase]) if bucket_count]
+
+    def write(self, path):
+        """
+        Writes the summary to a file: JSON (with each phase's histogram) if the path ends in .json, otherwise CSV
+        with one row per phase
+        :param path: Path of the file to write
+        """
+        summary = self.summary()
+        with open(path, 'w', newline='') as file:
+            if path.endswith(".json"):
+                summary["histograms"] = {phase: self.histogram(phase) for phase in self.histograms}
+                json.dump(summary, file, indent=2)
+                return
+            fieldnames = ["phase", "count", "mean_ms"] + [f"p{percent}_ms" for percent in PERCENTILES] + ["max_ms"]
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            for phase, stats in summary["phases"].items():
+                writer.writerow({"phase": phase, **stats})
+            writer.writerow({"phase": "missed_frames", "count": summary["missed_frames"]})
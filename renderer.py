@@ -0,0 +1,315 @@
+"""Renderer Class File
+
+Contains classes that draw a Match:
+CanvasRenderer keeps one Tk canvas item per object and only changes the items that moved,
+TurtleRenderer draws with the game's Turtle classes, and NullRenderer draws nothing (for headless runs).
+MultiBallCanvasRenderer draws a multiball.MultiBallMatch like CanvasRenderer
+"""
+
+# The turtle-based classes are imported by the renderers that use them, so that headless runs with
+# NullRenderer don't need Tk
+
+
+def draw_half_court_line(canvas, screen_height):
+    """
+    Draws the vertical half-court line as one dashed canvas line instead of a turtle drawing each dash
+    :param canvas: Tk canvas of a turtle Screen
+    :param screen_height: The height of the court
+    """
+    canvas.create_line(0, -screen_height/2, 0, screen_height/2, fill="white", dash=(10, 10))
+
+
+def interpolate(previous, current, alpha):
+    """
+    :param previous: Tuple of positions at the previous tick; None to use the current positions
+    :param current: Tuple of positions at the current tick
+    :param alpha: How far from the previous positions to the current ones to go (0 to 1)
+    :return: Tuple of positions in between
+    """
+    if previous is None:
+        return current
+    return tuple(old + (new - old)*alpha for old, new in zip(previous, current))
+
+
+class NullRenderer:
+    """A class to represent a renderer that draws nothing, for running matches without a display"""
+
+    def __init__(self, match):
+        """
+        param match: The match to draw
+        """
+        self.match = match
+        self.player_names = ["Player 1", "CPU"]
+
+    def show_names(self, player_1_name, player_2_name):
+        """
+        Writes each player's name above their score
+        :param player_1_name: Name of Player 1
+        :param player_2_name: Name of Player 2
+        """
+        self.player_names = [player_1_name, player_2_name]
+
+    def show_ball(self, visible):
+        """
+        :param visible: True to show the ball, False to hide it
+        """
+
+    def show_winner(self, player_number):
+        """
+        Writes winning message with the winning player's name
+        :param player_number: Number of the winning player
+        """
+
+    def reset(self):
+        """
+        Clears the winning message and redraws everything, after the match is started over
+        """
+
+    def draw(self, previous=None, alpha=1.0):
+        """
+        Draws the current state of the match
+        :param previous: Match.positions() from the previous tick, for drawing in between ticks
+        :param alpha: How far from the previous positions to the current ones to draw (0 to 1)
+        """
+
+
+class CanvasRenderer(NullRenderer):
+    """A class to draw a match straight onto the Tk canvas of a turtle Screen
+
+    The court and names are drawn once, the scores are only rewritten when they change, and each frame only
+    moves the ball and paddle items, instead of every turtle being redrawn by Screen.update()
+    """
+
+    def __init__(self, match, screen):
+        """
+        param match: The match to draw
+        param screen: The turtle Screen to draw on
+        """
+        from text_display import FONT
+        super().__init__(match)
+        self.font = FONT
+        self.canvas = screen.getcanvas()
+        half_height = match.screen_height/2
+        draw_half_court_line(self.canvas, match.screen_height)
+        self.create_balls()
+        self.paddle_items = [self.canvas.create_rectangle(paddle.x - paddle.half_width, -paddle.half_length,
+                                                          paddle.x + paddle.half_width, paddle.half_length,
+                                                          fill="white", outline="white")
+                             for paddle in match.paddles]
+        self.score_items = [self.write(x, half_height - 120, "") for x in (-85, 85)]
+        self.drawn_positions = None
+        self.drawn_scores = None
+        self.winner_item = None
+        self.draw()
+
+    def write(self, x, y, text):
+        """
+        Writes text the same way Turtle.write(align='center') would
+        :param x: x position of the bottom center of the text
+        :param y: y position of the bottom center of the text
+        :param text: Text to write
+        :return: Canvas item of the text
+        """
+        return self.canvas.create_text(x - 1, -y, text=text, anchor="s", fill="white", font=self.font)
+
+    def show_names(self, player_1_name, player_2_name):
+        """
+        Writes each player's name above their score
+        :param player_1_name: Name of Player 1
+        :param player_2_name: Name of Player 2
+        """
+        super().show_names(player_1_name, player_2_name)
+        for x, name in ((-85, player_1_name), (85, player_2_name)):
+            self.write(x, self.match.screen_height/2 - 60, name)
+
+    def create_balls(self):
+        """
+        Creates the canvas item of the ball
+        """
+        radius = self.match.ball.radius
+        self.ball_item = self.canvas.create_oval(-radius, -radius, radius, radius, fill="white", outline="white")
+
+    def move_balls(self, positions, drawn):
+        """
+        Moves the ball's canvas item if the ball moved
+        :param positions: Positions to draw, like Match.positions()
+        :param drawn: Positions drawn last frame; None for each position if nothing has been drawn yet
+        """
+        if positions[:2] != drawn[:2]:
+            ball_x, ball_y = positions[:2]
+            radius = self.match.ball.radius
+            self.canvas.coords(self.ball_item, ball_x - radius, -ball_y - radius, ball_x + radius, -ball_y + radius)
+
+    def show_ball(self, visible):
+        """
+        :param visible: True to show the ball, False to hide it
+        """
+        self.canvas.itemconfigure(self.ball_item, state="normal" if visible else "hidden")
+
+    def show_winner(self, player_number):
+        """
+        Writes winning message with the winning player's name
+        :param player_number: Number of the winning player
+        """
+        self.winner_item = self.write(0, 50, f"{self.player_names[player_number - 1]} is the winner")
+        self.canvas.update()
+
+    def reset(self):
+        """
+        Clears the winning message and redraws everything, after the match is started over
+        """
+        if self.winner_item is not None:
+            self.canvas.delete(self.winner_item)
+            self.winner_item = None
+        self.show_ball(True)
+        self.drawn_positions = None
+        self.drawn_scores = None
+        self.draw()
+
+    def draw(self, previous=None, alpha=1.0):
+        """
+        Moves the ball and paddles if they moved, rewrites the scores if they changed, and updates the window
+        :param previous: Match.positions() from the previous tick, for drawing in between ticks
+        :param alpha: How far from the previous positions to the current ones to draw (0 to 1)
+        """
+        positions = interpolate(previous, self.match.positions(), alpha)
+        drawn = self.drawn_positions or (None,)*4
+        self.move_balls(positions, drawn)
+        for item, paddle, paddle_y, drawn_y in zip(self.paddle_items, self.match.paddles, positions[2:], drawn[2:]):
+            if paddle_y != drawn_y:
+                self.canvas.coords(item, paddle.x - paddle.half_width, -paddle_y - paddle.half_length,
+                                   paddle.x + paddle.half_width, -paddle_y + paddle.half_length)
+        self.drawn_positions = positions
+        if self.match.scores != self.drawn_scores:
+            for item, score in zip(self.score_items, self.match.scores):
+                self.canvas.itemconfigure(item, text=score)
+            self.drawn_scores = list(self.match.scores)
+        self.canvas.update()
+
+
+class MultiBallCanvasRenderer(CanvasRenderer):
+    """A class to draw a MultiBallMatch straight onto the Tk canvas of a turtle Screen, with one canvas item per
+    ball"""
+
+    def create_balls(self):
+        """
+        Creates a canvas item for each ball
+        """
+        radius = self.match.radius
+        self.ball_items = [self.canvas.create_oval(-radius, -radius, radius, radius, fill="white", outline="white")
+                           for _ in range(self.match.num_balls)]
+
+    def move_balls(self, positions, drawn):
+        """
+        Moves the canvas items of the balls that moved
+        :param positions: Positions to draw, like MultiBallMatch.positions()
+        :param drawn: Positions drawn last frame; None for each position if nothing has been drawn yet
+        """
+        radius = self.match.radius
+        coords = self.canvas.coords
+        xs, ys = positions[:2]
+        drawn_xs, drawn_ys = drawn[:2]
+        if drawn_xs is None:
+            moved = range(len(xs))
+        else:
+            moved = ((xs != drawn_xs) | (ys != drawn_ys)).nonzero()[0]
+        for index in moved:
+            ball_x = float(xs[index])
+            ball_y = float(ys[index])
+            coords(self.ball_items[index], ball_x - radius, -ball_y - radius, ball_x + radius, -ball_y + radius)
+
+    def show_ball(self, visible):
+        """
+        :param visible: True to show the balls, False to hide them
+        """
+        for item in self.ball_items:
+            self.canvas.itemconfigure(item, state="normal" if visible else "hidden")
+
+
+class TurtleRenderer(NullRenderer):
+    """A class to draw a match with the game's Turtle classes, redrawing every turtle each frame"""
+
+    def __init__(self, match, screen):
+        """
+        param match: The match to draw
+        param screen: The turtle Screen to draw on
+        """
+        from player import Player
+        from cpu_player import CPU
+        from ball import Ball
+        from text_display import Scoreboard
+        super().__init__(match)
+        self.screen = screen
+        draw_half_court_line(screen.getcanvas(), match.screen_height)
+        paddle_length = match.paddles[0].paddle_length
+        self.players = [
+            Player(1, paddle_length, match.paddle_speed, match.screen_width, match.screen_height, "",
+                   match.paddles[0]),
+            CPU(paddle_length, match.cpu_paddle_speed, match.screen_width, match.screen_height,
+                paddle_state=match.paddles[1], brain=match.cpu),
+        ]
+        self.scoreboards = [Scoreboard(player) for player in self.players]
+        self.ball = Ball(match.ball_speed, match.ball)
+        self.final_display = None
+        self.screen.update()
+
+    def show_names(self, player_1_name, player_2_name):
+        """
+        Writes each player's name above their score
+        :param player_1_name: Name of Player 1
+        :param player_2_name: Name of Player 2
+        """
+        from text_display import NameDisplay
+        super().show_names(player_1_name, player_2_name)
+        for player, name in zip(self.players, (player_1_name, player_2_name)):
+            player.player_name = name
+            NameDisplay(player)
+
+    def show_ball(self, visible):
+        """
+        :param visible: True to show the ball, False to hide it
+        """
+        if visible:
+            self.ball.showturtle()
+        else:
+            self.ball.hideturtle()
+
+    def show_winner(self, player_number):
+        """
+        Writes winning message with the winning player's name
+        :param player_number: Number of the winning player
+        """
+        from text_display import FinalDisplay
+        self.final_display = FinalDisplay(self.players[player_number - 1])
+        self.screen.update()
+
+    def reset(self):
+        """
+        Clears the winning message and redraws everything, after the match is started over
+        """
+        if self.final_display is not None:
+            self.final_display.clear()
+            self.final_display = None
+        self.show_ball(True)
+        self.draw()
+
+    def draw(self, previous=None, alpha=1.0):
+        """
+        Moves every turtle to match the match state, rewrites changed scores, and updates the screen
+        :param previous: Match.positions() from the previous tick, for drawing in between ticks
+        :param alpha: How far from the previous positions to the current ones to draw (0 to 1)
+        """
+        if previous is None:
+            self.ball.render()
+            for player in self.players:
+                player.paddle.render()
+        else:
+            self.ball.render(previous[:2], alpha)
+            for player, previous_y in zip(self.players, previous[2:]):
+                player.paddle.render(previous_y, alpha)
+        for player, scoreboard, score in zip(self.players, self.scoreboards, self.match.scores):
+            if player.score != score:
+                player.score = score
+                scoreboard.clear()
+                scoreboard.rewrite(player)
+        self.screen.update()
@@ -0,0 +1,206 @@
+"""Replay File
+
+Contains Recorder class, which records a seeded match's settings and inputs as it is played, Recording class,
+which saves and loads recordings in a compact binary format, and functions to replay and verify recordings.
+
+Run this script to replay recordings headless as fast as possible and check that each one still reaches the
+same final state (e.g. after a physics change):
+    python replay.py recordings/*.pongrec
+"""
+
+import json
+import math
+import struct
+import sys
+from rules import Match, GameState
+
+MAGIC = b"PONGREC\x03"
+# Seed and length of the settings JSON
+HEADER = struct.Struct("<qI")
+# GameState without the random number generator states (future_y is NaN if None)
+FINAL_STATE = struct.Struct("<7d2H?3d?2bQ")
+# Whether the CPU saved any search state, then PlanningCPUBrain's (next aim, best score, aim noise)
+CPU_STATE = struct.Struct("<?I2d")
+# Tick, kind of event, player number, direction
+EVENT = struct.Struct("<IBBb")
+# Kinds of events: a round restart, a single paddle move (Match.move_paddle), and a held paddle direction
+# changing (Match.hold_paddle)
+RESTART = 0
+MOVE = 1
+HOLD = 2
+
+
+class Recording:
+    """A class to represent everything needed to reproduce a match: its seed, settings, inputs, and final state"""
+
+    def __init__(self, seed, config, events, final_state=None):
+        """
+        param seed: Seed the match was created with
+        param config: dict of the keyword arguments the Match was created with (other than seed)
+        param events: List of (tick, kind, player number, direction) inputs in the order they happened;
+                kind is RESTART, MOVE, or HOLD
+        param final_state: GameState the match ended in; None if not finished recording
+        """
+        self.seed = seed
+        self.config = config
+        self.events = events
+        self.final_state = final_state
+
+    def to_bytes(self):
+        """
+        :return: The recording in its binary format
+        """
+        config = json.dumps(self.config).encode()
+        state = self.final_state
+        future_y = math.nan if state.future_y is None else state.future_y
+        cpu_state = state.cpu_state
+        parts = [MAGIC, HEADER.pack(self.seed, len(config)), config,
+                 FINAL_STATE.pack(*state[:12], future_y, *state[13:17]),
+                 CPU_STATE.pack(False, 0, 0, 0) if cpu_state is None else CPU_STATE.pack(True, *cpu_state),
+                 struct.pack("<I", len(self.events))]
+        parts.extend(EVENT.pack(*event) for event in self.events)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        :param data: A recording in its binary format
+        :return: Recording object
+        """
+        if not data.startswith(MAGIC):
+            raise ValueError("Not a Pong recording")
+        offset = len(MAGIC)
+        seed, config_length = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        config = json.loads(data[offset:offset + config_length])
+        offset += config_length
+        fields = list(FINAL_STATE.unpack_from(data, offset))
+        offset += FINAL_STATE.size
+        if math.isnan(fields[12]):
+            fields[12] = None
+        has_cpu_state, *cpu_state = CPU_STATE.unpack_from(data, offset)
+        offset += CPU_STATE.size
+        (event_count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        events = [EVENT.unpack_from(data, offset + i*EVENT.size) for i in range(event_count)]
+        return cls(seed, config, events, GameState(*fields, None, tuple(cpu_state) if has_cpu_state else None))
+
+    def save(self, path):
+        """
+        :param path: Path of the file to write the recording to
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: Path of a recording file
+        :return: Recording object
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class Recorder:
+    """A class to create a seeded match and record every input to it
+
+    Inputs and round restarts must go through the recorder instead of straight to the match
+    """
+
+    def __init__(self, config, seed):
+        """
+        param config: dict of keyword arguments for Match (other than seed); must be JSON serializable
+        param seed: Integer seed for the match
+        """
+        self.match = Match(**config, seed=seed)
+        self.recording = Recording(seed, config, [])
+
+    def reset(self, seed):
+        """
+        Starts the match over with a new seed and starts a new recording
+        :param seed: Integer seed for the new match
+        """
+        self.match.reset(seed)
+        self.recording = Recording(seed, self.recording.config, [])
+
+    def move_paddle(self, player_number, direction):
+        """
+        Moves a human player's paddle and records the move
+        :param player_number: The number of the player whose paddle moves
+        :param direction: 1 to move up, -1 to move down, 0 to stay put
+        """
+        self.match.move_paddle(player_number, direction)
+        self.recording.events.append((self.match.ticks, MOVE, player_number, direction))
+
+    def hold_paddle(self, player_number, direction):
+        """
+        Starts or stops a human player's paddle moving every tick and records the change
+        :param player_number: The number of the player whose paddle moves
+        :param direction: 1 to hold up, -1 to hold down, 0 to let go
+        """
+        self.match.hold_paddle(player_number, direction)
+        self.recording.events.append((self.match.ticks, HOLD, player_number, direction))
+
+    def restart_round(self):
+        """
+        Restarts the round and records the restart
+        """
+        self.match.restart_round()
+        self.recording.events.append((self.match.ticks, RESTART, 0, 0))
+
+    def finish(self):
+        """
+        :return: The Recording, with the match's current state as its final state
+        """
+        self.recording.final_state = self.match.snapshot()
+        return self.recording
+
+
+def replay(recording):
+    """
+    Plays a recording again headless, as fast as possible
+    :param recording: Recording to replay
+    :return: The Match in the state it was in when recording finished
+    """
+    match = Match(**recording.config, seed=recording.seed)
+    events = iter(recording.events)
+    event = next(events, None)
+    while True:
+        # Inputs happen between ticks, in the order they were recorded
+        while event is not None and event[0] == match.ticks:
+            if event[1] == RESTART:
+                match.restart_round()
+            elif event[1] == MOVE:
+                match.move_paddle(event[2], event[3])
+            else:
+                match.hold_paddle(event[2], event[3])
+            event = next(events, None)
+        if match.ticks >= recording.final_state.ticks:
+            return match
+        match.step()
+
+
+def verify(recording):
+    """
+    :param recording: Recording to check
+    :return: True if replaying the recording reaches exactly its recorded final state
+    """
+    return replay(recording).snapshot() == recording.final_state
+
+
+def main():
+    failed = 0
+    for path in sys.argv[1:]:
+        if verify(Recording.load(path)):
+            print(f"ok        {path}")
+        else:
+            print(f"MISMATCH  {path}")
+            failed += 1
+    print(f"{len(sys.argv) - 1 - failed} passed, {failed} failed")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
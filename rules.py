@@ -0,0 +1,408 @@
+"""Game Rules File
+
+Contains Match class, which runs the game rules (movement, collisions, CPU reactions, and scoring)
+on the turtle-free state from physics.py, so that matches can be played with or without a display
+"""
+
+import copy
+import random
+from collections import namedtuple
+from physics import BallState, PaddleState, horizontal_wall_collision, vertical_wall_collision, paddle_collision, \
+    simulate_ball_path, predict_ball_path, predict_swept_ball_path, sweep_ball
+from cpu_brain import CPUBrain
+
+# Ways the CPU can predict where the ball will reach its paddle
+# "stepped" is the original step-by-step simulation, kept as a reference for cross-checking "analytic"
+# "swept" is exact for swept collisions, where bounces happen exactly at the walls
+# "table" looks the prediction up in a precomputed TrajectoryTable of the exact one (needs NumPy)
+PREDICTIONS = {"analytic": predict_ball_path, "stepped": simulate_ball_path, "swept": predict_swept_ball_path,
+               "table": None}
+# Most collisions a ball can have in one tick with swept collisions, in case it gets wedged between objects
+MAX_SWEPT_COLLISIONS = 8
+
+# Everything about a match that changes while it is played, as a compact immutable record
+# rng_state is the (ball, CPU) random number generators' states, or None if they weren't saved
+GameState = namedtuple("GameState", [
+    "ball_x", "ball_y", "ball_vx", "ball_vy", "ball_heading",
+    "paddle_1_y", "paddle_2_y", "score_1", "score_2",
+    "reacted", "react_x", "di_intent", "future_y", "stop_moving",
+    "paddle_1_direction", "paddle_2_direction", "ticks", "rng_state", "cpu_state",
+], defaults=(None,))
+
+
+def copy_rng(rng):
+    """
+    :param rng: Random number generator (a random.Random or the random module)
+    :return: New random.Random in the same state, which makes the same choices without affecting rng
+    """
+    clone = random.Random()
+    clone.setstate(rng.getstate())
+    return clone
+
+
+class Match:
+    """A class to represent a match between Player 1 (left) and the CPU (right)
+
+    Each call to step() advances the game by one tick of the main loop
+    """
+
+    def __init__(self, screen_width=800, screen_height=500, paddle_length=5, paddle_speed=40, cpu_paddle_speed=None,
+                 ball_speed=3, winning_score=5, rng=random, prediction=None, react_x_range=None,
+                 di_intent_range=None, swept=False, seed=None, held_paddle_speed=None, planner=None,
+                 two_players=False):
+        """
+        param screen_width: The width of the court
+        param screen_height: The height of the court
+        param paddle_length: The length of both paddles (in units for turtlesize() scaling method)
+        param paddle_speed: Distance Player 1's paddle moves per key press
+        param cpu_paddle_speed: Distance the CPU's paddle moves per tick; defaults to paddle_speed/30
+        param ball_speed: Distance the ball moves per tick
+        param winning_score: Score needed to win the match
+        param rng: Random number generator for ball direction and CPU reactions; defaults to the random module
+        param prediction: Name of the method in PREDICTIONS the CPU uses to predict the ball's path;
+                defaults to the exact one for the type of collisions ("analytic" or "swept")
+        param react_x_range: (lowest, highest) x positions where the CPU can react; see CPUBrain
+        param di_intent_range: (lowest, highest) offsets the CPU aims its paddle at; see CPUBrain
+        param swept: If True, collisions are found anywhere along the ball's path during a tick (so fast balls
+                can't pass through paddles) instead of only at its position after each tick
+        param seed: If given, replaces rng with separate random number generators for the ball and the CPU,
+                both seeded from this, so the match can be reproduced
+        param held_paddle_speed: Distance a human player's paddle moves per tick while its key is held;
+                defaults to paddle_speed/8
+        param planner: Name of a difficulty in cpu_planner.DIFFICULTIES to have the CPU aim its returns away
+                from Player 1 (see PlanningCPUBrain) instead of at a random spot on its paddle; None for the
+                original CPU. The planner always predicts with the exact constant-time method for the type of
+                collisions, whatever prediction is
+        param two_players: If True, Player 2 is a second human whose paddle is moved with hold_paddle(), and the
+                CPU doesn't play
+        """
+        if prediction is None:
+            prediction = "swept" if swept else "analytic"
+        if prediction not in PREDICTIONS:
+            raise ValueError(f"Unknown prediction method {prediction!r}; choose from {', '.join(PREDICTIONS)}")
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.paddle_speed = paddle_speed
+        self.cpu_paddle_speed = paddle_speed/30 if cpu_paddle_speed is None else cpu_paddle_speed
+        self.held_paddle_speed = paddle_speed/8 if held_paddle_speed is None else held_paddle_speed
+        self.ball_speed = ball_speed
+        self.winning_score = winning_score
+        cpu_rng = rng
+        if seed is not None:
+            rng = random.Random(f"{seed}/ball")
+            cpu_rng = random.Random(f"{seed}/cpu")
+        self.seed = seed
+        self.rng = rng
+        self.predict_ball_path = PREDICTIONS[prediction]
+        if prediction == "table":
+            from trajectory_table import TrajectoryTable
+            self.predict_ball_path = TrajectoryTable.load(screen_width, screen_height, ball_speed,
+                                                          "swept" if swept else "analytic")
+        self.swept = swept
+        self.two_players = two_players
+        self.ball = BallState(ball_speed)
+        self.paddles = (PaddleState(1, paddle_length, screen_width), PaddleState(2, paddle_length, screen_width))
+        if planner is None:
+            self.cpu = CPUBrain(paddle_length, screen_width, screen_height, cpu_rng, react_x_range,
+                                di_intent_range)
+        else:
+            from cpu_planner import PlanningCPUBrain
+            # The planner makes many predictions per tick, so it always uses the constant-time exact one, even if
+            # the CPU's reactions use the step-by-step simulation
+            self.cpu = PlanningCPUBrain(paddle_length, screen_width, screen_height, cpu_rng, react_x_range,
+                                        di_intent_range, planner, ball_speed=ball_speed,
+                                        predict=predict_swept_ball_path if swept else predict_ball_path,
+                                        opponent_speed=self.held_paddle_speed)
+        self.scores = [0, 0]
+        # Direction each player's paddle is held in (1 for up, -1 for down, 0 for not held)
+        self.paddle_directions = [0, 0]
+        # (paddle, directional influence, ball y) of the most recent paddle hit, for telemetry; None before any
+        self.last_hit = None
+        self.ticks = 0
+        self.restart_round()
+
+    def restart_round(self):
+        """
+        Puts the ball back in the center with a new direction and re-centers both paddles
+        """
+        self.ball.restart(self.ball_speed, self.rng)
+        for paddle in self.paddles:
+            paddle.reset(self.screen_width)
+        # If ball starts moving to the right, CPU needs to react right away without waiting for the ball to come
+        # from Player 1
+        if self.ball.left_right() == "right":
+            self.cpu.set_react_x(ball_reset=True)
+
+    def reset(self, seed=None):
+        """
+        Starts the match over at 0-0, keeping the same ball, paddle, and CPU objects
+        :param seed: If given, replaces the random number generators with new ones seeded from this
+                (as the seed argument of Match does)
+        """
+        if seed is not None:
+            self.seed = seed
+            self.rng = random.Random(f"{seed}/ball")
+            self.cpu.rng = random.Random(f"{seed}/cpu")
+        self.cpu.reset()
+        self.scores[:] = [0, 0]
+        self.paddle_directions[:] = [0, 0]
+        self.ticks = 0
+        self.restart_round()
+
+    def snapshot(self, include_rng=False):
+        """
+        :param include_rng: True to also save the random number generator's state, so that restoring the snapshot
+                replays the same random choices
+        :return: GameState of the match right now
+        """
+        ball = self.ball
+        cpu = self.cpu
+        return GameState(ball.x, ball.y, ball.vx, ball.vy, ball.heading,
+                         self.paddles[0].y, self.paddles[1].y, self.scores[0], self.scores[1],
+                         cpu.reacted, cpu.react_x, cpu.di_intent, cpu.future_y, cpu.stop_moving,
+                         self.paddle_directions[0], self.paddle_directions[1], self.ticks,
+                         (self.rng.getstate(), cpu.rng.getstate()) if include_rng else None, cpu.snapshot())
+
+    def restore(self, state):
+        """
+        Puts the match back into a state from snapshot()
+        :param state: GameState to restore
+        """
+        ball = self.ball
+        cpu = self.cpu
+        ball.x, ball.y, ball.vx, ball.vy, ball.heading = state[:5]
+        self.paddles[0].y, self.paddles[1].y, self.scores[0], self.scores[1] = state[5:9]
+        cpu.reacted, cpu.react_x, cpu.di_intent, cpu.future_y, cpu.stop_moving = state[9:14]
+        self.paddle_directions[:] = state[14:16]
+        self.ticks = state.ticks
+        if state.rng_state is not None:
+            self.rng.setstate(state.rng_state[0])
+            cpu.rng.setstate(state.rng_state[1])
+        cpu.restore(state.cpu_state)
+
+    def copy(self, rng=None):
+        """
+        Creates an independent match in the same state with the same settings, e.g. for trying out different moves
+        :param rng: Random number generator for the copy's ball and CPU; if None, the copy gets its own generators
+                with the same states as this match's, so it makes the same random choices without using up this
+                match's
+        :return: New Match object
+        """
+        clone = copy.copy(self)
+        clone.ball = self.ball.copy()
+        clone.paddles = tuple(PaddleState(paddle.player_number, paddle.paddle_length, self.screen_width)
+                              for paddle in self.paddles)
+        clone.cpu = copy.copy(self.cpu)
+        clone.scores = list(self.scores)
+        clone.paddle_directions = list(self.paddle_directions)
+        if rng is not None:
+            clone.rng = clone.cpu.rng = rng
+        else:
+            clone.rng = copy_rng(self.rng)
+            clone.cpu.rng = clone.rng if self.cpu.rng is self.rng else copy_rng(self.cpu.rng)
+        clone.restore(self.snapshot())
+        return clone
+
+    def move_paddle(self, player_number, direction):
+        """
+        Moves a human player's paddle by one paddle_speed step
+        :param player_number: The number of the player whose paddle moves
+        :param direction: 1 to move up, -1 to move down, 0 to stay put
+        """
+        paddle = self.paddles[player_number - 1]
+        if direction > 0:
+            paddle.move_up(self.paddle_speed, self.screen_height)
+        elif direction < 0:
+            paddle.move_down(self.paddle_speed, self.screen_height)
+
+    def hold_paddle(self, player_number, direction):
+        """
+        Starts or stops a human player's paddle moving by held_paddle_speed every tick
+        :param player_number: The number of the player whose paddle moves
+        :param direction: 1 to hold up, -1 to hold down, 0 to let go
+        """
+        self.paddle_directions[player_number - 1] = direction
+
+    def move_held_paddles(self):
+        """
+        Moves each paddle that is held for one tick
+        """
+        for paddle, direction in zip(self.paddles, self.paddle_directions):
+            if direction > 0:
+                paddle.move_up(self.held_paddle_speed, self.screen_height)
+            elif direction < 0:
+                paddle.move_down(self.held_paddle_speed, self.screen_height)
+
+    def positions(self):
+        """
+        :return: Tuple of the positions of everything that moves: (ball x, ball y, Player 1 paddle y,
+                Player 2 paddle y)
+        """
+        return self.ball.x, self.ball.y, self.paddles[0].y, self.paddles[1].y
+
+    def is_over(self):
+        """
+        :return: True if either player has reached the winning score
+        """
+        return self.scores[0] >= self.winning_score or self.scores[1] >= self.winning_score
+
+    def incoming_ball_y(self, player_number):
+        """
+        :param player_number: Number of a player
+        :return: y position of the ball if it is moving towards the player's paddle; None if it isn't
+        """
+        if self.ball.left_right() != ("left" if player_number == 1 else "right"):
+            return None
+        return self.ball.y
+
+    def winner(self):
+        """
+        :return: Number of the player who won the match; None if the match isn't over
+        """
+        if self.scores[0] >= self.winning_score:
+            return 1
+        if self.scores[1] >= self.winning_score:
+            return 2
+        return None
+
+    def step(self):
+        """
+        Advances the match by one tick
+        :return: str describing what the ball hit this tick ("wall", "paddle", or "point"); None if nothing
+        """
+        self.ticks += 1
+        directions = self.paddle_directions
+        if directions[0] or directions[1]:
+            self.move_held_paddles()
+        if not self.two_players:
+            self.react_cpu()
+            self.move_cpu()
+        if self.swept:
+            return self.sweep()
+        self.ball.move()
+        return self.check_collisions()
+
+    def profiled_step(self, profiler):
+        """
+        Advances the match by one tick like step(), timing each phase of the tick
+        :param profiler: FrameProfiler that records the time of each phase
+        :return: str describing what the ball hit this tick ("wall", "paddle", or "point"); None if nothing
+        """
+        self.ticks += 1
+        profiler.start("player_movement")
+        self.move_held_paddles()
+        profiler.stop("player_movement")
+        if not self.two_players:
+            profiler.start("cpu_reaction")
+            self.react_cpu()
+            profiler.stop("cpu_reaction")
+            profiler.start("cpu_movement")
+            self.move_cpu()
+            profiler.stop("cpu_movement")
+        # Swept collisions happen while the ball moves, so they are timed as part of ball movement
+        profiler.start("ball_movement")
+        if self.swept:
+            event = self.sweep()
+            profiler.stop("ball_movement")
+            return event
+        self.ball.move()
+        profiler.stop("ball_movement")
+        profiler.start("collisions")
+        event = self.check_collisions()
+        profiler.stop("collisions")
+        return event
+
+    def react_cpu(self):
+        """
+        Has the CPU predict where the ball will reach its paddle once the ball crosses the CPU's react_x
+        """
+        cpu = self.cpu
+        # A fast swept ball can cross react_x and bounce off the CPU's paddle in the same tick, after which there is
+        # nothing left to predict
+        if self.ball.x >= cpu.react_x and not cpu.reacted and self.ball.vx > 0:
+            cpu.react(future_y=self.predict_ball_path(self.ball, self.ball_speed, self.paddles[1],
+                                                      self.screen_height))
+
+    def move_cpu(self):
+        """
+        Moves the CPU's paddle for one tick
+        """
+        self.cpu.move(self.ball, self.paddles[1], self.cpu_paddle_speed, self.paddles[0])
+
+    def check_collisions(self):
+        """
+        Bounces the ball off walls and paddles, and scores a point if the ball reached a side wall
+        :return: str describing what the ball hit ("wall", "paddle", or "point"); None if nothing
+        """
+        ball = self.ball
+        paddle_1, paddle_2 = self.paddles
+        if horizontal_wall_collision(ball, self.screen_height):
+            ball.deflect('y')
+            return "wall"
+        # Check if round over
+        if vertical_wall_collision(ball, self.screen_width):
+            if ball.left_right() == "left":
+                self.scores[1] += 1
+            else:
+                self.scores[0] += 1
+            return "point"
+        paddle = paddle_collision(ball, paddle_1, paddle_2)
+        if paddle is not None:
+            # Determines strength of paddle directional influence
+            # (0 if ball hits middle of paddle, 1 if top, and -1 if bottom)
+            di = paddle.directional_influence(ball.y)
+            if paddle is paddle_1:
+                self.cpu.set_react_x()
+            ball.deflect('x', di)
+            self.last_hit = (paddle, di, ball.y)
+            return "paddle"
+        return None
+
+    def sweep(self):
+        """
+        Moves the ball for one tick with swept collisions, bouncing off everything it touches along the way
+        :return: str describing what the ball hit this tick ("wall", "paddle", or "point"); None if nothing
+        """
+        ball = self.ball
+        paddle_1, paddle_2 = self.paddles
+        event = None
+        time_left = 1.0
+        for _ in range(MAX_SWEPT_COLLISIONS):
+            touched, time_left = sweep_ball(ball, paddle_1, paddle_2, self.screen_width, self.screen_height,
+                                            time_left)
+            if touched is None:
+                break
+            if touched == "wall":
+                ball.deflect('y')
+                event = event or "wall"
+            elif touched == "point":
+                if ball.left_right() == "left":
+                    self.scores[1] += 1
+                else:
+                    self.scores[0] += 1
+                return "point"
+            else:
+                di = touched.directional_influence(ball.y)
+                if touched is paddle_1:
+                    self.cpu.set_react_x()
+                ball.deflect('x', di)
+                self.last_hit = (touched, di, ball.y)
+                event = "paddle"
+        return event
+
+    def play(self, player_1_controller=None, max_ticks=None):
+        """
+        Plays the match to completion without any pauses between rounds
+        :param player_1_controller: Function called with this match each tick that returns Player 1's move
+                (1 for up, -1 for down, 0 to stay put); Player 1 stays put if None
+        :param max_ticks: Stop after this many ticks even if the match isn't over; no limit if None
+        :return: Number of the player who won the match; None if stopped by max_ticks
+        """
+        while not self.is_over():
+            if max_ticks is not None and self.ticks >= max_ticks:
+                return None
+            if player_1_controller is not None:
+                self.move_paddle(1, player_1_controller(self))
+            if self.step() == "point" and not self.is_over():
+                self.restart_round()
+        return self.winner()
@@ -0,0 +1,163 @@
+"""Soak Test File
+
+Run this script to play tens of thousands of rallies between a tracking stand-in for Player 1 and the CPU in one
+long session, checking that memory use and frame time stay flat:
+    python soak.py                      headless, drawing with NullRenderer
+    python soak.py --display            drawing on a Tk canvas (needs a display, e.g. under xvfb-run)
+
+The session is split into windows of rallies. After the first window (which warms up caches), a straight line is
+fitted to each measurement across the windows; the test fails (exit code 1) if the line rises by more than the
+tolerance over the session. With --display, the number of turtles and canvas items must also stay constant.
+"""
+
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from game import Game, GameConfig
+from controllers import tracking_controller
+
+
+def resident_memory():
+    """
+    :return: Current resident memory of this process in bytes; None if it can't be read on this platform
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def slope(values):
+    """
+    :param values: Measurements taken at evenly spaced times
+    :return: Least squares slope of a straight line through the values, per measurement
+    """
+    count = len(values)
+    mean_x = (count - 1)/2
+    mean_y = sum(values)/count
+    spread = sum((x - mean_x)**2 for x in range(count))
+    return sum((x - mean_x)*(y - mean_y) for x, y in enumerate(values))/spread if spread else 0.0
+
+
+def trend(values):
+    """
+    :param values: Measurements taken at evenly spaced times
+    :return: How much a straight line through the values rises from the first measurement to the last
+    """
+    return slope(values)*(len(values) - 1)
+
+
+def soak(game, rallies, window, ticks_per_frame):
+    """
+    Plays rallies, starting the game over with the next seed whenever a match ends, and measures each window of
+    rallies
+    :param game: Game to play
+    :param rallies: Number of rallies (points) to play
+    :param window: Number of rallies per measurement
+    :param ticks_per_frame: Number of ticks between frames drawn
+    :return: List of dicts of measurements for each window
+    """
+    windows = []
+    renderer = game.renderer
+    canvas = getattr(renderer, "canvas", None)
+    points = 0
+    frame_time = 0.0
+    frames = 0
+    while points < rallies:
+        started = time.perf_counter()
+        previous = game.match.positions()
+        for _ in range(ticks_per_frame):
+            if game.step() == "point":
+                points += 1
+                if game.match.is_over():
+                    game.reset(game.match.seed + 1)
+                if points % window == 0:
+                    break
+        renderer.draw(previous, 0.5)
+        frame_time += time.perf_counter() - started
+        frames += 1
+        if points % window == 0 and points > len(windows)*window:
+            gc.collect()
+            windows.append({
+                "rallies": points,
+                "frame_us": frame_time/frames*1e6,
+                "traced_kib": tracemalloc.get_traced_memory()[0]/1024 if tracemalloc.is_tracing() else None,
+                "rss_kib": None if resident_memory() is None else resident_memory()/1024,
+                "turtles": len(game.screen.turtles()) if game.screen is not None else None,
+                "canvas_items": len(canvas.find_all()) if canvas is not None else None,
+            })
+            print("  ".join(f"{name} {value:10.3f}" if isinstance(value, float) else f"{name} {value}"
+                            for name, value in windows[-1].items() if value is not None))
+            frame_time = 0.0
+            frames = 0
+    return windows
+
+
+def check(windows, memory_tolerance, frame_tolerance):
+    """
+    :param windows: Measurements from soak(), including the warm-up window
+    :param memory_tolerance: Most memory growth (in KiB) allowed over the session
+    :param frame_tolerance: Most frame time growth allowed over the session, as a fraction of the first frame time
+    :return: List of messages describing each measurement that trended upwards
+    """
+    windows = windows[1:]
+    failures = []
+    if len(windows) < 2:
+        return ["not enough windows to find a trend; play more rallies or use a smaller window"]
+    for name in ("traced_kib", "rss_kib"):
+        if windows[0][name] is not None:
+            growth = trend([window[name] for window in windows])
+            if growth > memory_tolerance:
+                failures.append(f"{name} grew by {growth:.0f} KiB (tolerance {memory_tolerance:.0f} KiB)")
+    frame_times = [window["frame_us"] for window in windows]
+    growth = trend(frame_times)/frame_times[0]
+    if growth > frame_tolerance:
+        failures.append(f"frame time grew by {growth:.1%} (tolerance {frame_tolerance:.0%})")
+    for name in ("turtles", "canvas_items"):
+        counts = {window[name] for window in windows}
+        if len(counts) > 1:
+            failures.append(f"{name} changed between {min(counts)} and {max(counts)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a long session and check memory and frame time stay flat")
+    parser.add_argument("--rallies", type=int, default=20000, help="Number of rallies (points) to play")
+    parser.add_argument("--window", type=int, default=1000, help="Number of rallies per measurement")
+    parser.add_argument("--display", action="store_true", help="Draw on a Tk canvas instead of headless")
+    parser.add_argument("--prediction", default="stepped",
+                        help="CPU prediction method (stepped runs a simulated ball every reaction)")
+    parser.add_argument("--ticks-per-frame", type=int, default=2, help="Ticks between frames drawn")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="Don't trace Python allocations (faster; only RSS is checked)")
+    parser.add_argument("--memory-tolerance", type=float, default=1024,
+                        help="Most memory growth in KiB allowed over the session")
+    parser.add_argument("--frame-tolerance", type=float, default=0.25,
+                        help="Most frame time growth allowed over the session, as a fraction")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the first match")
+    args = parser.parse_args()
+
+    config = GameConfig(seed=args.seed, prediction=args.prediction)
+    screen = None
+    if args.display:
+        from game import setup_screen
+        screen = setup_screen(config)
+    game = Game(config, screen, player_1_controller=tracking_controller())
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    windows = soak(game, args.rallies, args.window, args.ticks_per_frame)
+    print(f"\n{args.rallies} rallies in {time.perf_counter() - started:.1f} s")
+    failures = check(windows, args.memory_tolerance, args.frame_tolerance)
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    if failures:
+        raise SystemExit(1)
+    print("ok: no upward trend in memory or frame time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Startup Timer Class File
+
+Contains StartupTimer class, which times each phase of starting the game up to its first frame and each module
+imported on the way (like python -X importtime), and NullStartupTimer class, which does nothing so that timing
+can be left in main.py when disabled
+"""
+
+import sys
+import time
+
+# Number of slowest imports to list in the report
+SLOWEST_IMPORTS = 15
+
+
+class NullStartupTimer:
+    """A class to represent a startup timer that records nothing"""
+
+    def mark(self, phase):
+        """
+        Marks the end of a startup phase
+        :param phase: Name of the phase
+        """
+
+    def exclude(self, phase):
+        """
+        Marks the end of a phase that shouldn't count towards startup time (e.g. waiting for the player)
+        :param phase: Name of the phase
+        """
+
+    def report(self, file=sys.stderr):
+        """
+        Prints how long each phase and the slowest imports took
+        :param file: File to print to
+        """
+
+
+class TimedLoader:
+    """A class to wrap a module loader and time how long the module takes to load"""
+
+    def __init__(self, loader, name, timer):
+        """
+        param loader: Loader to wrap
+        param name: Name of the module being loaded
+        param timer: StartupTimer to record the time in
+        """
+        self.loader = loader
+        self.name = name
+        self.timer = timer
+
+    def __getattr__(self, attribute):
+        return getattr(self.loader, attribute)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self.loader
+        module.__spec__.loader = self.loader
+        self.timer.import_started()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.import_finished(self.name)
+
+
+class StartupTimer(NullStartupTimer):
+    """A class to record how long each phase of startup takes
+
+    Also times every module imported after it is created, with its own time and its time including the
+    modules it imported
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        """
+        param clock: Function that returns the current time in seconds
+        """
+        self.clock = clock
+        self.phases = []
+        self.excluded = []
+        self.last_mark = clock()
+        # (name, self time, cumulative time) for each module imported
+        self.imports = []
+        # (start time, time spent in nested imports) for each import in progress
+        self.import_stack = []
+        sys.meta_path.insert(0, self)
+
+    def find_spec(self, name, path=None, target=None):
+        """
+        Finds a module with the other finders and wraps its loader so that loading it is timed
+        :return: ModuleSpec of the module; None if no other finder can find it
+        """
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = TimedLoader(spec.loader, name, self)
+                return spec
+        return None
+
+    def import_started(self):
+        """
+        Marks the start of loading a module
+        """
+        self.import_stack.append([self.clock(), 0.0])
+
+    def import_finished(self, name):
+        """
+        Marks the end of loading a module and records its time
+        :param name: Name of the module
+        """
+        started, nested = self.import_stack.pop()
+        cumulative = self.clock() - started
+        self.imports.append((name, cumulative - nested, cumulative))
+        if self.import_stack:
+            self.import_stack[-1][1] += cumulative
+
+    def mark(self, phase):
+        """
+        Marks the end of a startup phase
+        :param phase: Name of the phase
+        """
+        now = self.clock()
+        self.phases.append((phase, now - self.last_mark))
+        self.last_mark = now
+
+    def exclude(self, phase):
+        """
+        Marks the end of a phase that shouldn't count towards startup time (e.g. waiting for the player)
+        :param phase: Name of the phase
+        """
+        now = self.clock()
+        self.excluded.append((phase, now - self.last_mark))
+        self.last_mark = now
+
+    def report(self, file=sys.stderr):
+        """
+        Prints how long each phase and the slowest imports took, and stops timing imports
+        :param file: File to print to
+        """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        print("startup phase              ms", file=file)
+        for phase, seconds in self.phases:
+            print(f"  {phase:<20} {seconds*1000:8.1f}", file=file)
+        print(f"  {'total':<20} {sum(seconds for _, seconds in self.phases)*1000:8.1f}", file=file)
+        for phase, seconds in self.excluded:
+            print(f"  ({phase:<18} {seconds*1000:8.1f}, not counted)", file=file)
+        print("\nslowest imports     self ms  cumulative ms", file=file)
+        for name, self_time, cumulative in sorted(self.imports, key=lambda entry: -entry[1])[:SLOWEST_IMPORTS]:
+            print(f"  {name:<18} {self_time*1000:8.1f} {cumulative*1000:14.1f}", file=file)
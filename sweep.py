@@ -0,0 +1,151 @@
+"""CPU Difficulty Sweep File
+
+Run this script to play many headless matches for every combination (or a random sample) of game and CPU
+parameters, using every CPU core, and write win rate, rally length, and pace for each point to a CSV file.
+
+Rows are written as each point finishes, so an interrupted sweep can be resumed by running the same command
+again: points already in the output file are skipped.
+
+Example:
+    python sweep.py --paddle-length 3,5,7 --cpu-paddle-speed 1,1.33,2 --react-x-range=-50:150,0:200 -o sweep.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from batch import BatchMatch
+from controllers import batch_tracking_controller
+
+PARAMETERS = ("paddle_length", "paddle_speed", "ball_speed", "cpu_paddle_speed", "react_x_range", "di_intent_range")
+RESULTS = ("matches", "cpu_win_rate", "unfinished_rate", "mean_rally_length", "points_per_minute")
+
+
+def parse_numbers(text):
+    """
+    :param text: Comma-separated numbers, e.g. "3,5,7"
+    :return: List of numbers (ints where possible)
+    """
+    return [float(value) if '.' in value else int(value) for value in text.split(',')]
+
+
+def parse_ranges(text):
+    """
+    :param text: Comma-separated low:high pairs, e.g. "-50:150,0:200"
+    :return: List of (low, high) tuples
+    """
+    return [tuple(parse_numbers(pair.replace(':', ','))) for pair in text.split(',')]
+
+
+def point_key(point):
+    """
+    :param point: dict of parameter values
+    :return: Tuple that identifies the point, matching the text of its row in the output file
+    """
+    # csv writes None as an empty string
+    return tuple('' if point[name] is None else str(point[name]) for name in PARAMETERS)
+
+
+def sweep_points(values, samples=None, seed=None):
+    """
+    :param values: dict mapping each parameter name to the list of values to try
+    :param samples: Number of random combinations to take; every combination if None
+    :param seed: Seed for choosing random combinations
+    :return: List of dicts of parameter values, one for each point of the sweep
+    """
+    if samples is None:
+        combinations = itertools.product(*(values[name] for name in PARAMETERS))
+    else:
+        rng = random.Random(seed)
+        combinations = [[rng.choice(values[name]) for name in PARAMETERS] for _ in range(samples)]
+    points = []
+    for combination in combinations:
+        point = dict(zip(PARAMETERS, combination))
+        if point not in points:
+            points.append(point)
+    return points
+
+
+def run_point(point, matches, tick_rate, press_interval, max_ticks, seed):
+    """
+    Plays a batch of matches between the CPU and a tracking stand-in for Player 1 at one point of the sweep
+    :param point: dict of parameter values
+    :param matches: Number of matches to play
+    :param tick_rate: Game ticks per second, for converting ticks to minutes
+    :param press_interval: Ticks between the stand-in Player 1's key presses
+    :param max_ticks: Matches still going after this many ticks are stopped and counted as unfinished
+    :param seed: Base seed; combined with the point so results don't depend on the order points are run in
+    :return: dict of the point's parameters and results
+    """
+    point_seed = zlib.crc32(repr((seed, point_key(point))).encode())
+    batch = BatchMatch(matches, paddle_length=point["paddle_length"], paddle_speed=point["paddle_speed"],
+                       cpu_paddle_speed=point["cpu_paddle_speed"], ball_speed=point["ball_speed"], seed=point_seed,
+                       react_x_range=point["react_x_range"], di_intent_range=point["di_intent_range"])
+    winners = batch.play(batch_tracking_controller(press_interval), max_ticks)
+    points_played = batch.scores.sum()
+    minutes = batch.ticks.sum()/tick_rate/60
+    results = {
+        "matches": matches,
+        "cpu_win_rate": (winners == 2).mean(),
+        "unfinished_rate": (winners == 0).mean(),
+        "mean_rally_length": batch.hits.sum()/max(points_played, 1),
+        "points_per_minute": points_played/minutes,
+    }
+    return {**point, **results}
+
+
+def finished_points(path):
+    """
+    :param path: Path of the output file of a previous run
+    :return: Set of point keys that already have results in the file
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='') as file:
+        return {tuple(row[name] for name in PARAMETERS) for row in csv.DictReader(file)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep game and CPU parameters over headless matches")
+    parser.add_argument("--paddle-length", type=parse_numbers, default=[5])
+    parser.add_argument("--paddle-speed", type=parse_numbers, default=[40])
+    parser.add_argument("--ball-speed", type=parse_numbers, default=[3])
+    parser.add_argument("--cpu-paddle-speed", type=parse_numbers, default=[40/30])
+    parser.add_argument("--react-x-range", type=parse_ranges, default=[None],
+                        help="low:high x positions where the CPU reacts; defaults to the CPU's usual range")
+    parser.add_argument("--di-intent-range", type=parse_ranges, default=[None],
+                        help="low:high offsets the CPU aims its paddle at; defaults to anywhere on the paddle")
+    parser.add_argument("--samples", type=int, help="Number of random points to take instead of the full grid")
+    parser.add_argument("--matches", type=int, default=1000, help="Matches per point")
+    parser.add_argument("--tick-rate", type=float, default=120, help="Ticks per second for points per minute")
+    parser.add_argument("--press-interval", type=int, default=10, help="Ticks between Player 1 key presses")
+    parser.add_argument("--max-ticks", type=int, default=100000, help="Ticks before a match counts as unfinished")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="Number of processes; defaults to one per core")
+    parser.add_argument("-o", "--output", default="sweep.csv")
+    args = parser.parse_args()
+
+    values = {name: getattr(args, name) for name in PARAMETERS}
+    done = finished_points(args.output)
+    points = [point for point in sweep_points(values, args.samples, args.seed) if point_key(point) not in done]
+    print(f"{len(done)} points already done, {len(points)} to run")
+    write_header = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+    with open(args.output, 'a', newline='') as file, ProcessPoolExecutor(args.workers) as pool:
+        writer = csv.DictWriter(file, fieldnames=PARAMETERS + RESULTS)
+        if write_header:
+            writer.writeheader()
+        futures = [pool.submit(run_point, point, args.matches, args.tick_rate, args.press_interval,
+                               args.max_ticks, args.seed)
+                   for point in points]
+        for number, future in enumerate(as_completed(futures), 1):
+            writer.writerow(future.result())
+            file.flush()
+            print(f"{number}/{len(points)} points done", end='\r')
+    print()
+
+
+if __name__ == "__main__":
+    main()
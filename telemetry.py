@@ -0,0 +1,200 @@
+"""Telemetry File
+
+Contains TelemetryBus class, which takes events from the game loop without blocking it and has a background
+thread append them to a file of fixed-width binary records, and RallyTelemetry class, which turns a match's
+paddle hits and points into those events.
+
+The file can be read while a match is still being played, with read_telemetry() (as NumPy columns) or by
+running this script:
+    python telemetry.py telemetry.pongtel
+"""
+
+import atexit
+import math
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"PONGTEL\x01"
+# Kind, player number, tick, directional influence, ball y, ball heading, CPU's predicted y, prediction error,
+# rally hits, rally ticks, rally seconds (fields that don't apply to a kind of record are NaN or 0)
+RECORD = struct.Struct("<BBIddddd2Id")
+RECORD_FIELDS = ("kind", "player_number", "tick", "di", "hit_y", "heading", "future_y", "prediction_error",
+                 "rally_hits", "rally_ticks", "rally_seconds")
+RECORD_FORMATS = ("u1", "u1", "<u4", "<f8", "<f8", "<f8", "<f8", "<f8", "<u4", "<u4", "<f8")
+# Kinds of records: a paddle hit, a point (player_number is the scorer), and a count of events dropped because
+# the queue was full or the writer failed (in rally_hits), written when the bus is closed
+HIT = 0
+POINT = 1
+DROPPED = 2
+# Tells the writer thread to stop
+_STOP = object()
+# Most seconds close() waits for the writer thread to stop
+CLOSE_TIMEOUT = 5.0
+
+
+class TelemetryBus:
+    """A class to write events to a telemetry file from a background thread
+
+    publish() never blocks: if the writer falls behind and the queue is full, the event is dropped and counted
+    """
+
+    def __init__(self, path, capacity=4096, batch_size=256):
+        """
+        param path: Path of the telemetry file; appended to if it already exists
+        param capacity: Most events waiting to be written before new ones are dropped
+        param batch_size: Most events written to the file at once
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=capacity)
+        self.published = 0
+        self.dropped = 0
+        self.written = 0
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if new_file:
+            self.file.write(MAGIC)
+            self.file.flush()
+        self.thread = threading.Thread(target=self.write_events, name="telemetry writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def publish(self, record):
+        """
+        Queues an event to be written, or drops it if the queue is full
+        :param record: Tuple of the values in RECORD_FIELDS
+        """
+        try:
+            self.queue.put_nowait(record)
+            self.published += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def write_events(self):
+        """
+        Writes queued events to the file in batches until the bus is closed (runs in the writer thread)
+        """
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                self.file.write(b"".join(RECORD.pack(*record) for record in batch))
+                # Flush every batch so readers see whole records while the match is still going
+                self.file.flush()
+                self.written += len(batch)
+            if stopping:
+                return
+
+    def close(self):
+        """
+        Writes every queued event and the count of dropped events, and closes the file. If the writer thread
+        died (e.g. the disk filled up), the events it didn't write are counted as dropped; if it doesn't stop
+        within CLOSE_TIMEOUT seconds, the file is closed without the count
+        """
+        if self.file.closed:
+            return
+        atexit.unregister(self.close)
+        if self.thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=CLOSE_TIMEOUT)
+            except queue.Full:
+                pass
+            self.thread.join(CLOSE_TIMEOUT)
+        if not self.thread.is_alive():
+            self.dropped += self.published - self.written
+            if self.dropped:
+                self.file.write(RECORD.pack(DROPPED, 0, 0, *(math.nan,)*5, self.dropped, 0, math.nan))
+        self.file.close()
+
+
+class RallyTelemetry:
+    """A class to publish an event for every paddle hit and point in a match"""
+
+    def __init__(self, match, bus, clock=time.perf_counter):
+        """
+        param match: Match to watch
+        param bus: TelemetryBus to publish events to
+        param clock: Function that returns the current time in seconds
+        """
+        self.match = match
+        self.bus = bus
+        self.clock = clock
+        self.rally_hits = 0
+        self.rally_started_tick = match.ticks
+        # Set on the first tick of each rally, so pauses between rounds aren't counted
+        self.rally_started = None
+
+    def observe(self, event):
+        """
+        Publishes an event if the match's last tick had a paddle hit or a point
+        :param event: What Match.step() returned for the tick
+        """
+        if self.rally_started is None:
+            self.rally_started = self.clock()
+            self.rally_started_tick = self.match.ticks - 1
+        if event == "paddle":
+            self.rally_hits += 1
+            paddle, di, hit_y = self.match.last_hit
+            ball = self.match.ball
+            future_y = math.nan
+            if paddle.player_number == 2 and self.match.cpu.future_y is not None:
+                future_y = self.match.cpu.future_y
+            self.bus.publish((HIT, paddle.player_number, self.match.ticks, di, hit_y, ball.heading, future_y,
+                              hit_y - future_y, self.rally_hits, self.match.ticks - self.rally_started_tick,
+                              self.clock() - self.rally_started))
+        elif event == "point":
+            ball = self.match.ball
+            scorer = 2 if ball.left_right() == "left" else 1
+            self.bus.publish((POINT, scorer, self.match.ticks, math.nan, ball.y, ball.heading, math.nan, math.nan,
+                              self.rally_hits, self.match.ticks - self.rally_started_tick,
+                              self.clock() - self.rally_started))
+            self.rally_hits = 0
+            self.rally_started = None
+
+
+def read_telemetry(path):
+    """
+    Reads every whole record in a telemetry file, even one that is still being written
+    :param path: Path of a telemetry file
+    :return: NumPy structured array with one row per record and one column per field in RECORD_FIELDS
+    """
+    import numpy as np
+    dtype = np.dtype(list(zip(RECORD_FIELDS, RECORD_FORMATS)))
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a Pong telemetry file")
+        count = (os.fstat(file.fileno()).st_size - len(MAGIC))//dtype.itemsize
+        return np.fromfile(file, dtype=dtype, count=count)
+
+
+def main():
+    import numpy as np
+    for path in sys.argv[1:]:
+        records = read_telemetry(path)
+        hits = records[records["kind"] == HIT]
+        points = records[records["kind"] == POINT]
+        cpu_hits = hits[hits["player_number"] == 2]
+        print(path)
+        print(f"  hits {len(hits)}, points {len(points)}, "
+              f"dropped {int(records['rally_hits'][records['kind'] == DROPPED].sum())}")
+        if len(cpu_hits):
+            print(f"  CPU prediction error: mean {np.mean(np.abs(cpu_hits['prediction_error'])):.2f} px, "
+                  f"max {np.max(np.abs(cpu_hits['prediction_error'])):.2f} px")
+        if len(points):
+            print(f"  rally length: mean {points['rally_hits'].mean():.1f} hits, "
+                  f"{points['rally_ticks'].mean():.0f} ticks, {points['rally_seconds'].mean():.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Tests that BatchMatch in batch.py plays by the same rules as rules.Match"""
+
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch import BatchMatch  # noqa: E402
+from rules import Match  # noqa: E402
+
+# Fixed reaction and aim ranges, so the CPUs make the same choices without sharing a random number generator
+SETTINGS = dict(react_x_range=(60, 60), di_intent_range=(0, 0), winning_score=3)
+
+
+@pytest.mark.parametrize("seed, ball_speed", [(0, 3), (1, 3), (2, 5), (3, 7)])
+def test_batch_match_plays_like_match(seed, ball_speed):
+    match = Match(**SETTINGS, ball_speed=ball_speed, seed=seed)
+    batch = BatchMatch(1, **SETTINGS, ball_speed=ball_speed, seed=seed)
+    # Each side picks starting directions with its own random number generator, so the batch is given the
+    # direction the match's ball restarts in
+    batch.starting_headings = np.array([match.ball.heading])
+    batch.reset_matches(np.ones(1, dtype=bool))
+    rng = random.Random(seed)
+    points = 0
+    while not match.is_over() and match.ticks < 50000:
+        move = rng.choice((-1, 0, 0, 0, 1)) if match.ball.left_right() == "left" else 0
+        match.move_paddle(1, move)
+        event = match.step()
+        if event == "point" and not match.is_over():
+            match.restart_round()
+        batch.starting_headings = np.array([match.ball.heading])
+        point = batch.step(np.array([move]))
+        assert point[0] == (event == "point"), f"tick {match.ticks}"
+        points += event == "point"
+        assert (batch.x[0], batch.y[0]) == pytest.approx((match.ball.x, match.ball.y), abs=1e-6), f"tick {match.ticks}"
+        assert batch.heading[0] == pytest.approx(match.ball.heading % 360, abs=1e-6)
+        assert (batch.paddle_1_y[0], batch.paddle_2_y[0]) == pytest.approx((match.paddles[0].y, match.paddles[1].y),
+                                                                           abs=1e-6), f"tick {match.ticks}"
+        assert list(batch.scores[0]) == match.scores
+    assert match.is_over()
+    assert points >= SETTINGS["winning_score"]
+    assert batch.winners()[0] == match.winner()
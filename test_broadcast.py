@@ -0,0 +1,64 @@
+"""Tests for the keyframe and delta encoding in broadcast.py"""
+
+from broadcast import DeltaEncoder, DeltaDecoder, KEYFRAME_MESSAGE, POSITION_RANGE, POSITION_SCALE, quantize, \
+    dequantize
+from controllers import tracking_controller
+from rules import Match
+
+
+def test_values_outside_the_sent_ranges_are_clamped():
+    encoder = DeltaEncoder()
+    huge = POSITION_RANGE[1]/POSITION_SCALE*2
+    data = encoder.encode([(2**32 + 5, huge, -huge, 45.0, 0.0, huge, 300, -1),
+                           (2**32 + 6, -huge, huge, 45.0, huge, 0.0, 300, 0)])
+    first, second = DeltaDecoder().feed(data)
+    assert (first.ball_x, first.ball_y, first.paddle_2_y) == (POSITION_RANGE[1]/POSITION_SCALE,
+                                                              POSITION_RANGE[0]/POSITION_SCALE,
+                                                              POSITION_RANGE[1]/POSITION_SCALE)
+    assert (first.score_1, first.score_2) == (255, 0)
+    assert second.tick == first.tick + 1
+    assert (second.ball_x, second.paddle_1_y) == (POSITION_RANGE[0]/POSITION_SCALE, POSITION_RANGE[1]/POSITION_SCALE)
+
+
+def match_states(ticks, seed=0):
+    """
+    :return: List of a seeded match's state after each tick, as BroadcastServer.publish() queues them
+    """
+    match = Match(seed=seed, held_paddle_speed=5)
+    controller = tracking_controller()
+    states = []
+    for _ in range(ticks):
+        match.hold_paddle(1, controller(match))
+        if match.step() == "point":
+            if match.is_over():
+                match.reset(seed)
+            else:
+                match.restart_round()
+        ball = match.ball
+        states.append((match.ticks, ball.x, ball.y, ball.heading, match.paddles[0].y, match.paddles[1].y,
+                       *match.scores))
+    return states
+
+
+def test_keyframes_and_deltas_decode_to_the_encoded_states():
+    states = match_states(3000)
+    encoder = DeltaEncoder(keyframe_interval=50)
+    data = b"".join(encoder.encode(states[start:start + 7]) for start in range(0, len(states), 7))
+    decoder = DeltaDecoder()
+    # Feed the stream in pieces that split messages
+    decoded = []
+    for start in range(0, len(data), 5):
+        decoded.extend(decoder.feed(data[start:start + 5]))
+    assert decoded == [dequantize(state[0], quantize(state)) for state in states]
+    # Most ticks are sent as deltas, which are much smaller than keyframes
+    assert len(data) < len(states)*KEYFRAME_MESSAGE.size/2
+
+
+def test_catch_up_brings_a_late_spectator_to_the_latest_state():
+    states = match_states(1000)
+    encoder = DeltaEncoder(keyframe_interval=120)
+    for start in range(0, len(states), 10):
+        encoder.encode(states[start:start + 10])
+    decoded = DeltaDecoder().feed(encoder.catch_up())
+    assert decoded[0].tick == 961
+    assert decoded[-1] == dequantize(states[-1][0], quantize(states[-1]))
@@ -0,0 +1,80 @@
+"""Tests for pacing the game loop with FixedTimestep in clock.py"""
+
+import pytest
+from clock import FixedTimestep
+
+
+class FakeTime:
+    """A clock that only moves when the game loop sleeps or a test moves it on"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def fixed_timestep(**settings):
+    """
+    :return: (FixedTimestep timed by a FakeTime, the FakeTime)
+    """
+    fake_time = FakeTime()
+    return FixedTimestep(**settings, clock=fake_time.clock, sleep=fake_time.sleep), fake_time
+
+
+def test_stall_is_capped_at_max_ticks_per_frame():
+    clock, fake_time = fixed_timestep(tick_rate=120, frame_rate=60, max_ticks_per_frame=8)
+    assert clock.wait_for_frame() == 0
+    # The window was dragged for two seconds
+    fake_time.now += 2.0
+    assert clock.wait_for_frame() == 8
+    # The rest of the stall is dropped rather than caught up on
+    assert [clock.wait_for_frame() for _ in range(5)] == [2]*5
+    assert fake_time.now == pytest.approx(2.0 + 5/60)
+
+
+def test_frames_are_capped_to_the_frame_rate():
+    clock, fake_time = fixed_timestep(tick_rate=120, frame_rate=60)
+    ticks = sum(clock.wait_for_frame() for _ in range(61))
+    # A loop that takes no time sleeps for the rest of each frame instead of drawing more often
+    assert fake_time.now == pytest.approx(1.0)
+    assert ticks == 120
+    assert fake_time.sleeps == pytest.approx([1/60]*60)
+
+
+def test_slow_frames_run_more_ticks_without_sleeping():
+    clock, fake_time = fixed_timestep(tick_rate=120, frame_rate=60)
+    clock.wait_for_frame()
+    for _ in range(10):
+        # Drawing takes longer than a frame
+        fake_time.now += 0.05
+        assert clock.wait_for_frame() == 6
+    assert fake_time.sleeps == []
+    # Missed frames aren't made up for with a burst of frames afterwards
+    assert clock.next_frame == pytest.approx(fake_time.now + 1/60)
+
+
+def test_alpha_is_how_far_the_frame_is_between_ticks():
+    # Frames are 2.5 ticks long, so every other frame lands halfway between two ticks
+    clock, fake_time = fixed_timestep(tick_rate=100, frame_rate=40)
+    clock.wait_for_frame()
+    results = []
+    for _ in range(6):
+        results.append((clock.wait_for_frame(), clock.alpha))
+    assert [ticks for ticks, _ in results] == [2, 3]*3
+    assert [alpha for _, alpha in results] == pytest.approx([0.5, 0.0]*3, abs=1e-6)
+    assert all(0 <= alpha < 1 for _, alpha in results)
+
+
+def test_reset_skips_paused_time():
+    clock, fake_time = fixed_timestep(tick_rate=120, frame_rate=60)
+    clock.wait_for_frame()
+    fake_time.now += 10.0
+    clock.reset()
+    assert clock.wait_for_frame() == 0
+    assert clock.wait_for_frame() == 2
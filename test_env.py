@@ -0,0 +1,82 @@
+"""Tests for the Gym-style environments in env.py"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from env import PongEnv, VectorPongEnv, OBSERVATION_FIELDS  # noqa: E402
+
+
+def test_pong_env_reset_and_step():
+    env = PongEnv(frame_skip=3)
+    observation = env.reset(seed=1)
+    assert observation.shape == (len(OBSERVATION_FIELDS),)
+    assert (observation[0], observation[1], observation[4], observation[5]) == (0, 0, 0, 0)
+    assert np.hypot(observation[2], observation[3]) == pytest.approx(env.match.ball_speed)
+    observation, reward, done, info = env.step(1)
+    assert observation.shape == (len(OBSERVATION_FIELDS),)
+    assert (reward, done) == (0, False)
+    assert info == {"scores": (0, 0), "ticks": 3}
+    # Player 1's paddle was held up for every tick of the step
+    assert observation[4] == 3*env.settings["held_paddle_speed"]
+
+
+def test_pong_env_episode_rewards_add_up_to_the_score():
+    env = PongEnv(frame_skip=4, winning_score=2)
+    env.reset(seed=2)
+    rng = np.random.default_rng(2)
+    total = 0
+    done = False
+    while not done:
+        _, reward, done, info = env.step(int(rng.integers(-1, 2)))
+        assert reward in (-1, 0, 1)
+        total += reward
+    scores = info["scores"]
+    assert max(scores) == 2
+    assert total == scores[0] - scores[1]
+
+
+def test_pong_env_is_reproducible():
+    env = PongEnv()
+    first = env.reset(seed=3).copy()
+    states = [env.step(action)[0].copy() for action in (1, 1, 0, -1)*50]
+    assert np.array_equal(env.reset(seed=3), first)
+    assert all(np.array_equal(env.step(action)[0], state) for action, state in zip((1, 1, 0, -1)*50, states))
+
+
+def test_vector_env_shapes_and_buffers():
+    env = VectorPongEnv(8, frame_skip=2, seed=4)
+    observations = env.reset()
+    assert observations.shape == (8, len(OBSERVATION_FIELDS))
+    assert not observations[:, [0, 1, 4, 5]].any()
+    result = env.step(np.ones(8, dtype=np.int64))
+    assert [array.shape for array in result] == [(8, len(OBSERVATION_FIELDS)), (8,), (8,)]
+    assert result[0] is observations
+    assert np.array_equal(result[0][:, 4], np.full(8, 2*5.0))
+    # The buffers are reused by the next step
+    assert all(a is b for a, b in zip(env.step(np.zeros(8, dtype=np.int64)), result))
+
+
+def test_vector_env_episodes_end_and_start_over():
+    num_envs = 16
+    env = VectorPongEnv(num_envs, frame_skip=4, seed=5, winning_score=2)
+    env.reset()
+    rng = np.random.default_rng(5)
+    returns = np.zeros(num_envs)
+    finished = []
+    for _ in range(20000):
+        observations, rewards, dones = env.step(rng.integers(-1, 2, num_envs))
+        assert set(np.unique(rewards)) <= {-1, 0, 1}
+        returns += rewards
+        if dones.any():
+            # A finished match's return is the winner's 2 points minus the loser's, signed for Player 1
+            finished.extend(returns[dones])
+            returns[dones] = 0
+            # Finished matches started over: the observation is the first one of the next match
+            assert not observations[dones][:, [0, 1, 4, 5]].any()
+            assert not env.batch.scores[dones].any()
+            assert not env.batch.ticks[dones].any()
+        if len(finished) >= 2*num_envs:
+            break
+    assert len(finished) >= 2*num_envs
+    assert all(value in (-2, -1, 1, 2) for value in finished)
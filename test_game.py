@@ -0,0 +1,11 @@
+"""Tests for the Game class and its settings in game.py"""
+
+from game import Game, GameConfig
+from cpu_planner import PlanningCPUBrain
+
+
+def test_game_config_picks_the_planner_cpu():
+    game = Game(GameConfig(seed=1, planner="hard"))
+    assert isinstance(game.match.cpu, PlanningCPUBrain)
+    assert game.recorder.recording.config["planner"] == "hard"
+    assert game.run() in (1, 2)
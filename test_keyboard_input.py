@@ -0,0 +1,124 @@
+"""Tests for tracking held keys with KeyboardInput in keyboard_input.py"""
+
+from keyboard_input import KeyboardInput
+
+
+class FakeScreen:
+    """A stand-in for a turtle Screen that keeps the key handlers so tests can fire them"""
+
+    def __init__(self):
+        self.press_handlers = {}
+        self.release_handlers = {}
+        self.listening = False
+
+    def onkeypress(self, handler, key):
+        self.press_handlers[key] = handler
+
+    def onkeyrelease(self, handler, key):
+        self.release_handlers[key] = handler
+
+    def listen(self):
+        self.listening = True
+
+    def press(self, key):
+        self.press_handlers[key]()
+
+    def release(self, key):
+        self.release_handlers[key]()
+
+
+class FakeClock:
+    """A clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def keyboard(keys=None):
+    """
+    :return: (KeyboardInput bound to a FakeScreen with a FakeClock, the screen, the clock)
+    """
+    screen = FakeScreen()
+    clock = FakeClock()
+    keyboard_input = KeyboardInput(screen, clock=clock) if keys is None else KeyboardInput(screen, keys, clock)
+    return keyboard_input, screen, clock
+
+
+def test_binds_every_key_once_and_listens():
+    keyboard_input, screen, _ = keyboard()
+    assert set(screen.press_handlers) == set(screen.release_handlers) == {"w", "s"}
+    assert screen.listening
+    assert keyboard_input.directions == {1: 0}
+
+
+def test_os_key_repeats_count_as_one_press():
+    keyboard_input, screen, clock = keyboard()
+    clock.now = 1.0
+    screen.press("w")
+    # Held keys repeat as more presses, or as release and press pairs, depending on the OS
+    for _ in range(5):
+        clock.now += 0.03
+        screen.press("w")
+        screen.release("w")
+        screen.press("w")
+    assert keyboard_input.poll() == [(1.0, 1, 1)]
+    for _ in range(5):
+        clock.now += 0.03
+        screen.release("w")
+        screen.press("w")
+    assert keyboard_input.poll() == []
+    assert keyboard_input.directions[1] == 1
+
+
+def test_press_and_release_are_tracked():
+    keyboard_input, screen, clock = keyboard()
+    assert keyboard_input.poll() == []
+    clock.now = 2.0
+    screen.press("s")
+    assert keyboard_input.poll() == [(2.0, 1, -1)]
+    assert keyboard_input.held == {"s"}
+    clock.now = 2.5
+    screen.release("s")
+    assert keyboard_input.poll() == [(2.5, 1, 0)]
+    assert keyboard_input.held == set()
+    assert keyboard_input.directions[1] == 0
+
+
+def test_opposite_keys_cancel_out():
+    keyboard_input, screen, clock = keyboard()
+    clock.now = 1.0
+    screen.press("w")
+    assert keyboard_input.poll() == [(1.0, 1, 1)]
+    clock.now = 1.5
+    screen.press("s")
+    assert keyboard_input.poll() == [(1.5, 1, 0)]
+    clock.now = 2.0
+    screen.release("w")
+    assert keyboard_input.poll() == [(2.0, 1, -1)]
+    # Pressing and releasing within one frame leaves the direction unchanged
+    clock.now = 2.1
+    screen.press("w")
+    clock.now = 2.2
+    screen.release("w")
+    assert keyboard_input.poll() == []
+
+
+def test_each_change_has_the_time_of_its_first_key_event():
+    keys = {"w": (1, 1), "s": (1, -1), "Up": (2, 1), "Down": (2, -1)}
+    keyboard_input, screen, clock = keyboard(keys)
+    clock.now = 3.0
+    screen.press("Up")
+    clock.now = 3.1
+    screen.press("s")
+    clock.now = 3.2
+    screen.press("Up")
+    assert sorted(keyboard_input.poll()) == [(3.0, 2, 1), (3.1, 1, -1)]
+    assert keyboard_input.directions == {1: -1, 2: 1}
+    # Events wait in the queue until the next poll, keeping the time they happened at
+    clock.now = 4.0
+    screen.release("Up")
+    clock.now = 5.0
+    assert keyboard_input.poll() == [(4.0, 2, 0)]
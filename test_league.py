@@ -0,0 +1,73 @@
+"""Tests for the CPU league in league.py"""
+
+import itertools
+from collections import Counter
+import pytest
+
+np = pytest.importorskip("numpy")
+from league import EloRatings, LeagueMatch, Variant, round_pairings, play_rounds  # noqa: E402
+
+
+def test_win_between_equal_ratings_moves_half_the_k_factor():
+    elo = EloRatings(2, k_factor=16)
+    elo.record(0, 1, 1)
+    assert elo.ratings == [1508, 1492]
+    assert (elo.wins, elo.losses, elo.draws) == ([1, 0], [0, 1], [0, 0])
+
+
+def test_upset_moves_ratings_more_than_expected_win():
+    expected = EloRatings(2)
+    expected.ratings = [1700.0, 1500.0]
+    expected.record(0, 1, 1)
+    upset = EloRatings(2)
+    upset.ratings = [1700.0, 1500.0]
+    upset.record(0, 1, 0)
+    assert 1700 - upset.ratings[0] > expected.ratings[0] - 1700 > 0
+    assert sum(upset.ratings) == sum(expected.ratings) == 3200
+
+
+def test_draws_keep_equal_ratings_and_pull_unequal_ones_together():
+    elo = EloRatings(4)
+    elo.ratings = [1500.0, 1500.0, 1700.0, 1500.0]
+    elo.record(0, 1, 0.5)
+    elo.record(2, 3, 0.5)
+    assert elo.ratings[:2] == [1500, 1500]
+    assert elo.ratings[2] == pytest.approx(1700 + 16*(0.5 - 1/(1 + 10**(-200/400))))
+    assert elo.ratings[2] + elo.ratings[3] == pytest.approx(3200)
+    assert elo.draws == [1, 1, 1, 1]
+    assert elo.wins == elo.losses == [0, 0, 0, 0]
+
+
+def test_unfinished_matches_are_recorded_as_draws():
+    elo = EloRatings(3)
+    unfinished = elo.record_round(np.array([0, 1, 2]), np.array([1, 2, 0]), np.array([1, 0, 2]))
+    assert unfinished == 1
+    assert (elo.wins, elo.losses, elo.draws) == ([2, 0, 0], [0, 1, 1], [0, 1, 1])
+
+
+@pytest.mark.parametrize("matches_per_round", [1, 3, 4])
+def test_every_pairing_plays_each_round_with_sides_alternating(matches_per_round):
+    left, right = round_pairings(5, matches_per_round)
+    assert len(left) == len(right) == 10*matches_per_round
+    assert not (left == right).any()
+    sides = Counter(zip(left.tolist(), right.tolist()))
+    for first, second in itertools.combinations(range(5), 2):
+        assert sides[first, second] == (matches_per_round + 1)//2
+        assert sides[second, first] == matches_per_round//2
+
+
+def test_schedule_plays_every_match_with_fewer_slots_than_matches():
+    variants = [Variant.from_settings(paddle_speed=speed) for speed in (0.5, 3)]
+    match = LeagueMatch(variants, 4, winning_score=2, seed=0)
+    left = np.array([0, 1]*5)
+    winners = match.play_schedule(left, 1 - left, max_ticks=100000)
+    # The much faster CPU wins on either side of the court
+    assert (winners == np.where(left == 1, 1, 2)).all()
+
+
+def test_same_seed_gives_the_same_results():
+    variants = [Variant.from_settings(aim_noise=noise) for noise in (10, 30, 50)]
+    first = play_rounds(variants, 0, 2, 2, 4, 3000, seed=7)
+    second = play_rounds(variants, 0, 2, 2, 4, 3000, seed=7)
+    for (left, right, winners), (same_left, same_right, same_winners) in zip(first, second):
+        assert (left == same_left).all() and (right == same_right).all() and (winners == same_winners).all()
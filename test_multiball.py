@@ -0,0 +1,125 @@
+"""Tests for MultiBallMatch in multiball.py"""
+
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from multiball import MultiBallMatch  # noqa: E402
+from physics import BallState, horizontal_wall_collision, vertical_wall_collision, paddle_collision  # noqa: E402
+from rules import Match  # noqa: E402
+
+# The CPU's paddle stays in the middle, so it plays the same however each match's CPU chooses to react
+SETTINGS = dict(cpu_paddle_speed=0, held_paddle_speed=5)
+
+
+def aiming_controller(rng):
+    """
+    :return: Function that takes a Match or MultiBallMatch and returns the direction to hold Player 1's paddle in
+            to meet the incoming ball at a random spot on the paddle (or just off it), which changes after every
+            hit
+    """
+    offset = [0.0, None]
+
+    def controller(match):
+        ball_y = match.incoming_ball_y(1)
+        if ball_y is None:
+            offset[1] = None
+            return 0
+        if offset[1] is None:
+            offset[:] = [rng.uniform(-90, 90), True]
+        gap = ball_y + offset[0] - match.paddles[0].y
+        return (gap > 5) - (gap < -5)
+    return controller
+
+
+def test_one_ball_plays_like_match():
+    events = set()
+    scorers = set()
+    for seed in range(12):
+        rng = random.Random(seed)
+        heading = rng.choice((-1, 1))*rng.uniform(0, 60) + rng.choice((0, 180))
+        match = Match(**SETTINGS, seed=seed)
+        match.ball.set_heading(heading)
+        multi = MultiBallMatch(1, **SETTINGS, seed=seed)
+        multi.set_heading(np.array([0]), np.array([heading]))
+        match_controller = aiming_controller(random.Random(seed))
+        multi_controller = aiming_controller(random.Random(seed))
+        # Play until the first point, after which each restarts the ball in its own random direction
+        event = None
+        while event != "point":
+            match.hold_paddle(1, match_controller(match))
+            multi.hold_paddle(1, multi_controller(multi))
+            event = match.step()
+            assert multi.step() == event, f"seed {seed}, tick {match.ticks}"
+            events.add(event)
+            if event != "point":
+                assert (multi.x[0], multi.y[0]) == pytest.approx((match.ball.x, match.ball.y), abs=1e-6)
+                assert multi.heading[0] == pytest.approx(match.ball.heading, abs=1e-6)
+            assert [paddle.y for paddle in multi.paddles] == [paddle.y for paddle in match.paddles]
+        assert multi.scores == match.scores
+        scorers.add(1 if match.scores[0] else 2)
+    # The seeds cover wall bounces, hits all along Player 1's paddle, and points for both players
+    assert {"wall", "paddle", "point"} <= events
+    assert scorers == {1, 2}
+
+
+def test_broadphase_finds_the_same_hits_as_testing_every_ball():
+    num_balls = 300
+    multi = MultiBallMatch(num_balls, seed=1, held_paddle_speed=5, winning_score=10**9)
+    controller = aiming_controller(random.Random(1))
+    ticks = 600
+    hits = 0
+    for _ in range(ticks):
+        multi.hold_paddle(1, controller(multi))
+        before = (multi.x.copy(), multi.y.copy(), multi.heading.copy(), multi.launches.copy())
+        multi.step()
+        paddle_1, paddle_2 = multi.paddles
+        expected = set()
+        for index in range(num_balls):
+            ball = BallState(multi.ball_speed, before[2][index], before[0][index], before[1][index])
+            ball.move()
+            if horizontal_wall_collision(ball, multi.screen_height) \
+                    or vertical_wall_collision(ball, multi.screen_width):
+                continue
+            if paddle_collision(ball, paddle_1, paddle_2) is not None:
+                expected.add(index)
+        restarted = (multi.x == 0) & (multi.y == 0)
+        hit = set(np.flatnonzero((multi.launches > before[3]) & ~restarted).tolist())
+        assert hit == expected
+        hits += len(hit)
+    assert hits > 0
+    # Only the few balls near a paddle each tick are tested against the paddles
+    assert multi.narrow_phase_tests < num_balls*ticks/10
+
+
+def balls_at(states):
+    """
+    :param states: List of (x, y, heading) of each ball
+    :return: MultiBallMatch with its balls in those states
+    """
+    multi = MultiBallMatch(len(states), seed=0)
+    for index, (x, y, heading) in enumerate(states):
+        multi.x[index] = x
+        multi.y[index] = y
+        multi.set_heading(np.array([index]), np.array([heading]))
+    return multi
+
+
+def test_most_urgent_ball_is_the_one_arriving_soonest():
+    # The second ball is closer to the CPU's paddle, but so steep that the first one arrives sooner
+    multi = balls_at([(100, 10, 0), (200, -20, 75), (300, 30, 180)])
+    assert multi.most_urgent_ball() == 0
+    assert multi.incoming_ball_y(2) == 10
+    assert multi.incoming_ball_y(1) == 30
+
+
+def test_balls_past_the_cpu_paddle_or_moving_away_are_not_incoming():
+    # The first ball is already past the face of the CPU's paddle
+    multi = balls_at([(370, 0, 0), (-100, 40, 170), (-200, 50, 190)])
+    assert multi.most_urgent_ball() is None
+    assert multi.incoming_ball_y(2) is None
+    # The ball furthest left reaches Player 1's paddle first
+    assert multi.incoming_ball_y(1) == 50
+    multi = balls_at([(0, 0, 0), (10, 20, 45)])
+    assert multi.incoming_ball_y(1) is None
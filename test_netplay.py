@@ -0,0 +1,149 @@
+"""Tests for keeping two peers' matches in step with RollbackSession in netplay.py"""
+
+import asyncio
+import random
+import pytest
+from controllers import tracking_controller
+from netplay import RollbackSession, LinkConditioner, NetplayProtocol, join
+from rules import Match
+
+SETTINGS = dict(held_paddle_speed=5, winning_score=2)
+
+
+class LoopbackTransport:
+    """A stand-in for a UDP transport that hands each packet straight to the peer's protocol"""
+
+    def __init__(self, address):
+        """
+        param address: Address the peer sees packets coming from
+        """
+        self.address = address
+        self.peer_protocol = None
+
+    def sendto(self, data, address):
+        self.peer_protocol.datagram_received(data, self.address)
+
+    def is_closing(self):
+        return False
+
+
+def connected_peers(seed, latency, jitter, loss):
+    """
+    :return: List of (RollbackSession, NetplayProtocol) for Player 1 and Player 2, with each player's packets sent
+            through its own seeded LinkConditioner
+    """
+    peers = []
+    for player_number in (1, 2):
+        session = RollbackSession(Match(**SETTINGS, seed=seed, two_players=True), player_number)
+        conditioner = LinkConditioner(latency, jitter, loss, random.Random(f"{seed}/{player_number}"))
+        protocol = NetplayProtocol(session, conditioner, peer=("peer", 3 - player_number))
+        protocol.connection_made(LoopbackTransport(("peer", player_number)))
+        peers.append((session, protocol))
+    peers[0][1].transport.peer_protocol = peers[1][1]
+    peers[1][1].transport.peer_protocol = peers[0][1]
+    return peers
+
+
+async def play(peers, ticks, ticks_per_frame, frame_seconds):
+    """
+    Plays both peers' matches frame by frame until both have simulated ticks ticks, sending each peer's inputs
+    once per frame
+    """
+    controllers = [tracking_controller(player_number=session.local_player) for session, _ in peers]
+    while any(session.tick < ticks for session, _ in peers):
+        for (session, protocol), controller in zip(peers, controllers):
+            for _ in range(min(ticks_per_frame, ticks - session.tick)):
+                if not session.advance(controller(session.match)):
+                    break
+            protocol.send(session.outgoing())
+            session.end_frame()
+        await asyncio.sleep(frame_seconds)
+    # Let the last delayed packets arrive, so both peers confirm every tick
+    while any(session.remote_confirmed < ticks - 1 for session, _ in peers):
+        for session, protocol in peers:
+            protocol.send(session.outgoing())
+        await asyncio.sleep(frame_seconds)
+
+
+@pytest.mark.parametrize("seed, loss", [(1, 0.0), (2, 0.1), (3, 0.3)])
+def test_peers_agree_over_a_lossy_jittery_link(seed, loss):
+    async def run():
+        peers = connected_peers(seed, latency=0.004, jitter=0.004, loss=loss)
+        await play(peers, ticks=1500, ticks_per_frame=4, frame_seconds=0.001)
+        return peers
+
+    (session_1, protocol_1), (session_2, protocol_2) = asyncio.run(run())
+    assert session_1.tick == session_2.tick == 1500
+    # Simulating once more settles any last rollback, after which both matches must be in the same state
+    session_1.advance(0)
+    session_2.advance(0)
+    assert session_1.match.snapshot() == session_2.match.snapshot()
+    checked = set(session_1.checksums) & set(session_2.checksums)
+    assert len(checked) >= 20
+    for tick in checked:
+        assert session_1.checksums[tick] == session_2.checksums[tick], f"desync at tick {tick}"
+    # The link really did delay (and drop) packets, so the peers had to predict and roll back
+    assert session_1.mispredictions + session_2.mispredictions > 0
+    assert any(frame[1] for frame in session_1.frames + session_2.frames)
+    if loss:
+        assert protocol_1.conditioner.dropped and protocol_2.conditioner.dropped
+
+
+def test_late_inputs_roll_back_to_the_true_match():
+    seed = 4
+    rng = random.Random(seed)
+    directions = [[rng.choice((-1, 0, 1)) for _ in range(600)] for _ in range(2)]
+    session = RollbackSession(Match(**SETTINGS, seed=seed, two_players=True), 1, input_delay=0)
+    reference = Match(**SETTINGS, seed=seed, two_players=True)
+    for tick in range(600):
+        session.advance(directions[0][tick])
+        # Player 2's inputs arrive in bursts, 20 ticks late
+        if tick % 20 == 19:
+            first_tick = tick - 39 if tick >= 39 else 0
+            session.receive(first_tick, directions[1][first_tick:tick - 19], 0, tick - 20, 0)
+        reference.hold_paddle(1, directions[0][tick])
+        reference.hold_paddle(2, directions[1][tick])
+        if not reference.is_over() and reference.step() == "point" and not reference.is_over():
+            reference.restart_round()
+    session.receive(580, directions[1][580:], 0, 599, 0)
+    # One more tick runs the rollback, so compare with the reference after it too
+    session.advance(0)
+    reference.hold_paddle(1, 0)
+    reference.hold_paddle(2, directions[1][599])
+    if not reference.is_over() and reference.step() == "point" and not reference.is_over():
+        reference.restart_round()
+    assert session.mispredictions > 0
+    assert session.match.snapshot() == reference.snapshot()
+
+
+def test_join_by_host_name():
+    async def run():
+        loop = asyncio.get_running_loop()
+        host_transport, host = await loop.create_datagram_endpoint(lambda: NetplayProtocol(hello=b"settings"),
+                                                                   local_addr=("localhost", 0))
+        protocol, hello = await join(("localhost", host_transport.get_extra_info("sockname")[1]))
+        # The host learned the joining peer's address from its handshake, and packets get through both ways
+        host.session = RollbackSession(Match(**SETTINGS, seed=0, two_players=True), 1)
+        protocol.session = RollbackSession(Match(**SETTINGS, seed=0, two_players=True), 2)
+        protocol.send(protocol.session.outgoing())
+        host.send(host.session.outgoing())
+        await asyncio.sleep(0.05)
+        protocol.transport.close()
+        host_transport.close()
+        return hello, host, protocol
+
+    hello, host, protocol = asyncio.run(run())
+    assert hello == b"settings"
+    assert host.peer == protocol.transport.get_extra_info("sockname")
+    assert host.session.remote_confirmed >= 0 and protocol.session.remote_confirmed >= 0
+
+
+def test_local_inputs_are_forgotten_when_acknowledgements_lag():
+    session = RollbackSession(Match(**SETTINGS, seed=5, two_players=True), 1)
+    for tick in range(1000):
+        session.advance(1 if tick % 50 < 25 else -1)
+        # Remote inputs arrive at once, so snapshots are pruned straight away, but the peer's
+        # acknowledgements of local inputs arrive 30 ticks late
+        session.receive(tick, [0], max(tick - 30, 0), tick, 0)
+    assert len(session.local_inputs) <= 40
+    assert min(session.local_inputs) == session.remote_ack
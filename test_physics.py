@@ -0,0 +1,57 @@
+"""Tests for the ball path predictions in physics.py"""
+
+import math
+import random
+import pytest
+from physics import BallState, PaddleState, simulate_ball_path, predict_ball_path
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 500
+# The predictions differ from the stepped simulation only by floating point rounding
+TOLERANCE = 1e-9
+
+
+def random_ball(rng, speed, steep=False):
+    """
+    :return: BallState somewhere left of the CPU's paddle, moving towards it
+    """
+    wall_y = SCREEN_HEIGHT/2 - BallState(speed).radius
+    heading = rng.uniform(75, 89.5) if steep else rng.uniform(0, 89.5)
+    if rng.random() < 0.5:
+        heading = -heading
+    return BallState(speed, heading, rng.uniform(-SCREEN_WIDTH/2 + 40, SCREEN_WIDTH/2 - 50),
+                     rng.uniform(-wall_y, wall_y))
+
+
+@pytest.mark.parametrize("steep", [False, True])
+def test_predicted_landing_matches_the_stepped_simulation(steep):
+    rng = random.Random(f"predict/{steep}")
+    paddle = PaddleState(2, 5, SCREEN_WIDTH)
+    for _ in range(500 if steep else 5000):
+        speed = rng.choice([1, 2, 3, 5, 8, 13])
+        ball = random_ball(rng, speed, steep)
+        assert predict_ball_path(ball, speed, paddle, SCREEN_HEIGHT) == pytest.approx(
+            simulate_ball_path(ball, speed, paddle, SCREEN_HEIGHT), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize("speed", [1, 3, 7])
+@pytest.mark.parametrize("side", [1, -1])
+@pytest.mark.parametrize("gap", [1e-6, -1e-6])
+def test_predicted_landing_matches_the_stepped_simulation_near_the_walls(speed, side, gap):
+    # A ball that lands exactly on a wall or the paddle's edge after a whole number of steps is a tie that only
+    # floating point rounding decides, so each case stops just short of or just past one instead
+    paddle = PaddleState(2, 5, SCREEN_WIDTH)
+    wall_y = SCREEN_HEIGHT/2 - BallState(speed).radius
+    edge_x = paddle.x - paddle.half_width - BallState(speed).radius
+    for heading in (0.5, 30, 45, 60, 85):
+        vx = speed*math.cos(math.radians(heading))
+        vy = speed*math.sin(math.radians(heading))
+        # (y, 1 if moving towards that wall or -1 if away): touching the wall, whole steps from it, and just
+        # after bouncing off it (past the wall by less than a step, as the stepped ball bounces)
+        starts = ((wall_y - abs(gap), 1), (wall_y - vy + gap, 1), (wall_y - 5*vy + gap, 1), (wall_y + vy/2, -1))
+        # Starting in the court's corners and next to the paddle
+        for x in (-SCREEN_WIDTH/2 + 40 + gap, edge_x - 3*vx + gap, edge_x - 40*vx - gap):
+            for y, direction in starts:
+                ball = BallState(speed, side*direction*heading, x, side*y)
+                assert predict_ball_path(ball, speed, paddle, SCREEN_HEIGHT) == pytest.approx(
+                    simulate_ball_path(ball, speed, paddle, SCREEN_HEIGHT), abs=TOLERANCE)
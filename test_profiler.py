@@ -0,0 +1,40 @@
+"""Tests for the frame profiler in profiler.py"""
+
+import random
+import pytest
+from profiler import FrameProfiler, BUCKETS
+
+
+def test_percentiles_cover_every_sample_in_bounded_memory():
+    profiler = FrameProfiler(1/60)
+    samples = [random.Random(index).lognormvariate(-7, 1.5) for index in range(20000)]
+    for seconds in samples:
+        profiler.record("phase", seconds)
+    stats = profiler.summary()["phases"]["phase"]
+    assert len(profiler.histograms["phase"]) == BUCKETS
+    assert stats["count"] == 20000
+    assert stats["max_ms"] == max(samples)*1000
+    samples.sort()
+    for percent in (50, 95, 99):
+        exact = samples[round(percent/100*len(samples)) - 1]*1000
+        assert abs(stats[f"p{percent}_ms"] - exact) <= exact*0.012
+
+
+def test_percentiles_include_early_samples():
+    profiler = FrameProfiler(1/60)
+    for index in range(100000):
+        profiler.record("phase", 0.5 if index < 60000 else 0.001)
+    stats = profiler.summary()["phases"]["phase"]
+    # The fast samples at the end don't push the slow ones at the start out of the percentiles
+    assert stats["p50_ms"] == pytest.approx(500, rel=0.012)
+    assert stats["p99_ms"] == pytest.approx(500, rel=0.012)
+
+
+def test_missed_frames_are_counted():
+    times = iter([0.0, 0.01, 1.0, 1.03])
+    profiler = FrameProfiler(1/60, clock=lambda: next(times))
+    for _ in range(2):
+        profiler.start_frame()
+        profiler.stop_frame()
+    assert profiler.frames == 2
+    assert profiler.missed_frames == 1
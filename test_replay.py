@@ -0,0 +1,88 @@
+"""Tests for recording and replaying matches in replay.py"""
+
+import pytest
+from controllers import tracking_controller
+from replay import Recorder, Recording, MOVE, HOLD, RESTART, replay, verify
+
+
+def record(config, seed, ticks):
+    """
+    :return: Finished Recording of a seeded match played for up to ticks ticks
+    """
+    recorder = Recorder(config, seed)
+    match = recorder.match
+    while match.ticks < ticks and not match.is_over():
+        if match.step() == "point" and not match.is_over():
+            recorder.restart_round()
+    return recorder.finish()
+
+
+def record_played(config, seed, ticks, snapshot_interval=250):
+    """
+    Records a seeded match with Player 1 played by a tracking controller, which holds its paddle towards the ball
+    and taps it the other way now and then
+    :return: (finished Recording, dict of the match's snapshots by tick every snapshot_interval ticks)
+    """
+    recorder = Recorder(config, seed)
+    match = recorder.match
+    controller = tracking_controller()
+    held = 0
+    snapshots = {}
+    while match.ticks < ticks and not match.is_over():
+        direction = controller(match)
+        if direction != held:
+            recorder.hold_paddle(1, direction)
+            held = direction
+        if match.ticks % 97 == 0:
+            recorder.move_paddle(1, -direction or 1)
+        if match.ticks % snapshot_interval == 0:
+            snapshots[match.ticks] = match.snapshot()
+        if match.step() == "point" and not match.is_over():
+            recorder.restart_round()
+    return recorder.finish(), snapshots
+
+
+def test_saved_planner_match_verifies_after_loading(tmp_path):
+    recording = record({"planner": "hard", "held_paddle_speed": 1}, 3, 5000)
+    assert recording.final_state.cpu_state is not None
+    path = tmp_path / "planner.pongrec"
+    recording.save(path)
+    loaded = Recording.load(path)
+    assert loaded.final_state == recording.final_state
+    assert verify(loaded)
+
+
+def test_replay_matches_recorded_snapshots():
+    recording, snapshots = record_played({"held_paddle_speed": 5, "winning_score": 3}, 11, 20000)
+    kinds = {event[1] for event in recording.events}
+    assert kinds == {RESTART, MOVE, HOLD}
+    assert len(snapshots) > 4
+    for tick, snapshot in snapshots.items():
+        # A recording cut off at each snapshot's tick must replay to that snapshot
+        events = [event for event in recording.events if event[0] <= tick]
+        assert replay(Recording(recording.seed, recording.config, events, snapshot)).snapshot() == snapshot
+    assert verify(recording)
+
+
+def test_recording_round_trips_through_bytes():
+    recording, _ = record_played({"held_paddle_speed": 5, "ball_speed": 4}, 5, 3000)
+    loaded = Recording.from_bytes(recording.to_bytes())
+    assert loaded.seed == recording.seed
+    assert loaded.config == recording.config
+    assert loaded.events == recording.events
+    assert loaded.final_state == recording.final_state
+    assert loaded.to_bytes() == recording.to_bytes()
+    assert verify(loaded)
+
+
+def test_missing_input_fails_verification():
+    recording, _ = record_played({"held_paddle_speed": 5, "winning_score": 3}, 7, 20000)
+    # Leave out the last round restart
+    last_restart = max(i for i, event in enumerate(recording.events) if event[1] == RESTART)
+    events = recording.events[:last_restart] + recording.events[last_restart + 1:]
+    assert not verify(Recording(recording.seed, recording.config, events, recording.final_state))
+
+
+def test_from_bytes_rejects_other_files():
+    with pytest.raises(ValueError):
+        Recording.from_bytes(b"not a recording")
@@ -0,0 +1,58 @@
+"""Tests for the game rules in rules.py"""
+
+import pytest
+from rules import Match, PREDICTIONS
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_high_speed_swept_match_plays_without_errors(seed):
+    # Seeds 80, 85, 179, 257 and 285 used to cross react_x and bounce off the CPU's paddle in one tick
+    match = Match(seed=seed, swept=True, ball_speed=400, cpu_paddle_speed=400)
+    match.play(max_ticks=20000)
+
+
+def play_record(match, ticks):
+    """
+    :return: List of every tick's positions and scores while stepping the match
+    """
+    record = []
+    for _ in range(ticks):
+        if match.step() == "point" and not match.is_over():
+            match.restart_round()
+        record.append((match.positions(), tuple(match.scores)))
+    return record
+
+
+def test_stepping_a_copy_leaves_the_original_unchanged():
+    expected = play_record(Match(seed=5), 5000)
+    match = Match(seed=5)
+    trial = match.copy()
+    trial.rng.random()
+    play_record(trial, 3000)
+    assert play_record(match, 5000) == expected
+
+
+def test_copy_makes_the_same_choices_as_the_original():
+    match = Match(seed=5)
+    play_record(match, 1000)
+    trial = match.copy()
+    assert play_record(trial, 3000) == play_record(match, 3000)
+
+
+def test_restoring_a_snapshot_replays_the_planner_cpu():
+    match = Match(seed=3, planner="hard", held_paddle_speed=1)
+    # Stop part way through a plan, so the search has state to save
+    while not (match.cpu.reacted and 0 < match.cpu.next_aim < len(match.cpu.aims)):
+        if match.step() == "point":
+            match.restart_round()
+    state = match.snapshot(include_rng=True)
+    expected = play_record(match, 3000)
+    match.restore(state)
+    assert play_record(match, 3000) == expected
+
+
+@pytest.mark.parametrize("prediction, swept, planning_prediction", [
+    ("stepped", False, "analytic"), ("analytic", False, "analytic"), ("swept", True, "swept")])
+def test_planner_always_plans_with_a_constant_time_prediction(prediction, swept, planning_prediction):
+    match = Match(seed=0, planner="expert", prediction=prediction, swept=swept)
+    assert match.cpu.predict is PREDICTIONS[planning_prediction]
@@ -0,0 +1,133 @@
+"""Tests for writing and reading telemetry files with telemetry.py"""
+
+import math
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from telemetry import TelemetryBus, MAGIC, RECORD, HIT, POINT, DROPPED, read_telemetry
+
+
+class GatedFile:
+    """A stand-in for the bus's file that holds up the writer thread until it is let through, and can fail
+    its first write"""
+
+    def __init__(self, file, fail=False):
+        """
+        param file: File to pass writes on to
+        param fail: True to raise OSError on the first write, as if the disk were full
+        """
+        self.file = file
+        self.fail = fail
+        self.writing = threading.Event()
+        self.open = threading.Event()
+
+    def write(self, data):
+        self.writing.set()
+        self.open.wait()
+        if self.fail:
+            self.fail = False
+            raise OSError("disk full")
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def hit(tick):
+    """
+    :return: Record of a paddle hit on a tick
+    """
+    return (HIT, 1, tick, 0.5, 10.0, 45.0, math.nan, math.nan, 1, tick, tick/120)
+
+
+def read_records(path):
+    """
+    :return: List of every record in a telemetry file, as tuples
+    """
+    data = path.read_bytes()
+    assert data.startswith(MAGIC)
+    return list(RECORD.iter_unpack(data[len(MAGIC):]))
+
+
+def test_full_queue_drops_events_and_close_writes_the_count(tmp_path):
+    path = tmp_path / "dropped.pongtel"
+    bus = TelemetryBus(path, capacity=4)
+    gate = bus.file = GatedFile(bus.file)
+    bus.publish(hit(0))
+    # The writer has taken the first event and is stuck writing it, so only 4 more fit in the queue
+    assert gate.writing.wait(5)
+    for tick in range(1, 11):
+        bus.publish(hit(tick))
+    assert (bus.published, bus.dropped) == (5, 6)
+    gate.open.set()
+    bus.close()
+    records = read_records(path)
+    assert [record[2] for record in records[:-1]] == [0, 1, 2, 3, 4]
+    assert (records[-1][0], records[-1][8]) == (DROPPED, 6)
+
+
+def test_close_writes_every_queued_event(tmp_path):
+    path = tmp_path / "flushed.pongtel"
+    bus = TelemetryBus(path, batch_size=16)
+    for tick in range(1000):
+        bus.publish(hit(tick))
+    bus.close()
+    assert bus.written == 1000
+    records = read_records(path)
+    assert [record[2] for record in records] == list(range(1000))
+
+
+def test_events_are_written_at_exit_without_closing(tmp_path):
+    path = tmp_path / "exit.pongtel"
+    script = (f"from telemetry import TelemetryBus, POINT\n"
+              f"import math\n"
+              f"bus = TelemetryBus({str(path)!r})\n"
+              f"for tick in range(500):\n"
+              f"    bus.publish((POINT, 2, tick, math.nan, 0.0, 180.0, math.nan, math.nan, 0, tick, 0.0))\n")
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+    records = read_records(path)
+    assert [(record[0], record[2]) for record in records] == [(POINT, tick) for tick in range(500)]
+
+
+# The writer thread dying with an OSError is the point of the test
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_close_returns_and_counts_lost_events_if_the_writer_died(tmp_path):
+    path = tmp_path / "died.pongtel"
+    bus = TelemetryBus(path, capacity=2)
+    gate = bus.file = GatedFile(bus.file, fail=True)
+    bus.publish(hit(0))
+    assert gate.writing.wait(5)
+    bus.publish(hit(1))
+    bus.publish(hit(2))
+    bus.publish(hit(3))
+    gate.open.set()
+    # The failed write kills the writer thread with the queue still full
+    bus.thread.join(5)
+    assert not bus.thread.is_alive()
+    closing = threading.Thread(target=bus.close, daemon=True)
+    closing.start()
+    closing.join(5)
+    assert not closing.is_alive()
+    assert read_records(path) == [(DROPPED, 0, 0, *(pytest.approx(math.nan, nan_ok=True),)*5, 4, 0,
+                                   pytest.approx(math.nan, nan_ok=True))]
+
+
+def test_read_telemetry_returns_only_whole_records(tmp_path):
+    pytest.importorskip("numpy")
+    path = tmp_path / "live.pongtel"
+    bus = TelemetryBus(path)
+    for tick in range(3):
+        bus.publish(hit(tick))
+    deadline = time.monotonic() + 5
+    while bus.written < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    # Half of the next record is in the file, as if it were read in the middle of the writer's next write
+    with open(path, 'ab') as file:
+        file.write(RECORD.pack(*hit(3))[:RECORD.size//2])
+    records = read_telemetry(path)
+    assert list(records["tick"]) == [0, 1, 2]
+    assert list(records["kind"]) == [HIT]*3
+    assert bus.thread.is_alive()
+    bus.close()
@@ -0,0 +1,52 @@
+"""Tests for the precomputed trajectory table in trajectory_table.py"""
+
+import os
+import random
+import pytest
+
+pytest.importorskip("numpy")
+import trajectory_table  # noqa: E402
+from trajectory_table import TrajectoryTable  # noqa: E402
+from physics import BallState, PaddleState, predict_ball_path, predict_swept_ball_path  # noqa: E402
+
+PREDICTORS = {"analytic": predict_ball_path, "swept": predict_swept_ball_path}
+
+
+def lookup_errors(table, count=20000, seed=0):
+    """
+    :return: Sorted list of how far the table's lookups are from its exact predictor for random balls
+    """
+    rng = random.Random(seed)
+    paddle = PaddleState(2, 5, 800)
+    predict = PREDICTORS[table.prediction]
+    errors = []
+    for _ in range(count):
+        ball = BallState(3, rng.uniform(-72, 72), rng.uniform(-50, 153), rng.uniform(-table.wall_y, table.wall_y))
+        errors.append(abs(table(ball, 3, paddle, 500) - predict(ball, 3, paddle, 500)))
+    return sorted(errors)
+
+
+@pytest.mark.parametrize("prediction, median, worst", [("analytic", 1, 12), ("swept", 0.01, 1.5)])
+def test_lookups_stay_within_the_documented_error(tmp_path, prediction, median, worst):
+    errors = lookup_errors(TrajectoryTable.load(800, 500, 3, prediction, directory=tmp_path))
+    assert errors[len(errors)//2] < median
+    assert errors[-1] < worst
+
+
+def test_saved_table_is_not_reused_after_the_physics_changes(tmp_path, monkeypatch):
+    table = TrajectoryTable.load(800, 500, 3, directory=tmp_path, heading_step=0.5)
+    file_name = table.file_name()
+    assert os.listdir(tmp_path) == [file_name]
+    monkeypatch.setattr(trajectory_table, "physics_digest", lambda: "changed")
+    changed = TrajectoryTable.load(800, 500, 3, directory=tmp_path, heading_step=0.5)
+    assert changed is not table
+    assert sorted(os.listdir(tmp_path)) == sorted([file_name, changed.file_name()])
+
+
+def test_physics_digest_only_hashes_the_predictors(monkeypatch):
+    hashed = []
+    get_source = trajectory_table.inspect.getsource
+    monkeypatch.setattr(trajectory_table.inspect, "getsource", lambda item: hashed.append(item) or get_source(item))
+    trajectory_table.physics_digest.__wrapped__()
+    names = {item.__name__ for item in hashed}
+    assert names == {"predict_ball_path", "predict_swept_ball_path", "predict_ball_paths", "predict_swept_ball_paths"}
@@ -0,0 +1,212 @@
+"""Trajectory Table Class File
+
+Contains TrajectoryTable class, which precomputes where the ball will reach the CPU's paddle for a grid of
+(y, heading) positions at one x position, so the CPU can look its prediction up instead of working it out.
+
+Tables are built once per court and saved as .npy files in TABLE_DIRECTORY, which later runs memory-map
+instead of building again. The table is only used when asked for (Match(prediction="table")): a lookup is no
+faster than physics.predict_ball_path, and it is approximate (see TrajectoryTable), so it only pays off for
+predictors that are slow to work out. Run this script to build a table and print how far its lookups are from
+the predictor it was built from:
+    python trajectory_table.py
+"""
+
+import functools
+import hashlib
+import inspect
+import math
+import os
+import numpy as np
+from physics import BALL_RADIUS, PaddleState, predict_ball_path, predict_swept_ball_path
+from batch import predict_ball_paths, predict_swept_ball_paths
+from cpu_brain import default_react_x_range
+
+TABLE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trajectory_tables")
+# Version of the table's layout, part of every file name; change it whenever build() or interpolate() changes
+FORMAT_VERSION = 2
+# Exact predictor and its array version for each prediction method a table can be built from
+PREDICTORS = {
+    "analytic": (predict_ball_path, lambda x, y, heading, ball_speed, edge_x, screen_height:
+                 predict_ball_paths(x, y, heading, ball_speed, edge_x, screen_height)),
+    "swept": (predict_swept_ball_path, lambda x, y, heading, ball_speed, edge_x, screen_height:
+              predict_swept_ball_paths(x, y, heading, edge_x, screen_height)),
+}
+# Tables already loaded in this process, by file path
+_loaded = {}
+
+
+def fold_into_court(unfolded_y, wall_y):
+    """
+    :param unfolded_y: y position along a path with its wall bounces unfolded into a straight line
+    :param wall_y: Highest y the ball's center can reach
+    :return: (y position in the court, True if an odd number of bounces mirrored the ball's heading)
+    """
+    folded_y = (unfolded_y + wall_y) % (4*wall_y)
+    if folded_y <= 2*wall_y:
+        return folded_y - wall_y, False
+    return 3*wall_y - folded_y, True
+
+
+@functools.cache
+def physics_digest():
+    """
+    :return: Short hash of the source code of the predictors in PREDICTORS and their array versions, and of the
+            ball radius they default to, so edits elsewhere in physics.py and batch.py keep saved tables
+    """
+    source = "".join(inspect.getsource(function) for function in (predict_ball_path, predict_swept_ball_path,
+                                                                  predict_ball_paths, predict_swept_ball_paths))
+    return hashlib.sha1(f"{source}{BALL_RADIUS!r}".encode()).hexdigest()[:12]
+
+
+class TrajectoryTable:
+    """A class to look up where the ball will reach the right-hand paddle's edge
+
+    Called the same way as the predictors in physics.py, so it can replace them. Balls that aren't at the
+    table's x position are moved along their unfolded straight-line path to it, and the landing position is
+    interpolated between the nearest four entries, so lookups are approximate. For "swept" the path really is a
+    straight line folded at the walls, and lookups are only off where an interpolation straddles a bounce. For
+    "analytic", the stepped ball overshoots each wall by up to one step (ball_speed pixels) depending on exactly
+    where it started, which moving it along a straight line to table_x doesn't keep, so a lookup can be off by up
+    to about ball_speed pixels per bounce: with the default settings and speed 3, half a pixel off on average,
+    6 at the 99th percentile, and about 11 at worst. Finer steps don't help. Balls steeper than max_heading,
+    which bounce more often, use the exact predictor instead.
+    """
+
+    def __init__(self, screen_width, screen_height, ball_speed, prediction="analytic", table_x=None, y_step=1.0,
+                 heading_step=0.05, max_heading=75, table=None):
+        """
+        param screen_width: The width of the court
+        param screen_height: The height of the court
+        param ball_speed: Distance the ball moves per tick
+        param prediction: Name of the method in PREDICTORS the table is built from
+        param table_x: x position the table's entries start from; defaults to the middle of the CPU's
+                default reaction range, so balls are moved as little as possible
+        param y_step: Distance between entries' y positions
+        param heading_step: Degrees between entries' headings
+        param max_heading: Steepest heading (in degrees either side of straight right) in the table
+        param table: Array of entries (e.g. memory-mapped from a file); built if None
+        """
+        self.screen_height = screen_height
+        self.ball_speed = ball_speed
+        self.prediction = prediction
+        self.predict_exactly = PREDICTORS[prediction][0]
+        self.table_x = sum(default_react_x_range(screen_width))/2 if table_x is None else table_x
+        self.y_step = y_step
+        self.heading_step = heading_step
+        self.max_heading = max_heading
+        self.wall_y = screen_height/2 - BALL_RADIUS
+        paddle = PaddleState(2, 0, screen_width)
+        self.paddle_edge_x = paddle.x - paddle.half_width
+        self.y_count = round(2*self.wall_y/y_step) + 1
+        self.heading_count = round(2*max_heading/heading_step) + 1
+        self.table = self.build() if table is None else table
+
+    def build(self):
+        """
+        :return: Array of landing y positions with one row per y position and one column per heading
+        """
+        y = np.linspace(-self.wall_y, self.wall_y, self.y_count)
+        heading = np.linspace(-self.max_heading, self.max_heading, self.heading_count)
+        y, heading = np.meshgrid(y, heading, indexing='ij')
+        predict = PREDICTORS[self.prediction][1]
+        return predict(np.full_like(y, self.table_x), y, heading, self.ball_speed, self.paddle_edge_x,
+                       self.screen_height).astype(np.float32)
+
+    def file_name(self):
+        """
+        :return: Name of the file this table is saved in, which includes every setting that changes its entries,
+                FORMAT_VERSION, and a hash of the predictors it was built from (see physics_digest()), so a table
+                saved before a change to them is never loaded after it
+        """
+        return (f"{self.prediction}_v{FORMAT_VERSION}_{physics_digest()}_h{self.screen_height}_"
+                f"edge{self.paddle_edge_x:g}_speed{self.ball_speed:g}_x{self.table_x:g}_y{self.y_step:g}_"
+                f"heading{self.heading_step:g}_max{self.max_heading:g}.npy")
+
+    @classmethod
+    def load(cls, screen_width, screen_height, ball_speed, prediction="analytic", directory=TABLE_DIRECTORY,
+             **settings):
+        """
+        Loads the table for a court, building and saving it first if it hasn't been saved before
+        :param screen_width: The width of the court
+        :param screen_height: The height of the court
+        :param ball_speed: Distance the ball moves per tick
+        :param prediction: Name of the method in PREDICTORS the table is built from
+        :param directory: Directory tables are saved in
+        :param settings: Other keyword arguments for TrajectoryTable
+        :return: TrajectoryTable object; the same one for every call in a process with the same court
+        """
+        table = cls(screen_width, screen_height, ball_speed, prediction, table=np.empty((0, 0)), **settings)
+        path = os.path.join(directory, table.file_name())
+        if path in _loaded:
+            return _loaded[path]
+        if os.path.exists(path):
+            table.table = np.load(path, mmap_mode='r')
+        else:
+            table.table = table.build()
+            os.makedirs(directory, exist_ok=True)
+            # Write to a temporary file first so other processes never load a half-written table
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'wb') as file:
+                np.save(file, table.table)
+            os.replace(temporary_path, path)
+        _loaded[path] = table
+        return table
+
+    def __call__(self, ball, ball_speed, paddle, screen_height):
+        """
+        :param ball: The ball to be predicted
+        :param ball_speed: Speed the ball would be stepped at (must be the table's ball_speed)
+        :param paddle: The right-hand paddle the ball is moving towards (must be the table's court's paddle)
+        :param screen_height: The height of the court (must be the table's screen_height)
+        :return: y coordinate of center of ball when the ball will reach the edge of the paddle in the future
+        """
+        heading = (ball.heading + 180) % 360 - 180
+        if abs(heading) > self.max_heading:
+            return self.predict_exactly(ball, ball_speed, paddle, screen_height)
+        return self.interpolate(ball.x, ball.y, heading)
+
+    def interpolate(self, x, y, heading):
+        """
+        :param x: x position of the ball
+        :param y: y position of the ball
+        :param heading: Heading of the ball (in degrees, within max_heading of straight right)
+        :return: Landing y position interpolated from the table's entries
+        """
+        # Move the ball to the table's x position along its path, bouncing off the walls on the way
+        y, mirrored = fold_into_court(y + (self.table_x - x)*math.tan(math.radians(heading)), self.wall_y)
+        if mirrored:
+            heading = -heading
+        row = (y + self.wall_y)/self.y_step
+        column = (heading + self.max_heading)/self.heading_step
+        i = min(int(row), self.y_count - 2)
+        j = min(int(column), self.heading_count - 2)
+        row -= i
+        column -= j
+        # item() is much faster than slicing for reading a few entries
+        entry = self.table.item
+        low_low, low_high, high_low, high_high = entry(i, j), entry(i, j + 1), entry(i + 1, j), entry(i + 1, j + 1)
+        low = low_low + (high_low - low_low)*row
+        high = low_high + (high_high - low_high)*row
+        return low + (high - low)*column
+
+
+def main():
+    import random
+    import time
+    from physics import BallState
+    started = time.perf_counter()
+    table = TrajectoryTable.load(800, 500, 3)
+    print(f"loaded {table.file_name()} in {(time.perf_counter() - started)*1000:.1f} ms")
+    rng = random.Random(0)
+    paddle = PaddleState(2, 5, 800)
+    errors = []
+    for _ in range(100000):
+        ball = BallState(3, rng.uniform(-72, 72), rng.uniform(-50, 153), rng.uniform(-table.wall_y, table.wall_y))
+        errors.append(abs(table(ball, 3, paddle, 500) - predict_ball_path(ball, 3, paddle, 500)))
+    errors.sort()
+    print(f"error vs predict_ball_path: median {errors[len(errors)//2]:.2f} px, "
+          f"99th percentile {errors[len(errors)*99//100]:.2f} px, max {errors[-1]:.2f} px")
+
+
+if __name__ == "__main__":
+    main()